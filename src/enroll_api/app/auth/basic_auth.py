@@ -1,29 +1,133 @@
-import secrets
+import asyncio
 import base64
+import hashlib
+import hmac
 import json
 import os
-from typing import Optional, Dict, Tuple, List
-from fastapi import HTTPException, status, Depends
-from fastapi.security import HTTPBasic, HTTPBasicCredentials
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional, Dict, Mapping, Tuple, List
+from fastapi import HTTPException, Request, status, Depends
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBasic, HTTPBasicCredentials, HTTPBearer
+from app.auth.passwords import VerifiedCredentialCache, is_password_hash, verify_dummy_password, verify_password
+from app.auth.tokens import verify_access_token
+from app.auth.user_store import (
+    NOT_CACHED, MongoUserStore, UserRecord, UserSnapshot, UserStore, build_user_snapshot
+)
 from app.config.config import config
 
 
+# Chave do escopo ASGI onde o middleware guarda o usuário autenticado (ou None)
+PRINCIPAL_SCOPE_KEY = "enroll_api.principal"
+
+
+class BasicAuthScheme(HTTPBasic):
+    """HTTPBasic que não reprocessa o header quando o middleware já autenticou"""
+    
+    async def __call__(self, request: Request) -> Optional[HTTPBasicCredentials]:
+        if request.scope.get(PRINCIPAL_SCOPE_KEY) is not None:
+            return None
+        # Tokens Bearer são validados por get_current_user
+        if request.headers.get("Authorization", "")[:7].lower() == "bearer ":
+            return None
+        # Sem middleware, ou autenticação falhou: valida o formato do header (401 se ausente/malformado)
+        return await super().__call__(request)
+
+
 # Instância do HTTPBasic para FastAPI
-security = HTTPBasic()
+security = BasicAuthScheme()
+
+# Tokens emitidos por POST /auth/token (opcional: sem o header, vale o Basic Auth)
+bearer_security = HTTPBearer(auto_error=False)
+
+# Usuários listados individualmente no log de carregamento
+LOGGED_USERS_LIMIT = 20
 
 
 class BasicAuthManager:
-    """Gerenciador de autenticação Basic Auth"""
+    """
+    Gerenciador de autenticação Basic Auth
+    
+    Usuários, metadados e índices por role ficam em um UserSnapshot imutável,
+    substituído com uma única atribuição a cada recarga: requisições
+    concorrentes veem o conjunto antigo ou o novo, nunca uma mistura.
+    
+    Com um UserStore externo (ex.: MongoUserStore, AUTH_USER_STORE=mongo),
+    os usuários são buscados sob demanda nele e nada é carregado no startup.
+    """
     
-    def __init__(self):
-        self.users = self._load_users()
-        self.users_metadata = {}
+    def __init__(self, store: Optional[UserStore] = None):
+        self.credential_cache = VerifiedCredentialCache()
+        self._verify_executor: Optional[ThreadPoolExecutor] = None
+        # HMAC do header Authorization -> (usuário, expira_em). O header traz a
+        # senha em claro e não fica em memória. O dicionário nunca é alterado:
+        # cada inclusão publica uma cópia, e a leitura dispensa lock
+        self._header_principals: Dict[bytes, Tuple[Dict[str, str], float]] = {}
+        self._header_secret = secrets.token_bytes(32)
+        self._header_lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self.users_file_path: Optional[str] = None
+        self._snapshot = build_user_snapshot(0, {}, {})
+        if store is None and config.AUTH_USER_STORE == "mongo":
+            store = MongoUserStore()
+        self._store = store
+        if isinstance(store, MongoUserStore):
+            # Uma senha alterada no banco não pode seguir aceita pelo cache de
+            # verificações (nem pelo de headers, que usa o mesmo TTL) por mais
+            # tempo que o próprio cache de usuários
+            self.credential_cache.ttl = min(self.credential_cache.ttl, store.ttl)
+        if store is None:
+            self._install(*self._load_users())
+        else:
+            print(f"👥 Usuários carregados sob demanda do backend: {store.source}")
     
-    def _load_users_from_file(self) -> Tuple[Dict[str, Dict], Dict]:
-        """Carrega usuários do arquivo JSON"""
+    @property
+    def snapshot(self) -> UserSnapshot:
+        return self._snapshot
+    
+    @property
+    def store(self) -> UserStore:
+        """Backend consultado na autenticação: o externo ou o snapshot em memória"""
+        return self._store if self._store is not None else self._snapshot
+    
+    @property
+    def source(self) -> str:
+        if self._store is not None:
+            return self._store.source
+        return "file" if self.users_metadata else "environment_variables"
+    
+    @property
+    def users(self) -> Mapping[str, Dict[str, str]]:
+        return self._snapshot.users
+    
+    @users.setter
+    def users(self, users: Dict[str, Dict]):
+        self._install(users, self._snapshot.metadata)
+    
+    @property
+    def users_metadata(self) -> Dict[str, Any]:
+        return self._snapshot.metadata
+    
+    @users_metadata.setter
+    def users_metadata(self, metadata: Dict[str, Any]):
+        self._install(self._snapshot.users, metadata)
+    
+    def _install(self, users: Dict[str, Dict], metadata: Dict[str, Any]):
+        """Publica um novo snapshot e invalida os caches derivados do anterior"""
+        with self._snapshot_lock:
+            self._snapshot = build_user_snapshot(self._snapshot.version + 1, users, metadata)
+            # Senhas alteradas ou usuários removidos não podem continuar no cache
+            self.credential_cache.clear()
+            with self._header_lock:
+                self._header_principals = {}
+    
+    def _load_users_from_file(self, path: Optional[str] = None) -> Tuple[Dict[str, Dict], Dict]:
+        """Carrega usuários do arquivo JSON (de path, se informado)"""
         try:
             # Tenta diferentes caminhos para o arquivo
-            possible_paths = [
+            possible_paths = [path] if path else [
                 config.USERS_FILE_PATH,
                 os.path.join(os.getcwd(), config.USERS_FILE_PATH),
                 os.path.join(os.path.dirname(__file__), "..", "config", "users.json"),
@@ -48,6 +152,7 @@ class BasicAuthManager:
                 print(f"⚠️ Arquivo de usuários não encontrado. Tentativas: {possible_paths}")
                 return {}, {}
             
+            self.users_file_path = used_path
             print(f"✅ Usuários carregados do arquivo: {used_path}")
             
             # Processa os usuários do arquivo
@@ -98,61 +203,157 @@ class BasicAuthManager:
         
         return users
     
-    def _load_users(self) -> Dict[str, Dict]:
+    def _load_users(self) -> Tuple[Dict[str, Dict], Dict]:
         """Carrega usuários do arquivo ou fallback para variáveis de ambiente"""
         # Tenta carregar do arquivo primeiro
         users, metadata = self._load_users_from_file()
-        self.users_metadata = metadata
         
         # Se não conseguiu carregar do arquivo, usa variáveis de ambiente
         if not users:
             users = self._load_users_from_env()
         
-        # Log dos usuários carregados (sem senhas)
-        print("👥 Usuários disponíveis:")
-        for username, user_data in users.items():
+        # Log dos usuários carregados (sem senhas); listas grandes só pelo total
+        print(f"👥 Usuários disponíveis: {len(users)}")
+        for username, user_data in list(users.items())[:LOGGED_USERS_LIMIT]:
             print(f"  - {username} ({user_data['role']}): {user_data['description']}")
+        if len(users) > LOGGED_USERS_LIMIT:
+            print(f"  ... e mais {len(users) - LOGGED_USERS_LIMIT}")
+        self._warn_plaintext(users)
         
-        return users
+        return users, metadata
+    
+    def _warn_plaintext(self, users: Dict[str, Dict]):
+        plaintext = [username for username, user_data in users.items() if not is_password_hash(user_data["password"])]
+        if plaintext:
+            print(f"⚠️ {len(plaintext)} usuários com senha em texto puro; gere hashes com: python -m app.auth.passwords")
+    
+    def _verify_uncached(self, username: str, password: str) -> bool:
+        record = self.store.get(username)
+        if record is None:
+            return verify_dummy_password(password)
+        return verify_password(password, record.password)
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._verify_executor is None:
+            self._verify_executor = ThreadPoolExecutor(
+                max_workers=config.AUTH_VERIFY_WORKERS, thread_name_prefix="auth-verify"
+            )
+        return self._verify_executor
+    
+    async def _get_record_async(self, username: str) -> Optional[UserRecord]:
+        """Busca o usuário sem bloquear o event loop (I/O do backend em thread)"""
+        store = self.store
+        record = store.peek(username)
+        if record is NOT_CACHED:
+            loop = asyncio.get_running_loop()
+            record = await loop.run_in_executor(self._get_executor(), store.get, username)
+        return record
     
     def verify_credentials(self, username: str, password: str) -> bool:
         """Verifica se as credenciais são válidas"""
-        if username not in self.users:
-            return False
-        
-        stored_password = self.users[username]["password"]
-        # Usa secrets.compare_digest para evitar timing attacks
-        return secrets.compare_digest(stored_password, password)
+        if self.credential_cache.contains(username, password):
+            return self.store.get(username) is not None
+        generation = self.credential_cache.generation
+        valid = self._verify_uncached(username, password)
+        if valid:
+            self.credential_cache.add(username, password, generation)
+        return valid
     
-    def get_user_info(self, username: str) -> Optional[Dict[str, str]]:
-        """Retorna informações do usuário autenticado"""
-        if username in self.users:
-            user_data = self.users[username]
-            return {
-                "username": username,
-                "role": user_data["role"],
-                "description": user_data["description"]
-            }
+    async def verify_credentials_async(self, username: str, password: str) -> bool:
+        """
+        Verifica as credenciais sem bloquear o event loop: acertos do cache
+        respondem na hora; o hash é verificado em threads dedicadas.
+        """
+        if self.credential_cache.contains(username, password):
+            return await self._get_record_async(username) is not None
+        generation = self.credential_cache.generation
+        loop = asyncio.get_running_loop()
+        valid = await loop.run_in_executor(self._get_executor(), self._verify_uncached, username, password)
+        if valid:
+            self.credential_cache.add(username, password, generation)
+        return valid
+    
+    def lookup_authorization(self, authorization: bytes) -> Optional[Dict[str, str]]:
+        """Usuário já autenticado com exatamente este header Authorization"""
+        entry = self._header_principals.get(self._header_key(authorization))
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
         return None
     
-    def list_users(self) -> List[Dict[str, str]]:
-        """Lista todos os usuários (sem senhas) - para debugging"""
-        return [
-            {
-                "username": username,
-                "role": user_data["role"],
-                "description": user_data["description"]
-            }
-            for username, user_data in self.users.items()
-        ]
+    def _header_key(self, authorization: bytes) -> bytes:
+        return hmac.new(self._header_secret, authorization, hashlib.sha256).digest()
+    
+    async def authenticate_authorization(self, authorization: bytes) -> Optional[Dict[str, str]]:
+        """
+        Autentica um header Authorization bruto: headers já vistos são
+        resolvidos com uma consulta ao dicionário; os demais passam pela
+        verificação da senha e, se válidos, entram no snapshot.
+        """
+        user_info = self.lookup_authorization(authorization)
+        if user_info is not None:
+            return user_info
+        username, password = decode_basic_auth(authorization.decode("latin-1"))
+        if username is None:
+            return None
+        generation = self.credential_cache.generation
+        if not await self.verify_credentials_async(username, password):
+            return None
+        user_info = await self.get_user_info_async(username)
+        if user_info is not None:
+            self._remember_authorization(authorization, user_info, generation)
+        return user_info
+    
+    def _remember_authorization(self, authorization: bytes, user_info: Dict[str, str],
+                                generation: Optional[int] = None):
+        ttl = self.credential_cache.ttl
+        if ttl <= 0:
+            return
+        with self._header_lock:
+            # Verificado contra usuários que já foram substituídos por uma recarga
+            if generation is not None and generation != self.credential_cache.generation:
+                return
+            now = time.monotonic()
+            snapshot = self._header_principals
+            if len(snapshot) >= self.credential_cache.max_entries:
+                snapshot = {key: entry for key, entry in snapshot.items() if entry[1] > now}
+                if len(snapshot) >= self.credential_cache.max_entries:
+                    snapshot = {}
+            snapshot = dict(snapshot)
+            snapshot[self._header_key(authorization)] = (user_info, now + ttl)
+            self._header_principals = snapshot
+    
+    def get_user_info(self, username: str) -> Optional[Dict[str, str]]:
+        """Retorna informações do usuário autenticado (dicionário compartilhado, somente leitura)"""
+        record = self.store.get(username)
+        return record.principal if record is not None else None
+    
+    async def get_user_info_async(self, username: str) -> Optional[Dict[str, str]]:
+        record = await self._get_record_async(username)
+        return record.principal if record is not None else None
+    
+    def list_users(self, limit: Optional[int] = None, after: Optional[str] = None) -> List[Dict[str, str]]:
+        """Lista usuários (sem senhas) em ordem de username, paginados por limit/after"""
+        return self.store.list_users(limit, after)
+    
+    def count_users(self) -> int:
+        return self.store.count()
     
     def reload_users(self) -> bool:
-        """Recarrega usuários do arquivo"""
+        """Recarrega usuários do arquivo (ou descarta o cache do backend externo)"""
+        if self._store is not None:
+            self._store.invalidate()
+            self.credential_cache.clear()
+            with self._header_lock:
+                self._header_principals = {}
+            print(f"🔄 Cache de usuários do backend {self._store.source} descartado")
+            return True
         try:
-            new_users, new_metadata = self._load_users_from_file()
+            # Relê o mesmo arquivo: um JSON inválido não faz cair em outro caminho
+            new_users, new_metadata = self._load_users_from_file(self.users_file_path)
             if new_users:
-                self.users = new_users
-                self.users_metadata = new_metadata
+                # Usuários e metadados trocados juntos, em uma única atribuição
+                self._install(new_users, new_metadata)
+                self._warn_plaintext(new_users)
                 print("🔄 Usuários recarregados com sucesso")
                 return True
             else:
@@ -167,19 +368,51 @@ class BasicAuthManager:
 auth_manager = BasicAuthManager()
 
 
-def get_current_user(credentials: HTTPBasicCredentials = Depends(security)) -> Dict[str, str]:
+def _credentials_error(bearer: bool) -> HTTPException:
+    if bearer:
+        return HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido ou expirado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Credenciais inválidas",
+        headers={"WWW-Authenticate": "Basic"},
+    )
+
+
+async def get_current_user(request: Request,
+                           credentials: Optional[HTTPBasicCredentials] = Depends(security),
+                           token: Optional[HTTPAuthorizationCredentials] = Depends(bearer_security)) -> Dict[str, str]:
     """
-    Dependency para verificar autenticação Basic Auth
+    Dependency para verificar autenticação Basic Auth ou token Bearer
     Retorna informações do usuário autenticado
+    
+    Com o BasicAuthMiddleware a autenticação já aconteceu: apenas lê o
+    usuário do escopo da requisição.
     """
-    if not auth_manager.verify_credentials(credentials.username, credentials.password):
+    if PRINCIPAL_SCOPE_KEY in request.scope:
+        user_info = request.scope[PRINCIPAL_SCOPE_KEY]
+        if user_info is None:
+            raise _credentials_error(bearer=token is not None)
+        return user_info
+    
+    # Token: um HMAC, sem consultar usuários nem verificar hash de senha
+    if token is not None:
+        user_info = verify_access_token(token.credentials)
+        if user_info is None:
+            raise _credentials_error(bearer=True)
+        return user_info
+    
+    if not await auth_manager.verify_credentials_async(credentials.username, credentials.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciais inválidas",
             headers={"WWW-Authenticate": "Basic"},
         )
     
-    user_info = auth_manager.get_user_info(credentials.username)
+    user_info = await auth_manager.get_user_info_async(credentials.username)
     if not user_info:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -190,7 +423,23 @@ def get_current_user(credentials: HTTPBasicCredentials = Depends(security)) -> D
     return user_info
 
 
-def get_admin_user(current_user: Dict[str, str] = Depends(get_current_user)) -> Dict[str, str]:
+async def get_basic_user(request: Request,
+                         credentials: Optional[HTTPBasicCredentials] = Depends(security),
+                         token: Optional[HTTPAuthorizationCredentials] = Depends(bearer_security)) -> Dict[str, str]:
+    """
+    Dependency que aceita apenas Basic Auth (emissão de tokens): um token
+    não pode ser trocado por outro, o que prolongaria a sessão indefinidamente
+    """
+    if token is not None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Use Basic Auth para obter um token",
+            headers={"WWW-Authenticate": "Basic"},
+        )
+    return await get_current_user(request, credentials, None)
+
+
+async def get_admin_user(current_user: Dict[str, str] = Depends(get_current_user)) -> Dict[str, str]:
     """
     Dependency para verificar se o usuário é admin
     Usado para endpoints que requerem privilégios administrativos
@@ -210,10 +459,11 @@ def decode_basic_auth(authorization: str) -> Tuple[Optional[str], Optional[str]]
     Útil para testes e debugging
     """
     try:
-        if not authorization.startswith("Basic "):
+        # O esquema não diferencia maiúsculas de minúsculas (RFC 7617)
+        scheme, _, encoded_credentials = authorization.partition(" ")
+        if scheme.lower() != "basic":
             return None, None
         
-        encoded_credentials = authorization.split(" ", 1)[1]
         decoded_credentials = base64.b64decode(encoded_credentials).decode("utf-8")
         
         if ":" not in decoded_credentials:
@@ -0,0 +1,36 @@
+from app.auth.basic_auth import PRINCIPAL_SCOPE_KEY, auth_manager
+from app.auth.tokens import verify_access_token
+
+
+class BasicAuthMiddleware:
+    """
+    Middleware ASGI que autentica cada requisição uma única vez.
+
+    O header Authorization bruto é procurado no snapshot de headers já
+    autenticados do auth_manager (tokens Bearer são verificados pela
+    assinatura); o usuário encontrado (ou None) fica em
+    scope[PRINCIPAL_SCOPE_KEY]. As dependências get_current_user e
+    get_admin_user passam a apenas ler esse valor. Requisições sem
+    credenciais seguem adiante: rotas públicas não dependem do usuário.
+    """
+
+    def __init__(self, app, manager=auth_manager):
+        self.app = app
+        self.manager = manager
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            authorization = None
+            for name, value in scope["headers"]:
+                if name == b"authorization":
+                    authorization = value
+                    break
+            user_info = None
+            if authorization is not None and authorization[:7].lower() == b"bearer ":
+                user_info = verify_access_token(authorization[7:].decode("latin-1"))
+            elif authorization is not None:
+                user_info = self.manager.lookup_authorization(authorization)
+                if user_info is None:
+                    user_info = await self.manager.authenticate_authorization(authorization)
+            scope[PRINCIPAL_SCOPE_KEY] = user_info
+        await self.app(scope, receive, send)
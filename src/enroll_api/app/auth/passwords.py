@@ -0,0 +1,144 @@
+"""
+Hash de senhas e cache de credenciais já verificadas.
+
+Gerar o hash de uma senha para o users.json:
+    python -m app.auth.passwords [senha]
+"""
+import getpass
+import hashlib
+import hmac
+import secrets
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import bcrypt
+from app.config.config import config
+
+# Prefixos dos hashes bcrypt ($2b$ é o gerado hoje; $2a$/$2y$ vêm de outras ferramentas)
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+
+# Hash fixo do processo, verificado para usuários inexistentes (gerado no primeiro uso)
+_dummy_hash: Optional[bytes] = None
+
+
+def is_password_hash(stored: str) -> bool:
+    return isinstance(stored, str) and stored.startswith(BCRYPT_PREFIXES)
+
+
+def hash_password(password: str, rounds: int = config.AUTH_BCRYPT_ROUNDS) -> str:
+    """Gera o hash bcrypt de uma senha (no máximo 72 bytes)"""
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("ascii")
+
+
+def verify_password(password: str, stored: str) -> bool:
+    """
+    Verifica a senha contra o valor armazenado: hash bcrypt (custo de
+    dezenas a centenas de ms) ou, para usuários antigos, texto puro.
+    """
+    if not stored:
+        return False
+    if is_password_hash(stored):
+        try:
+            return bcrypt.checkpw(password.encode("utf-8"), stored.encode("ascii"))
+        except ValueError:
+            # Senha acima de 72 bytes ou hash malformado
+            return False
+    # Usa secrets.compare_digest para evitar timing attacks
+    return secrets.compare_digest(stored.encode("utf-8"), password.encode("utf-8"))
+
+
+def verify_dummy_password(password: str) -> bool:
+    """
+    Faz o mesmo trabalho de verify_password contra um hash fixo e retorna
+    False: o tempo de resposta para um usuário inexistente é o mesmo de uma
+    senha errada, e não revela quais usernames existem.
+    """
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = bcrypt.hashpw(secrets.token_hex(16).encode("ascii"), bcrypt.gensalt(config.AUTH_BCRYPT_ROUNDS))
+    try:
+        bcrypt.checkpw(password.encode("utf-8"), _dummy_hash)
+    except ValueError:
+        pass
+    return False
+
+
+class VerifiedCredentialCache:
+    """
+    Cache LRU com TTL de pares (usuário, senha) já verificados.
+
+    Basic Auth reenvia a senha em toda requisição; com o cache, só a
+    primeira requisição de um cliente paga a verificação do hash. A chave é
+    um HMAC do par com um segredo aleatório do processo: nem a senha nem um
+    hash reversível por força bruta ficam em memória. Apenas verificações
+    bem-sucedidas são guardadas.
+
+    clear() avança a geração do cache: verificações iniciadas antes da
+    limpeza (contra os usuários antigos) não são incluídas depois dela.
+    """
+
+    def __init__(self, ttl: float = config.AUTH_CACHE_TTL, max_entries: int = config.AUTH_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._secret = secrets.token_bytes(32)
+        self._lock = threading.Lock()
+        # digest -> expira_em
+        self._entries: "OrderedDict[bytes, float]" = OrderedDict()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, username: str, password: str) -> bytes:
+        message = username.encode("utf-8") + b"\0" + password.encode("utf-8")
+        return hmac.new(self._secret, message, hashlib.sha256).digest()
+
+    def contains(self, username: str, password: str) -> bool:
+        if self.ttl <= 0:
+            return False
+        key = self._key(username, password)
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is not None and expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True
+            if expires_at is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False
+
+    def add(self, username: str, password: str, generation: Optional[int] = None):
+        if self.ttl <= 0:
+            return
+        key = self._key(username, password)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = time.monotonic() + self.ttl
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def main(password: Optional[str] = None):
+    password = password or getpass.getpass("Senha: ")
+    print(hash_password(password))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,71 @@
+"""
+Tokens de acesso assinados (HMAC-SHA256) e sem estado.
+
+Formato: base64url(payload JSON) + "." + base64url(assinatura), com o
+payload {"sub": username, "role": role, "description": descrição,
+"exp": timestamp}. A verificação é um HMAC, sem consulta ao arquivo/banco
+de usuários nem ao hash da senha.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import time
+from typing import Dict, Optional, Tuple
+from app.config.config import config
+
+# Tamanho mínimo do segredo: o da chave gerada quando AUTH_TOKEN_SECRET está vazio
+MIN_SECRET_BYTES = 32
+
+
+def _load_secret(value: str, allow_ephemeral: bool = config.AUTH_TOKEN_EPHEMERAL_SECRET) -> bytes:
+    if not value:
+        # Com vários workers/réplicas, um segredo por processo faria os tokens
+        # serem recusados de forma intermitente pelos demais processos
+        if not allow_ephemeral:
+            raise ValueError("AUTH_TOKEN_SECRET não definido (ou AUTH_TOKEN_EPHEMERAL_SECRET=true para desenvolvimento)")
+        print("⚠️ AUTH_TOKEN_SECRET não definido: tokens valem apenas neste processo")
+        return secrets.token_bytes(MIN_SECRET_BYTES)
+    secret = value.encode("utf-8")
+    if len(secret) < MIN_SECRET_BYTES:
+        raise ValueError(f"AUTH_TOKEN_SECRET deve ter pelo menos {MIN_SECRET_BYTES} bytes")
+    return secret
+
+
+_secret = _load_secret(config.AUTH_TOKEN_SECRET)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(_secret, payload.encode("utf-8"), hashlib.sha256).digest())
+
+
+def create_access_token(user_info: Dict[str, str], ttl: int = config.AUTH_TOKEN_TTL) -> Tuple[str, int]:
+    """Emite um token para o usuário; retorna o token e o timestamp de expiração"""
+    expires_at = int(time.time()) + ttl
+    payload = _b64encode(json.dumps(
+        {"sub": user_info["username"], "role": user_info["role"],
+         "description": user_info.get("description", ""), "exp": expires_at},
+        separators=(",", ":")
+    ).encode("utf-8"))
+    return f"{payload}.{_sign(payload)}", expires_at
+
+
+def verify_access_token(token: str) -> Optional[Dict[str, str]]:
+    """Retorna o usuário do token, ou None se a assinatura for inválida ou o token tiver expirado"""
+    payload, separator, signature = token.partition(".")
+    if not separator or not hmac.compare_digest(signature.encode("utf-8"), _sign(payload).encode("ascii")):
+        return None
+    # Assinatura válida: o payload foi gerado por create_access_token
+    claims = json.loads(_b64decode(payload))
+    if claims["exp"] <= time.time():
+        return None
+    return {"username": claims["sub"], "role": claims["role"], "description": claims.get("description", "")}
@@ -0,0 +1,248 @@
+"""
+Backends de usuários do BasicAuthManager.
+
+- UserSnapshot: usuários em memória (users.json ou variáveis de ambiente),
+  substituídos por inteiro a cada recarga.
+- MongoUserStore: usuários na coleção auth_users, carregados sob demanda;
+  adequado a dezenas de milhares de contas.
+
+Importar um arquivo de usuários para o MongoDB:
+    python -m app.auth.user_store import app/config/users.json
+"""
+import argparse
+from abc import ABC, abstractmethod
+import json
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+from pymongo import ReplaceOne
+from app.config.config import config
+from app.db.mongo import mongo_db
+
+# Campos lidos do MongoDB para autenticar um usuário
+USER_PROJECTION = {"password": 1, "role": 1, "description": 1}
+
+# Retorno de peek() quando o usuário não está em memória
+NOT_CACHED = object()
+
+
+class UserRecord(NamedTuple):
+    """Senha armazenada e informações públicas (o que get_current_user retorna)"""
+    password: str
+    principal: Dict[str, str]
+
+
+def build_user_record(username: str, user_data: Mapping[str, Any]) -> UserRecord:
+    return UserRecord(
+        password=user_data.get("password"),
+        principal={
+            "username": username,
+            "role": user_data.get("role", "user"),
+            "description": user_data.get("description", "")
+        }
+    )
+
+
+class UserStore(ABC):
+    """
+    Interface dos backends de usuários.
+
+    peek() nunca faz I/O: retorna o usuário (ou None) se a resposta estiver
+    em memória, ou NOT_CACHED; nesse caso o BasicAuthManager chama get()
+    fora do event loop.
+    """
+    source = "unknown"
+
+    def peek(self, username: str):
+        return NOT_CACHED
+
+    @abstractmethod
+    def get(self, username: str) -> Optional[UserRecord]:
+        ...
+
+    @abstractmethod
+    def list_users(self, limit: Optional[int] = None, after: Optional[str] = None) -> List[Dict[str, str]]:
+        """Usuários em ordem de username, a partir do primeiro maior que after"""
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def count_role(self, role: str) -> int:
+        ...
+
+    def invalidate(self):
+        """Descarta o que estiver em memória (POST /admin/users/reload)"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {"source": self.source}
+
+
+@dataclass(frozen=True)
+class UserSnapshot(UserStore):
+    """Fotografia imutável dos usuários, com os índices derivados já calculados"""
+    version: int
+    users: Mapping[str, Dict[str, str]]
+    metadata: Dict[str, Any]
+    records: Mapping[str, UserRecord]
+    # username -> informações públicas (o que get_current_user retorna)
+    principals: Mapping[str, Dict[str, str]]
+    # role -> usernames
+    roles: Mapping[str, Tuple[str, ...]]
+    # usernames ordenados, para paginação
+    usernames: Tuple[str, ...] = ()
+    loaded_at: Optional[float] = None
+
+    source = "memory"
+
+    def peek(self, username: str) -> Optional[UserRecord]:
+        return self.records.get(username)
+
+    def get(self, username: str) -> Optional[UserRecord]:
+        return self.records.get(username)
+
+    def list_users(self, limit: Optional[int] = None, after: Optional[str] = None) -> List[Dict[str, str]]:
+        start = bisect_right(self.usernames, after) if after is not None else 0
+        end = len(self.usernames) if limit is None else start + limit
+        return [self.principals[username] for username in self.usernames[start:end]]
+
+    def count(self) -> int:
+        return len(self.records)
+
+    def count_role(self, role: str) -> int:
+        return len(self.roles.get(role, ()))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"source": self.source, "version": self.version, "users": len(self.records)}
+
+
+def build_user_snapshot(version: int, users: Dict[str, Dict], metadata: Dict[str, Any]) -> UserSnapshot:
+    records = {username: build_user_record(username, user_data) for username, user_data in users.items()}
+    roles: Dict[str, List[str]] = {}
+    for username, record in records.items():
+        roles.setdefault(record.principal["role"], []).append(username)
+    return UserSnapshot(
+        version=version,
+        users=MappingProxyType(dict(users)),
+        metadata=dict(metadata or {}),
+        records=MappingProxyType(records),
+        principals=MappingProxyType({username: record.principal for username, record in records.items()}),
+        roles=MappingProxyType({role: tuple(names) for role, names in roles.items()}),
+        usernames=tuple(sorted(records)),
+        loaded_at=time.time(),
+    )
+
+
+class MongoUserStore(UserStore):
+    """
+    Usuários na coleção auth_users ({_id: username, password, role, description}).
+
+    Nada é carregado no startup: cada usuário é lido na primeira autenticação
+    e mantido em um cache LRU com TTL, que também guarda usernames
+    inexistentes (evita uma consulta por tentativa com usuário inválido).
+    Alterações no banco valem em até ttl segundos, ou na hora após
+    POST /admin/users/reload.
+    """
+    source = "mongodb"
+
+    def __init__(self, collection=None, max_entries: int = config.AUTH_USER_CACHE_SIZE,
+                 ttl: float = config.AUTH_USER_CACHE_TTL):
+        self._collection = collection
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # username -> (usuário ou None, expira_em)
+        self._entries: "OrderedDict[str, Tuple[Optional[UserRecord], float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def collection(self):
+        return self._collection if self._collection is not None else mongo_db.auth_users
+
+    def peek(self, username: str):
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(username)
+                self.hits += 1
+                return entry[0]
+            return NOT_CACHED
+
+    def get(self, username: str) -> Optional[UserRecord]:
+        record = self.peek(username)
+        if record is not NOT_CACHED:
+            return record
+        doc = self.collection.find_one({"_id": username}, USER_PROJECTION)
+        record = build_user_record(username, doc) if doc else None
+        with self._lock:
+            self.misses += 1
+            self._entries[username] = (record, time.monotonic() + self.ttl)
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return record
+
+    def list_users(self, limit: Optional[int] = None, after: Optional[str] = None) -> List[Dict[str, str]]:
+        query = {"_id": {"$gt": after}} if after is not None else {}
+        cursor = self.collection.find(query, {"role": 1, "description": 1}).sort("_id", 1)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        return [build_user_record(doc["_id"], doc).principal for doc in cursor]
+
+    def count(self) -> int:
+        # Metadado da coleção: não percorre os documentos
+        return self.collection.estimated_document_count()
+
+    def count_role(self, role: str) -> int:
+        return self.collection.count_documents({"role": role})
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "source": self.source,
+            "cached_users": len(self._entries),
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def import_users(path: str, collection=None, batch_size: int = 1000) -> int:
+    """Grava (upsert) no MongoDB os usuários de um arquivo no formato do users.json"""
+    with open(path, "r", encoding="utf-8") as file:
+        users = json.load(file).get("users", [])
+    collection = collection if collection is not None else mongo_db.auth_users
+    operations = [
+        ReplaceOne({"_id": user["username"]}, {
+            "password": user.get("password"),
+            "role": user.get("role", "user"),
+            "description": user.get("description", "")
+        }, upsert=True)
+        for user in users if user.get("username")
+    ]
+    for start in range(0, len(operations), batch_size):
+        collection.bulk_write(operations[start:start + batch_size], ordered=False)
+    return len(operations)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gerencia os usuários armazenados no MongoDB")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="importa um arquivo no formato do users.json")
+    import_parser.add_argument("path")
+    args = parser.parse_args(argv)
+    if args.command == "import":
+        print(f"✅ {import_users(args.path)} usuários importados para auth_users")
+
+
+if __name__ == "__main__":
+    main()
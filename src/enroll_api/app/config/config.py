@@ -1,23 +1,93 @@
 import os
+from app.config import mongo_settings
 
 class Config:
-    MONGO_USERNAME = os.getenv("MONGO_INITDB_ROOT_USERNAME")
-    MONGO_PASSWORD = os.getenv("MONGO_INITDB_ROOT_PASSWORD")
-    MONGO_HOST = os.getenv("MONGO_HOST", "enroll_api_mongo")
-    MONGO_PORT = os.getenv("MONGO_PORT", "27017")
-    MONGO_DB = os.getenv("MONGO_DB", "enroll_api")
-    
-    # Constrói URI com ou sem autenticação
-    if MONGO_USERNAME and MONGO_PASSWORD:
-        MONGO_URI = f"mongodb://{MONGO_USERNAME}:{MONGO_PASSWORD}@{MONGO_HOST}:{MONGO_PORT}/"
-    else:
-        MONGO_URI = f"mongodb://{MONGO_HOST}:{MONGO_PORT}/"
+    # Conexão com o MongoDB: variáveis lidas em mongo_settings (compartilhado com o worker)
+    MONGO_HOST = mongo_settings.MONGO_HOST
+    MONGO_PORT = mongo_settings.MONGO_PORT
+    MONGO_DB = mongo_settings.MONGO_DB
+    MONGO_URI = mongo_settings.MONGO_URI
+    # Pool, timeouts, compressão, read preference e write concern
+    MONGO_CLIENT_OPTIONS = mongo_settings.client_options("enroll_api")
+
+    # Aplica o registro de índices (app.db.indexes) no startup da API
+    MONGO_APPLY_INDEXES = os.getenv("MONGO_APPLY_INDEXES", "true").lower() == "true"
+
+    # Aquecimento no startup (readiness em GET /ready)
+    # Conexões abertas em cada pool do MongoDB (síncrono e assíncrono) antes de aceitar tráfego
+    STARTUP_MONGO_CONNECTIONS = int(os.getenv("STARTUP_MONGO_CONNECTIONS", 4))
+    # Tempo máximo de cada etapa do aquecimento
+    STARTUP_WARMUP_TIMEOUT = float(os.getenv("STARTUP_WARMUP_TIMEOUT", 10))
+    # Intervalo entre novas tentativas quando o aquecimento falha
+    STARTUP_RETRY_INTERVAL = float(os.getenv("STARTUP_RETRY_INTERVAL", 5))
+
+    # Sincronização do cache de age groups entre processos/nós
+    AGE_GROUP_WATCHER_ENABLED = os.getenv("AGE_GROUP_WATCHER_ENABLED", "true").lower() == "true"
+    # Intervalo de leitura do contador de versão quando change streams não estão disponíveis
+    AGE_GROUP_VERSION_POLL_INTERVAL = float(os.getenv("AGE_GROUP_VERSION_POLL_INTERVAL", 2.0))
+
+    # Número máximo de inscrições aceitas por POST /enrollments/batch
+    ENROLLMENT_BATCH_MAX_SIZE = int(os.getenv("ENROLLMENT_BATCH_MAX_SIZE", 1000))
+
+    # Número máximo de ids aceitos por POST /enrollments/status:batch
+    ENROLLMENT_STATUS_BATCH_MAX_SIZE = int(os.getenv("ENROLLMENT_STATUS_BATCH_MAX_SIZE", 1000))
+
+    # Tamanho máximo de página de GET /enrollments/
+    ENROLLMENT_LIST_MAX_LIMIT = int(os.getenv("ENROLLMENT_LIST_MAX_LIMIT", 500))
+
+    # Documentos lidos do MongoDB por lote na exportação de inscrições
+    ENROLLMENT_EXPORT_BATCH_SIZE = int(os.getenv("ENROLLMENT_EXPORT_BATCH_SIZE", 1000))
+
+    # Cache LRU de status: finais ficam até serem removidos pelo LRU, pendentes por um TTL curto
+    ENROLLMENT_STATUS_CACHE_SIZE = int(os.getenv("ENROLLMENT_STATUS_CACHE_SIZE", 10000))
+    ENROLLMENT_STATUS_CACHE_PENDING_TTL = float(os.getenv("ENROLLMENT_STATUS_CACHE_PENDING_TTL", 1.0))
+
+    # Long-poll (?wait=) e SSE de status de inscrições
+    ENROLLMENT_STATUS_MAX_WAIT = float(os.getenv("ENROLLMENT_STATUS_MAX_WAIT", 30))
+    ENROLLMENT_EVENTS_MAX_DURATION = float(os.getenv("ENROLLMENT_EVENTS_MAX_DURATION", 300))
+    ENROLLMENT_EVENTS_KEEPALIVE = float(os.getenv("ENROLLMENT_EVENTS_KEEPALIVE", 15))
+    # Intervalo da consulta única de status quando change streams não estão disponíveis
+    ENROLLMENT_STATUS_POLL_INTERVAL = float(os.getenv("ENROLLMENT_STATUS_POLL_INTERVAL", 0.5))
+
+    # Modo de publicação das inscrições:
+    #   direct - publica na fila durante a requisição
+    #   outbox - grava a inscrição com registro de outbox; o relay publica depois
+    ENROLLMENT_PUBLISH_MODE = os.getenv("ENROLLMENT_PUBLISH_MODE", "direct").lower()
+    # Executa o relay do outbox em uma thread do processo da API
+    OUTBOX_RELAY_ENABLED = os.getenv("OUTBOX_RELAY_ENABLED", "true").lower() == "true"
+    OUTBOX_RELAY_BATCH_SIZE = int(os.getenv("OUTBOX_RELAY_BATCH_SIZE", 100))
+    OUTBOX_RELAY_INTERVAL = float(os.getenv("OUTBOX_RELAY_INTERVAL", 0.5))
+    OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", 30))
+
+    # Reaper: republica inscrições pending cuja mensagem se perdeu
+    REAPER_ENABLED = os.getenv("REAPER_ENABLED", "true").lower() == "true"
+    # Tempo mínimo (segundos) desde a última entrada em pending para uma
+    # inscrição ser republicada; deve ser maior que o maior atraso de retry
+    # do worker e que a espera normal na fila
+    REAPER_PENDING_THRESHOLD = int(os.getenv("REAPER_PENDING_THRESHOLD", 300))
+    # Reserva de cada inscrição durante a republicação (evita que várias instâncias republiquem a mesma)
+    REAPER_LEASE_SECONDS = int(os.getenv("REAPER_LEASE_SECONDS", 30))
+    REAPER_INTERVAL = float(os.getenv("REAPER_INTERVAL", 60))
+    REAPER_BATCH_SIZE = int(os.getenv("REAPER_BATCH_SIZE", 100))
+    REAPER_MAX_PER_SWEEP = int(os.getenv("REAPER_MAX_PER_SWEEP", 1000))
+    # Com mais mensagens que isso prontas na fila principal a varredura é
+    # adiada: inscrições ainda enfileiradas não estão perdidas, e republicá-las
+    # só aumentaria o backlog que o supervisor dos workers está escoando
+    REAPER_MAX_QUEUE_DEPTH = int(os.getenv("REAPER_MAX_QUEUE_DEPTH", 0))
 
     RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "enroll_api_rabbitmq")
     RABBITMQ_PORT = int(os.getenv("RABBITMQ_PORT", 5672))
     RABBITMQ_QUEUE = os.getenv("RABBITMQ_QUEUE", "enrollment_queue")    
     RABBITMQ_USER = os.getenv("RABBITMQ_USER", "user")
     RABBITMQ_PASSWORD = os.getenv("RABBITMQ_PASSWORD", "password")
+    RABBITMQ_HEARTBEAT = int(os.getenv("RABBITMQ_HEARTBEAT", 60))
+
+    # Publicação via thread de I/O dedicada (fila thread-safe + publisher confirms)
+    RABBITMQ_PUBLISHER_THREAD = os.getenv("RABBITMQ_PUBLISHER_THREAD", "true").lower() == "true"
+    # Máximo de mensagens publicadas por ciclo do ioloop antes de processar confirms
+    RABBITMQ_PUBLISH_BATCH_SIZE = int(os.getenv("RABBITMQ_PUBLISH_BATCH_SIZE", 200))
+    # Tempo máximo de espera pela confirmação do broker (segundos)
+    RABBITMQ_PUBLISH_TIMEOUT = float(os.getenv("RABBITMQ_PUBLISH_TIMEOUT", 10.0))
 
     # Basic Auth Configuration
     # Caminho para o arquivo de usuários (relativo ao diretório da aplicação)
@@ -30,5 +100,39 @@ class Config:
     # Configuração para usuários múltiplos (formato: user1:pass1,user2:pass2)
     BASIC_AUTH_USERS = os.getenv("BASIC_AUTH_USERS", "admin:secret123,config:config123")
 
+    # Backend de usuários: file (users.json/variáveis de ambiente, em memória)
+    # ou mongo (coleção auth_users, carregada sob demanda)
+    AUTH_USER_STORE = os.getenv("AUTH_USER_STORE", "file").lower()
+    # Cache LRU de usuários lidos do MongoDB (inclui usernames inexistentes)
+    AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", 10000))
+    AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", 30))
+    # Paginação de GET /admin/users
+    AUTH_USERS_PAGE_SIZE = int(os.getenv("AUTH_USERS_PAGE_SIZE", 100))
+    AUTH_USERS_MAX_PAGE_SIZE = int(os.getenv("AUTH_USERS_MAX_PAGE_SIZE", 1000))
+
+    # Recarrega o arquivo de usuários quando ele muda, em cada processo da API
+    USERS_FILE_WATCH_ENABLED = os.getenv("USERS_FILE_WATCH_ENABLED", "true").lower() == "true"
+    # Usa notificações do sistema de arquivos (inotify, pacote watchfiles) se instaladas
+    USERS_FILE_INOTIFY = os.getenv("USERS_FILE_INOTIFY", "true").lower() == "true"
+    # Intervalo de verificação do mtime quando não há inotify
+    USERS_FILE_POLL_INTERVAL = float(os.getenv("USERS_FILE_POLL_INTERVAL", 2.0))
+
+    # Custo dos hashes bcrypt gerados por python -m app.auth.passwords
+    AUTH_BCRYPT_ROUNDS = int(os.getenv("AUTH_BCRYPT_ROUNDS", 12))
+    # Threads dedicadas à verificação de hashes (fora do event loop e do threadpool das rotas)
+    AUTH_VERIFY_WORKERS = int(os.getenv("AUTH_VERIFY_WORKERS", 4))
+    # Cache de credenciais já verificadas (0 desativa)
+    AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", 60))
+    AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 10000))
+    # Autentica no middleware ASGI (uma vez por requisição) em vez de nas dependências
+    AUTH_MIDDLEWARE_ENABLED = os.getenv("AUTH_MIDDLEWARE_ENABLED", "false").lower() == "true"
+    # Tokens Bearer emitidos por POST /auth/token. Com vários workers/nós o segredo
+    # precisa ser o mesmo em todos; obrigatório (pelo menos 32 bytes)
+    AUTH_TOKEN_SECRET = os.getenv("AUTH_TOKEN_SECRET", "")
+    # Apenas desenvolvimento/testes com um único processo: sem AUTH_TOKEN_SECRET,
+    # gera um segredo aleatório por processo em vez de recusar o startup
+    AUTH_TOKEN_EPHEMERAL_SECRET = os.getenv("AUTH_TOKEN_EPHEMERAL_SECRET", "false").lower() == "true"
+    AUTH_TOKEN_TTL = int(os.getenv("AUTH_TOKEN_TTL", 900))
+
 
 config = Config()
\ No newline at end of file
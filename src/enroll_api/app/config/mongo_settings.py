@@ -0,0 +1,80 @@
+"""
+Configuração do MongoDB compartilhada entre a API e o worker.
+
+Este módulo só depende da biblioteca padrão: o worker o importa diretamente
+(o arquivo é copiado/montado ao lado de worker.py), sem o pacote app.
+"""
+import importlib.util
+import os
+
+MONGO_USERNAME = os.getenv("MONGO_INITDB_ROOT_USERNAME")
+MONGO_PASSWORD = os.getenv("MONGO_INITDB_ROOT_PASSWORD")
+MONGO_HOST = os.getenv("MONGO_HOST", "enroll_api_mongo")
+MONGO_PORT = os.getenv("MONGO_PORT", "27017")
+MONGO_DB = os.getenv("MONGO_DB", "enroll_api")
+
+# MONGO_URI explícita tem precedência; senão é construída com ou sem autenticação
+if os.getenv("MONGO_URI"):
+    MONGO_URI = os.getenv("MONGO_URI")
+elif MONGO_USERNAME and MONGO_PASSWORD:
+    MONGO_URI = f"mongodb://{MONGO_USERNAME}:{MONGO_PASSWORD}@{MONGO_HOST}:{MONGO_PORT}/"
+else:
+    MONGO_URI = f"mongodb://{MONGO_HOST}:{MONGO_PORT}/"
+
+# Pool de conexões (por processo)
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+# Espera máxima por uma conexão livre do pool antes de falhar
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000))
+
+# Timeouts: com o MongoDB fora do ar a requisição falha em segundos, em vez
+# de esperar os 30s padrão da seleção de servidor
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 20000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+
+# Compressão do protocolo, em ordem de preferência. zstd e snappy dependem
+# dos pacotes zstandard e python-snappy; os indisponíveis são ignorados
+MONGO_COMPRESSORS = [
+    name.strip() for name in os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib").split(",") if name.strip()
+]
+
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+# Write concern: vazio usa o padrão do servidor; número ou "majority"
+MONGO_WRITE_CONCERN = os.getenv("MONGO_WRITE_CONCERN", "")
+MONGO_WRITE_CONCERN_TIMEOUT_MS = int(os.getenv("MONGO_WRITE_CONCERN_TIMEOUT_MS", 0))
+
+# Módulo necessário para cada compressor (zlib faz parte da biblioteca padrão)
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+
+def available_compressors(compressors=None):
+    """Compressores configurados cujo módulo está instalado"""
+    return [
+        name for name in (MONGO_COMPRESSORS if compressors is None else compressors)
+        if name in COMPRESSOR_MODULES and importlib.util.find_spec(COMPRESSOR_MODULES[name]) is not None
+    ]
+
+
+def client_options(app_name=None):
+    """Argumentos para MongoClient/AsyncMongoClient a partir da configuração"""
+    options = {
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "readPreference": MONGO_READ_PREFERENCE,
+    }
+    compressors = available_compressors()
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+    if MONGO_WRITE_CONCERN:
+        options["w"] = int(MONGO_WRITE_CONCERN) if MONGO_WRITE_CONCERN.isdigit() else MONGO_WRITE_CONCERN
+        if MONGO_WRITE_CONCERN_TIMEOUT_MS:
+            options["wTimeoutMS"] = MONGO_WRITE_CONCERN_TIMEOUT_MS
+    if app_name:
+        # Identifica o processo nos logs e no currentOp do servidor
+        options["appname"] = app_name
+    return options
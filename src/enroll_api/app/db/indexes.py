@@ -0,0 +1,123 @@
+"""
+Registro declarativo dos índices do MongoDB.
+
+Aplicado no startup da API e pela linha de comando:
+    python -m app.db.indexes [--check]
+
+Só os índices ausentes são criados, então pode ser executado a cada
+startup. Com --check, apenas informa o que falta (código de saída 1).
+"""
+import argparse
+from collections import namedtuple
+from typing import Any, Dict, List
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+from app.config.config import config
+from app.db.mongo import get_mongo_db
+
+# covers: consultas da aplicação atendidas pelo índice (usado no relatório)
+IndexSpec = namedtuple("IndexSpec", ["collection", "name", "keys", "options", "covers"])
+
+INDEXES: List[IndexSpec] = [
+    IndexSpec(
+        "auth_users", "role", [("role", 1)], {},
+        ["contagem de usuários por role (GET /admin/system/auth-status)"]
+    ),
+    IndexSpec(
+        "age_groups", "min_age_max_age", [("min_age", 1), ("max_age", 1)], {},
+        ["consultas administrativas de age groups por faixa de idade "
+         "(as inscrições resolvem o age group no índice em memória, sem consultar o banco)"]
+    ),
+    IndexSpec(
+        "enrollments", "created_at_id", [("created_at", 1), ("_id", 1)], {},
+        ["GET /enrollments/ sem filtros", "exportação por período de created_at"]
+    ),
+    IndexSpec(
+        "enrollments", "status_created_at_id", [("status", 1), ("created_at", 1), ("_id", 1)], {},
+        ["GET /enrollments/?status=", "reaper: pendentes gravadas sem pending_since"]
+    ),
+    IndexSpec(
+        "enrollments", "status_pending_since", [("status", 1), ("pending_since", 1)], {},
+        ["reaper: pendentes há mais tempo que o limite"]
+    ),
+    IndexSpec(
+        "enrollments", "age_group_created_at_id", [("age_group_id", 1), ("created_at", 1), ("_id", 1)], {},
+        ["GET /enrollments/?age_group_id=", "inscrições de um age group"]
+    ),
+    IndexSpec(
+        "enrollments", "cpf", [("cpf", 1)], {},
+        ["inscrições por CPF"]
+    ),
+    IndexSpec(
+        "enrollments", "outbox_queued_at", [("outbox.queued_at", 1)],
+        {"partialFilterExpression": {"outbox": {"$exists": True}}},
+        ["relay do outbox: mensagens ainda não publicadas"]
+    ),
+]
+
+
+def active_indexes() -> List[IndexSpec]:
+    """Índices do registro que valem para a configuração atual"""
+    # auth_users só é usada com AUTH_USER_STORE=mongo
+    return [spec for spec in INDEXES if spec.collection != "auth_users" or config.AUTH_USER_STORE == "mongo"]
+
+
+def _model(spec: IndexSpec) -> IndexModel:
+    return IndexModel(spec.keys, name=spec.name, **spec.options)
+
+
+def ensure_index(name: str, db=None):
+    """Cria um único índice do registro (usado por processos como o reaper e o relay)"""
+    spec = next(spec for spec in INDEXES if spec.name == name)
+    (db if db is not None else get_mongo_db())[spec.collection].create_indexes([_model(spec)])
+
+
+def apply_indexes(db=None, check_only: bool = False) -> List[Dict[str, Any]]:
+    """
+    Cria os índices do registro que ainda não existem e retorna um relatório
+    por índice: created, exists, missing (com check_only) ou error.
+    """
+    db = db if db is not None else get_mongo_db()
+    specs = active_indexes()
+    report = []
+    for collection in sorted({spec.collection for spec in specs}):
+        existing = set(db[collection].index_information())
+        for spec in (spec for spec in specs if spec.collection == collection):
+            entry = {"collection": collection, "name": spec.name, "covers": spec.covers}
+            if spec.name in existing:
+                entry["state"] = "exists"
+            elif check_only:
+                entry["state"] = "missing"
+            else:
+                try:
+                    db[collection].create_indexes([_model(spec)])
+                    entry["state"] = "created"
+                except OperationFailure as e:
+                    # Ex.: índice com as mesmas chaves e outro nome criado manualmente
+                    entry["state"] = "error"
+                    entry["error"] = str(e)
+            report.append(entry)
+    return report
+
+
+def print_report(report: List[Dict[str, Any]]):
+    for entry in report:
+        icon = {"created": "✅", "exists": "✔️", "missing": "⚠️", "error": "❌"}[entry["state"]]
+        print(f"{icon} {entry['collection']}.{entry['name']} ({entry['state']}): {'; '.join(entry['covers'])}")
+        if "error" in entry:
+            print(f"   {entry['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aplica os índices do MongoDB da Enrollment API")
+    parser.add_argument("--check", action="store_true", help="apenas lista os índices ausentes")
+    args = parser.parse_args()
+
+    report = apply_indexes(check_only=args.check)
+    print_report(report)
+    if any(entry["state"] in ("missing", "error") for entry in report):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,32 @@
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
+import asyncio
+from pymongo import MongoClient, AsyncMongoClient
+from pymongo.errors import ConnectionFailure, OperationFailure
 from app.config.config import config
 
+# Códigos de erro de servidores sem suporte a change streams (standalone,
+# $changeStream desconhecido, comando não suportado): só eles levam ao polling
+CHANGE_STREAM_UNSUPPORTED_CODES = {40573, 40324, 115}
+
 # Variáveis globais para conexão
 _client = None
 _mongo_db = None
 
+# Variáveis globais para a conexão assíncrona (uma por event loop)
+_async_client = None
+_async_client_loop = None
+# Fechamentos de clientes substituídos em andamento (mantém referência às tasks)
+_closing_tasks = set()
+
+def change_streams_unsupported(error: OperationFailure) -> bool:
+    """Se o erro indica um servidor sem change streams (os demais são transitórios)"""
+    return error.code in CHANGE_STREAM_UNSUPPORTED_CODES
+
 def get_mongo_client():
     """Obtém o cliente MongoDB, criando a conexão se necessário"""
     global _client
     if _client is None:
         try:
-            _client = MongoClient(config.MONGO_URI)
+            _client = MongoClient(config.MONGO_URI, **config.MONGO_CLIENT_OPTIONS)
             # Verifica se a conexão está funcionando
             _client.admin.command('ping')
             print("Conexão com MongoDB estabelecida com sucesso!")
@@ -28,6 +43,14 @@ def get_mongo_db():
         _mongo_db = client[config.MONGO_DB]
     return _mongo_db
 
+def close_mongo_client():
+    """Fecha o cliente síncrono, se existir"""
+    global _client, _mongo_db
+    if _client is not None:
+        _client.close()
+    _client = None
+    _mongo_db = None
+
 # Para compatibilidade com código existente
 @property
 def mongo_db():
@@ -42,5 +65,73 @@ class MongoDBProxy:
     @property
     def enrollments(self):
         return get_mongo_db().enrollments
+    
+    @property
+    def auth_users(self):
+        return get_mongo_db().auth_users
 
 mongo_db = MongoDBProxy()
+
+
+def get_async_mongo_client():
+    """
+    Obtém o cliente MongoDB assíncrono (driver nativo do PyMongo).
+
+    O cliente fica associado ao event loop em que foi criado; se for usado
+    a partir de outro loop (ex.: TestClient), um novo cliente é criado e o
+    anterior é fechado, para não deixar conexões abertas no pool antigo.
+    """
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        if _async_client is not None:
+            _schedule_close(_async_client, _async_client_loop, loop)
+        _async_client = AsyncMongoClient(config.MONGO_URI, **config.MONGO_CLIENT_OPTIONS)
+        _async_client_loop = loop
+    return _async_client
+
+async def _close_quietly(client):
+    try:
+        await client.close()
+    except Exception as e:
+        print(f"Erro ao fechar cliente MongoDB assíncrono anterior: {e}")
+
+def _schedule_close(client, client_loop, loop):
+    """Agenda o fechamento de um cliente criado em outro event loop"""
+    if client_loop is not None and client_loop.is_running():
+        # Loop original ainda ativo (outra thread): o fechamento roda nele
+        asyncio.run_coroutine_threadsafe(_close_quietly(client), client_loop)
+        return
+    # Loop original já terminou: fecha a partir do loop atual
+    task = loop.create_task(_close_quietly(client))
+    _closing_tasks.add(task)
+    task.add_done_callback(_closing_tasks.discard)
+
+def get_async_mongo_db():
+    """Obtém o banco de dados MongoDB para uso com await"""
+    return get_async_mongo_client()[config.MONGO_DB]
+
+async def close_async_mongo_client():
+    """Fecha o cliente assíncrono, se existir"""
+    global _async_client, _async_client_loop
+    if _async_client is not None:
+        await _async_client.close()
+    _async_client = None
+    _async_client_loop = None
+
+# Equivalente assíncrono do MongoDBProxy: as coleções retornadas não
+# bloqueiam o event loop e todas as operações devem ser aguardadas
+class AsyncMongoDBProxy:
+    @property
+    def age_groups(self):
+        return get_async_mongo_db().age_groups
+
+    @property
+    def enrollments(self):
+        return get_async_mongo_db().enrollments
+
+    @property
+    def cache_versions(self):
+        return get_async_mongo_db().cache_versions
+
+async_mongo_db = AsyncMongoDBProxy()
@@ -0,0 +1,283 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Optional, Tuple
+import pika
+from app.config.config import config
+
+
+class PublishNackError(Exception):
+    """O broker recusou (nack) a mensagem"""
+
+
+class RabbitMQPublisher:
+    """
+    Publicador com conexão própria, operada exclusivamente por uma thread de I/O.
+
+    Qualquer thread pode chamar publish(): a mensagem entra em uma fila
+    thread-safe e a thread de I/O a publica em lotes, em modo confirm.
+    Cada chamada recebe um Future resolvido quando o broker confirma (ack)
+    ou recusa (nack) a mensagem. O ioloop da conexão também atende os
+    heartbeats entre publicações.
+
+    Se a conexão cair, mensagens ainda não confirmadas voltam para a fila e
+    são republicadas após a reconexão (entrega at-least-once).
+    """
+
+    def __init__(self, host: str = config.RABBITMQ_HOST, port: int = config.RABBITMQ_PORT,
+                 queue_name: str = config.RABBITMQ_QUEUE,
+                 batch_size: int = config.RABBITMQ_PUBLISH_BATCH_SIZE,
+                 reconnect_delay: float = 5.0):
+        self.host = host
+        self.port = port
+        self.queue_name = queue_name
+        self.batch_size = batch_size
+        self.reconnect_delay = reconnect_delay
+        self._queue: "queue.Queue[Tuple[bytes, Future]]" = queue.Queue()
+        self._pending: Dict[int, Tuple[bytes, Future]] = {}
+        self._delivery_tag = 0
+        self._attempt = 0
+        self._connection = None
+        self._channel = None
+        self._ready = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.published = 0
+        self.confirmed = 0
+        self.nacked = 0
+        self.batches = 0
+
+    # ------------------------------------------------------------------
+    # API pública (thread-safe)
+    # ------------------------------------------------------------------
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="rabbitmq-publisher", daemon=True)
+            self._thread.start()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Aguarda a conexão e o canal em modo confirm estarem prontos"""
+        return self._ready.wait(timeout)
+
+    def publish(self, body) -> Future:
+        """Enfileira uma mensagem; o Future resolve com a confirmação do broker"""
+        if self._stopping.is_set():
+            raise RuntimeError("Publicador RabbitMQ encerrado")
+        future: Future = Future()
+        self._queue.put((body, future))
+        self._wake()
+        return future
+
+    def stop(self, timeout: float = 5.0):
+        """Aguarda as confirmações pendentes (até o timeout) e fecha a conexão"""
+        deadline = time.monotonic() + timeout
+        while (self._pending or not self._queue.empty()) and self._ready.is_set() \
+                and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self._stopping.set()
+        connection = self._connection
+        if connection is not None:
+            try:
+                connection.ioloop.add_callback_threadsafe(self._shutdown)
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(max(deadline - time.monotonic(), 0.1))
+            self._thread = None
+        self._fail_queued(RuntimeError("Publicador RabbitMQ encerrado"))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "connected": self._ready.is_set(),
+            "queued": self._queue.qsize(),
+            "awaiting_confirm": len(self._pending),
+            "published": self.published,
+            "confirmed": self.confirmed,
+            "nacked": self.nacked,
+            "batches": self.batches,
+        }
+
+    def _wake(self):
+        connection = self._connection
+        if connection is not None and self._ready.is_set():
+            try:
+                connection.ioloop.add_callback_threadsafe(self._drain)
+            except Exception:
+                # Reconexão em andamento: a fila é drenada quando o canal abrir
+                pass
+
+    # ------------------------------------------------------------------
+    # Thread de I/O
+    # ------------------------------------------------------------------
+
+    def _parameters(self) -> pika.ConnectionParameters:
+        self._attempt += 1
+        # Alterna entre conexão sem credenciais (desenvolvimento) e com credenciais
+        if self._attempt % 2:
+            return pika.ConnectionParameters(
+                host=self.host, port=self.port, heartbeat=config.RABBITMQ_HEARTBEAT
+            )
+        return pika.ConnectionParameters(
+            host=self.host,
+            port=self.port,
+            credentials=pika.PlainCredentials(config.RABBITMQ_USER, config.RABBITMQ_PASSWORD),
+            heartbeat=config.RABBITMQ_HEARTBEAT
+        )
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self._connection = pika.SelectConnection(
+                    parameters=self._parameters(),
+                    on_open_callback=self._on_connection_open,
+                    on_open_error_callback=self._on_connection_open_error,
+                    on_close_callback=self._on_connection_closed
+                )
+                self._connection.ioloop.start()
+            except Exception as e:
+                print(f"[API] Erro no publicador RabbitMQ: {e}")
+            self._connection = None
+            self._channel = None
+            self._ready.clear()
+            if not self._stopping.is_set():
+                self._stopping.wait(self.reconnect_delay)
+
+    def _shutdown(self):
+        self._ready.clear()
+        if self._connection is not None and not self._connection.is_closed:
+            self._connection.close()
+
+    def _on_connection_open(self, connection):
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_open_error(self, connection, error):
+        print(f"RabbitMQ não disponível para o publicador: {error}. Aguardando {self.reconnect_delay}s...")
+        connection.ioloop.stop()
+
+    def _on_connection_closed(self, connection, reason):
+        self._ready.clear()
+        self._channel = None
+        self._requeue_pending()
+        connection.ioloop.stop()
+
+    def _on_channel_open(self, channel):
+        self._channel = channel
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.confirm_delivery(
+            self._on_delivery_confirmation,
+            callback=lambda _frame: channel.queue_declare(
+                queue=self.queue_name, durable=True, callback=self._on_queue_declared
+            )
+        )
+
+    def _on_queue_declared(self, _frame):
+        # Nova sessão de canal: delivery tags recomeçam em 1
+        self._delivery_tag = 0
+        self._ready.set()
+        print("[API] Publicador RabbitMQ conectado (modo confirm)")
+        self._drain()
+
+    def _on_channel_closed(self, channel, reason):
+        self._ready.clear()
+        self._channel = None
+        self._requeue_pending()
+        if self._connection is not None and self._connection.is_open:
+            self._connection.close()
+
+    def _drain(self):
+        """Publica até batch_size mensagens da fila no canal atual"""
+        if self._channel is None or not self._ready.is_set():
+            return
+
+        count = 0
+        while count < self.batch_size:
+            try:
+                body, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if future.done() or (not future.running() and not future.set_running_or_notify_cancel()):
+                continue
+            try:
+                self._channel.basic_publish(
+                    exchange='',
+                    routing_key=self.queue_name,
+                    body=body,
+                    properties=pika.BasicProperties(delivery_mode=2)  # Torna a mensagem persistente
+                )
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            self._delivery_tag += 1
+            self._pending[self._delivery_tag] = (body, future)
+            count += 1
+
+        if count:
+            self.batches += 1
+            self.published += count
+        if not self._queue.empty() and self._connection is not None:
+            # Cede o ioloop (confirms e heartbeats) antes do próximo lote
+            self._connection.ioloop.call_later(0, self._drain)
+
+    def _on_delivery_confirmation(self, frame):
+        method = frame.method
+        acked = isinstance(method, pika.spec.Basic.Ack)
+        if method.multiple:
+            tags = [tag for tag in self._pending if tag <= method.delivery_tag]
+        else:
+            tags = [method.delivery_tag]
+
+        for tag in tags:
+            entry = self._pending.pop(tag, None)
+            if entry is None:
+                continue
+            _, future = entry
+            if acked:
+                self.confirmed += 1
+                future.set_result(True)
+            else:
+                self.nacked += 1
+                future.set_exception(PublishNackError(f"Mensagem {tag} recusada pelo broker"))
+
+    def _requeue_pending(self):
+        """Devolve à fila as mensagens que não receberam confirmação"""
+        pending = [self._pending[tag] for tag in sorted(self._pending)]
+        self._pending.clear()
+        for entry in pending:
+            self._queue.put(entry)
+
+    def _fail_queued(self, error: Exception):
+        while True:
+            try:
+                _, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if not future.done():
+                future.set_exception(error)
+
+
+# Instância global (criada sob demanda)
+_publisher: Optional[RabbitMQPublisher] = None
+_publisher_lock = threading.Lock()
+
+
+def get_publisher() -> RabbitMQPublisher:
+    """Obtém o publicador do processo, iniciando a thread de I/O se necessário"""
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None:
+            _publisher = RabbitMQPublisher()
+            _publisher.start()
+        return _publisher
+
+
+def close_publisher(timeout: float = 5.0):
+    """Encerra o publicador do processo, se existir"""
+    global _publisher
+    with _publisher_lock:
+        publisher, _publisher = _publisher, None
+    if publisher is not None:
+        publisher.stop(timeout)
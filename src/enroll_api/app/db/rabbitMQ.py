@@ -1,4 +1,6 @@
 from app.config.config import config
+from app.db.publisher import PublishNackError, get_publisher
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import pika
 import time
 import os
@@ -78,8 +80,54 @@ def get_rabbitmq_channel():
         reset_connections()
         raise
 
+def get_queue_depth():
+    """Mensagens prontas na fila principal; None se o RabbitMQ estiver indisponível"""
+    channel = None
+    try:
+        channel = get_rabbitmq_connection().channel()
+        frame = channel.queue_declare(queue=config.RABBITMQ_QUEUE, passive=True)
+        return frame.method.message_count
+    except Exception as e:
+        print(f"Erro ao ler a profundidade da fila: {e}")
+        reset_connections()
+        return None
+    finally:
+        try:
+            if channel is not None and channel.is_open:
+                channel.close()
+        except:
+            pass
+
+def _await_confirmation(future, timeout):
+    """
+    Aguarda o confirm de uma mensagem entregue ao publicador: True se
+    confirmada, False se certamente não enfileirada e None se desconhecido
+    """
+    try:
+        future.result(timeout=timeout)
+        return True
+    except FutureTimeoutError:
+        # Ainda na fila do publicador: cancelada, não é mais enviada.
+        # Já publicada (aguardando confirm): o resultado é desconhecido
+        return False if future.cancel() else None
+    except PublishNackError:
+        return False
+    except Exception:
+        # Ex.: publicador encerrado com a mensagem enviada e ainda sem confirm
+        return None
+
 def publish_message(message):
-    """Publica uma mensagem na fila com retry automático"""
+    """
+    Publica uma mensagem na fila com retry automático. Com o publicador em
+    thread, retorna como publish_messages: True, False ou None (desconhecido)
+    """
+    if config.RABBITMQ_PUBLISHER_THREAD:
+        # Aguarda a confirmação do broker; reconexões são tratadas pelo publicador
+        confirmed = _await_confirmation(get_publisher().publish(message), config.RABBITMQ_PUBLISH_TIMEOUT)
+        if confirmed is not True:
+            print(f"Confirmação do RabbitMQ não recebida em {config.RABBITMQ_PUBLISH_TIMEOUT}s ({confirmed})")
+        return confirmed
+    
     max_retries = 3
     for attempt in range(max_retries):
         try:
@@ -91,7 +139,7 @@ def publish_message(message):
                 properties=pika.BasicProperties(delivery_mode=2)  # Torna a mensagem persistente
             )
             print(f"[API] Mensagem publicada com sucesso na tentativa {attempt + 1}")
-            return
+            return True
         except Exception as e:
             print(f"Erro ao publicar mensagem (tentativa {attempt + 1}/{max_retries}): {e}")
             reset_connections()
@@ -99,5 +147,67 @@ def publish_message(message):
                 raise
             time.sleep(1)  # Aguarda antes de tentar novamente
 
+def publish_messages(messages):
+    """
+    Publica um lote de mensagens em uma única sessão de canal com
+    publisher confirms. Retorna, para cada mensagem, True se o broker
+    confirmou o recebimento, False se ela certamente não foi enfileirada
+    (rejeitada, não enviada ou cancelada antes do envio) e None se o
+    resultado é desconhecido (a mensagem ainda pode chegar à fila).
+    """
+    confirmed = [False] * len(messages)
+    if not messages:
+        return confirmed
+    
+    if config.RABBITMQ_PUBLISHER_THREAD:
+        return _publish_messages_threaded(messages)
+    
+    channel = None
+    try:
+        connection = get_rabbitmq_connection()
+        channel = connection.channel()
+        channel.queue_declare(queue=config.RABBITMQ_QUEUE, durable=True)
+        channel.confirm_delivery()
+        
+        for index, message in enumerate(messages):
+            # Um erro de conexão durante o envio deixa o resultado desconhecido
+            confirmed[index] = None
+            try:
+                channel.basic_publish(
+                    exchange='',
+                    routing_key=config.RABBITMQ_QUEUE,
+                    body=message,
+                    properties=pika.BasicProperties(delivery_mode=2),
+                    mandatory=True
+                )
+                confirmed[index] = True
+            except (pika.exceptions.NackError, pika.exceptions.UnroutableError) as e:
+                print(f"Mensagem {index} do lote não confirmada pelo broker: {e}")
+                confirmed[index] = False
+        
+        print(f"[API] Lote publicado: {confirmed.count(True)}/{len(messages)} mensagens confirmadas")
+    except Exception as e:
+        print(f"Erro ao publicar lote de mensagens: {e}")
+        reset_connections()
+    finally:
+        try:
+            if channel is not None and channel.is_open:
+                channel.close()
+        except:
+            pass
+    
+    return confirmed
 
-
+def _publish_messages_threaded(messages):
+    """Envia o lote ao publicador e aguarda as confirmações dentro do timeout"""
+    publisher = get_publisher()
+    futures = [publisher.publish(message) for message in messages]
+    deadline = time.monotonic() + config.RABBITMQ_PUBLISH_TIMEOUT
+    confirmed = []
+    for index, future in enumerate(futures):
+        confirmed.append(_await_confirmation(future, max(deadline - time.monotonic(), 0)))
+        if confirmed[-1] is not True:
+            print(f"Mensagem {index} do lote não confirmada pelo broker ({confirmed[-1]})")
+    
+    print(f"[API] Lote publicado: {confirmed.count(True)}/{len(messages)} mensagens confirmadas")
+    return confirmed
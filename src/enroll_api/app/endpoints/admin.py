@@ -1,22 +1,44 @@
-from fastapi import APIRouter, HTTPException, Depends
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.responses import StreamingResponse
 from app.auth.basic_auth import get_admin_user, auth_manager
-from typing import Dict, List
+from app.services.age_group_index import age_group_index
+from app.services.age_group_watcher import age_group_watcher
+from app.services.outbox import outbox_relay
+from app.services.reaper import pending_reaper
+from app.services.status_watcher import enrollment_status_watcher
+from app.services.users_watcher import users_file_watcher
+from app.services.enrollment import enrollment_status_cache
+from app.services.enrollment_listing import export_enrollments
+from app.config.config import config
+from typing import Dict, List, Optional
 
 router = APIRouter()
 
 @router.get("/users", response_model=List[Dict[str, str]])
-def list_users(current_user: Dict[str, str] = Depends(get_admin_user)):
-    """Lista todos os usuários (apenas admins)"""
-    return auth_manager.list_users()
+def list_users(
+    response: Response,
+    limit: int = Query(config.AUTH_USERS_PAGE_SIZE, ge=1, le=config.AUTH_USERS_MAX_PAGE_SIZE,
+                       description="Usuários por página"),
+    after: Optional[str] = Query(None, description="Último username da página anterior (header X-Next-After)"),
+    current_user: Dict[str, str] = Depends(get_admin_user)
+):
+    """Lista usuários em ordem de username, paginados (apenas admins)"""
+    users = auth_manager.list_users(limit=limit + 1, after=after)
+    if len(users) > limit:
+        users = users[:limit]
+        response.headers["X-Next-After"] = users[-1]["username"]
+    return users
 
 @router.get("/users/info")
 def get_users_info(current_user: Dict[str, str] = Depends(get_admin_user)):
     """Retorna informações detalhadas sobre os usuários e configuração"""
     return {
-        "users": auth_manager.list_users(),
-        "total_users": len(auth_manager.users),
+        # Primeira página; as demais via GET /admin/users
+        "users": auth_manager.list_users(limit=config.AUTH_USERS_PAGE_SIZE),
+        "total_users": auth_manager.count_users(),
         "metadata": auth_manager.users_metadata,
-        "source": "file" if auth_manager.users_metadata else "environment_variables"
+        "source": auth_manager.source
     }
 
 @router.post("/users/reload")
@@ -27,8 +49,8 @@ def reload_users(current_user: Dict[str, str] = Depends(get_admin_user)):
     if success:
         return {
             "message": "Usuários recarregados com sucesso",
-            "users": auth_manager.list_users(),
-            "total_users": len(auth_manager.users)
+            "users": auth_manager.list_users(limit=config.AUTH_USERS_PAGE_SIZE),
+            "total_users": auth_manager.count_users()
         }
     else:
         raise HTTPException(
@@ -41,10 +63,63 @@ def get_auth_status(current_user: Dict[str, str] = Depends(get_admin_user)):
     """Retorna status do sistema de autenticação"""
     return {
         "auth_system": "Basic Auth",
-        "users_source": "file" if auth_manager.users_metadata else "environment_variables",
-        "total_users": len(auth_manager.users),
-        "admin_users": len([u for u in auth_manager.users.values() if u["role"] == "admin"]),
-        "regular_users": len([u for u in auth_manager.users.values() if u["role"] == "user"]),
+        "users_source": auth_manager.source,
+        "total_users": auth_manager.count_users(),
+        "admin_users": auth_manager.store.count_role("admin"),
+        "regular_users": auth_manager.store.count_role("user"),
+        "user_store": auth_manager.store.stats(),
         "file_metadata": auth_manager.users_metadata,
+        "credential_cache": auth_manager.credential_cache.stats(),
+        "users_watcher": users_file_watcher.stats(),
         "current_user": current_user
-    } 
\ No newline at end of file
+    } 
+
+@router.get("/system/age-group-cache")
+def get_age_group_cache_status(current_user: Dict[str, str] = Depends(get_admin_user)):
+    """Retorna versão do índice local de age groups e atraso de sincronização"""
+    return {
+        "index": age_group_index.stats(),
+        "watcher": age_group_watcher.stats()
+    }
+
+@router.get("/system/outbox")
+def get_outbox_status(current_user: Dict[str, str] = Depends(get_admin_user)):
+    """Retorna o modo de publicação e o estado do relay do outbox"""
+    return {
+        "publish_mode": config.ENROLLMENT_PUBLISH_MODE,
+        "relay": outbox_relay.stats()
+    }
+
+@router.get("/system/reaper")
+def get_reaper_status(current_user: Dict[str, str] = Depends(get_admin_user)):
+    """Retorna quantas inscrições pendentes foram recuperadas pelo reaper"""
+    return pending_reaper.stats()
+
+@router.get("/system/status-events")
+def get_status_events_status(current_user: Dict[str, str] = Depends(get_admin_user)):
+    """Retorna o estado do observador compartilhado de status (SSE/long-poll)"""
+    return enrollment_status_watcher.stats()
+
+@router.get("/system/status-cache")
+def get_status_cache_stats(current_user: Dict[str, str] = Depends(get_admin_user)):
+    """Retorna acertos, falhas e consultas agrupadas do cache de status"""
+    return enrollment_status_cache.stats()
+
+# Tipo de conteúdo de cada formato de exportação
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+@router.get("/enrollments/export")
+def export_enrollments_stream(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson ou csv"),
+    status: Optional[str] = Query(None, description="Filtra pelo status"),
+    age_group_id: Optional[str] = Query(None, description="Filtra pelo age group"),
+    created_from: Optional[datetime] = Query(None, description="Criadas a partir desta data (inclusive)"),
+    created_to: Optional[datetime] = Query(None, description="Criadas antes desta data"),
+    current_user: Dict[str, str] = Depends(get_admin_user)
+):
+    """Exporta inscrições em streaming, com os mesmos filtros da listagem (apenas admins)"""
+    return StreamingResponse(
+        export_enrollments(format, status, age_group_id, created_from, created_to),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=enrollments.{format}"}
+    )
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends
+from app.auth.basic_auth import get_basic_user
+from app.auth.tokens import create_access_token
+from app.config.config import config
+from app.models.auth import AccessToken
+from typing import Dict
+
+router = APIRouter()
+
+@router.post("/token", response_model=AccessToken)
+def issue_access_token(current_user: Dict[str, str] = Depends(get_basic_user)):
+    """
+    Troca credenciais Basic Auth por um token Bearer de curta duração.
+    Requisições com o token não verificam a senha nem consultam os usuários.
+    """
+    token, _ = create_access_token(current_user)
+    return AccessToken(access_token=token, expires_in=config.AUTH_TOKEN_TTL)
@@ -1,8 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
-from app.models.enrollment import EnrollmentCreate, EnrollmentStatus
-from app.services.enrollment import publish_enrollment, get_enrollment_status
-from app.auth.basic_auth import get_current_user
-from typing import Dict
+import asyncio
+import json
+from fastapi import APIRouter, HTTPException, Depends, Body, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from app.models.enrollment import (
+    EnrollmentCreate, EnrollmentStatus, EnrollmentBatchResult, EnrollmentStatusBatchRequest, EnrollmentStatusBatchResult,
+    EnrollmentPage
+)
+from app.services.enrollment import publish_enrollment, publish_enrollments_batch, get_enrollment_status, get_enrollment_statuses
+from app.services.enrollment_listing import list_enrollments
+from app.services.status_watcher import enrollment_status_watcher, TERMINAL_STATUSES
+from app.auth.basic_auth import get_current_user, get_admin_user
+from app.config.config import config
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Any, Optional
 
 router = APIRouter()
 
@@ -15,13 +26,157 @@ def create_enrollment(
     enrollment_id = publish_enrollment(enrollment)
     return {"id": enrollment_id, "status": "pending"}
 
+@router.get("/", response_model=EnrollmentPage)
+def get_enrollments(
+    status: Optional[str] = Query(None, description="Filtra pelo status"),
+    age_group_id: Optional[str] = Query(None, description="Filtra pelo age group"),
+    created_from: Optional[datetime] = Query(None, description="Criadas a partir desta data (inclusive)"),
+    created_to: Optional[datetime] = Query(None, description="Criadas antes desta data"),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    limit: int = Query(50, ge=1, le=config.ENROLLMENT_LIST_MAX_LIMIT),
+    current_user: Dict[str, str] = Depends(get_admin_user)
+):
+    """
+    Lista enrollments da mais recente para a mais antiga (apenas admins).
+    Para a próxima página, repita a consulta com cursor=next_cursor.
+    """
+    return list_enrollments(status, age_group_id, created_from, created_to, cursor, limit)
+
+@router.post("/batch", response_model=EnrollmentBatchResult)
+def create_enrollments_batch(
+    enrollments: List[Dict[str, Any]] = Body(...),
+    current_user: Dict[str, str] = Depends(get_current_user)
+):
+    """
+    Cria vários enrollments em uma única requisição (requer autenticação).
+    Cada item é validado individualmente e o resultado informa o id ou o erro
+    de cada posição do lote.
+    """
+    if not enrollments:
+        raise HTTPException(status_code=400, detail="O lote de inscrições está vazio")
+    if len(enrollments) > config.ENROLLMENT_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"O lote excede o limite de {config.ENROLLMENT_BATCH_MAX_SIZE} inscrições"
+        )
+    return publish_enrollments_batch(enrollments)
+
+@router.post("/status:batch", response_model=EnrollmentStatusBatchResult)
+def get_status_batch(
+    request: EnrollmentStatusBatchRequest,
+    current_user: Dict[str, str] = Depends(get_current_user)
+):
+    """
+    Busca o status de vários enrollments em uma única requisição (requer
+    autenticação). Ids inexistentes aparecem com status nulo e em not_found.
+    """
+    if not request.ids:
+        raise HTTPException(status_code=400, detail="A lista de ids está vazia")
+    if len(request.ids) > config.ENROLLMENT_STATUS_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"A consulta excede o limite de {config.ENROLLMENT_STATUS_BATCH_MAX_SIZE} ids"
+        )
+    return get_enrollment_statuses(request.ids)
+
 @router.get("/{enrollment_id}", response_model=EnrollmentStatus)
-def get_status(
+async def get_status(
     enrollment_id: str,
+    wait: float = Query(
+        0, ge=0, le=config.ENROLLMENT_STATUS_MAX_WAIT,
+        description="Long-poll: segundos a aguardar por uma mudança de status"
+    ),
     current_user: Dict[str, str] = Depends(get_current_user)
 ):
-    """Busca o status de um enrollment (requer autenticação)"""
-    status = get_enrollment_status(enrollment_id)
+    """
+    Busca o status de um enrollment (requer autenticação).
+    Com ?wait=N, responde assim que o status mudar ou após N segundos.
+    """
+    if not wait:
+        status = await run_in_threadpool(get_enrollment_status, enrollment_id)
+        if not status:
+            raise HTTPException(status_code=404, detail="Enrollment not found")
+        return status
+    
+    # Inscreve antes da leitura para não perder uma mudança entre as duas;
+    # a leitura ignora o cache para não partir de um status desatualizado
+    queue = enrollment_status_watcher.subscribe(enrollment_id)
+    try:
+        status = await run_in_threadpool(get_enrollment_status, enrollment_id, use_cache=False)
+        if not status:
+            raise HTTPException(status_code=404, detail="Enrollment not found")
+        if status.status in TERMINAL_STATUSES:
+            return status
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                event = await asyncio.wait_for(queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if event["status"] != status.status:
+                return _status_from_event(status, event)
+        return status
+    finally:
+        enrollment_status_watcher.unsubscribe(enrollment_id, queue)
+
+@router.get("/{enrollment_id}/events")
+async def stream_status_events(
+    enrollment_id: str,
+    current_user: Dict[str, str] = Depends(get_current_user)
+):
+    """
+    Stream SSE com o status atual e cada mudança de status do enrollment
+    (requer autenticação). Encerra após um status final.
+    """
+    queue = enrollment_status_watcher.subscribe(enrollment_id)
+    try:
+        status = await run_in_threadpool(get_enrollment_status, enrollment_id, use_cache=False)
+    except Exception:
+        enrollment_status_watcher.unsubscribe(enrollment_id, queue)
+        raise
     if not status:
+        enrollment_status_watcher.unsubscribe(enrollment_id, queue)
         raise HTTPException(status_code=404, detail="Enrollment not found")
-    return status 
\ No newline at end of file
+    
+    return StreamingResponse(
+        _status_events(enrollment_id, status, queue),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _status_from_event(current: EnrollmentStatus, event: Dict[str, Any]) -> EnrollmentStatus:
+    return EnrollmentStatus(
+        id=current.id,
+        status=event["status"],
+        message=event.get("message"),
+        age_group_id=current.age_group_id
+    )
+
+def _sse_event(status: EnrollmentStatus) -> str:
+    return f"event: status\ndata: {json.dumps(status.model_dump())}\n\n"
+
+async def _status_events(enrollment_id: str, status: EnrollmentStatus, queue: asyncio.Queue) -> AsyncIterator[str]:
+    try:
+        yield _sse_event(status)
+        if status.status in TERMINAL_STATUSES:
+            return
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + config.ENROLLMENT_EVENTS_MAX_DURATION
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                event = await asyncio.wait_for(queue.get(), min(remaining, config.ENROLLMENT_EVENTS_KEEPALIVE))
+            except asyncio.TimeoutError:
+                # Comentário SSE: mantém proxies e o cliente com a conexão aberta
+                yield ": keep-alive\n\n"
+                continue
+            if event["status"] == status.status:
+                continue
+            status = _status_from_event(status, event)
+            yield _sse_event(status)
+            if status.status in TERMINAL_STATUSES:
+                return
+    finally:
+        enrollment_status_watcher.unsubscribe(enrollment_id, queue)
@@ -1,16 +1,78 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
+from fastapi.responses import JSONResponse
 from app.endpoints import age_groups
 from app.endpoints import enrollment
 from app.endpoints import admin
+from app.endpoints import auth
 from app.auth.basic_auth import get_current_user
+from app.auth.middleware import BasicAuthMiddleware
+from app.db.mongo import close_async_mongo_client, close_mongo_client
+from app.db.publisher import close_publisher
+from app.db.rabbitMQ import reset_connections
+from app.services.age_group_watcher import age_group_watcher
+from app.services.outbox import outbox_relay
+from app.services.reaper import pending_reaper
+from app.services.status_watcher import enrollment_status_watcher
+from app.services.users_watcher import users_file_watcher
+from app.services.warmup import startup_warmup
+from app.config.config import config
 from typing import Dict
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Inicialização e encerramento da aplicação"""
+    # Conecta MongoDB e RabbitMQ, abre o pool, carrega o índice de age groups
+    # e aplica os índices do MongoDB antes de aceitar requisições
+    if await startup_warmup.run():
+        print(f"✅ API pronta: {startup_warmup.stats()['components']}")
+    else:
+        # Aceita requisições (carregando o que faltar sob demanda), mas /ready
+        # responde 503 até o aquecimento completar em background
+        print("⚠️ Aquecimento incompleto no startup; tentando novamente em background")
+        startup_warmup.start_retrying()
+    
+    # Mantém o índice coerente com escritas feitas em outros processos/nós
+    if config.AGE_GROUP_WATCHER_ENABLED:
+        age_group_watcher.start()
+    
+    # Recarrega o users.json alterado em todos os workers, sem reinício
+    if config.USERS_FILE_WATCH_ENABLED and config.AUTH_USER_STORE == "file":
+        users_file_watcher.start()
+    
+    # Em modo outbox as mensagens são publicadas fora do caminho da requisição
+    if config.ENROLLMENT_PUBLISH_MODE == "outbox" and config.OUTBOX_RELAY_ENABLED:
+        outbox_relay.start()
+    
+    # Republica inscrições pendentes cuja mensagem se perdeu
+    if config.REAPER_ENABLED:
+        pending_reaper.start()
+    
+    yield
+    
+    await startup_warmup.stop()
+    await users_file_watcher.stop()
+    pending_reaper.stop()
+    outbox_relay.stop()
+    # Aguarda confirmações pendentes antes de fechar a conexão com o RabbitMQ
+    close_publisher()
+    await age_group_watcher.stop()
+    await enrollment_status_watcher.stop()
+    await close_async_mongo_client()
+    reset_connections()
+    close_mongo_client()
+
 app = FastAPI(
     title="Enrollment API",
     description="API para gerenciamento de inscrições com autenticação Basic Auth",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Autentica uma vez por requisição; as dependências só leem o usuário do escopo
+if config.AUTH_MIDDLEWARE_ENABLED:
+    app.add_middleware(BasicAuthMiddleware)
+
 @app.get("/")
 def read_root():
     """Endpoint público de health check"""
@@ -20,6 +82,12 @@ def read_root():
         "auth": "Basic Auth required for protected endpoints"
     }
 
+@app.get("/ready")
+def readiness():
+    """Endpoint público de prontidão: 200 apenas após o aquecimento do startup"""
+    status = startup_warmup.stats()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
 @app.get("/me")
 def get_current_user_info(current_user: Dict[str, str] = Depends(get_current_user)):
     """Retorna informações do usuário autenticado"""
@@ -31,3 +99,4 @@ def get_current_user_info(current_user: Dict[str, str] = Depends(get_current_use
 app.include_router(age_groups.router, prefix="/age-groups", tags=["age-groups"])
 app.include_router(enrollment.router, prefix="/enrollments", tags=["enrollments"])
 app.include_router(admin.router, prefix="/admin", tags=["admin"])
+app.include_router(auth.router, prefix="/auth", tags=["auth"])
@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+
+
+class AccessToken(BaseModel):
+    access_token: str = Field(..., description="Token para o header Authorization: Bearer <token>")
+    token_type: str = Field("bearer", description="Tipo do token")
+    expires_in: int = Field(..., description="Validade do token em segundos")
@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel, Field, field_validator, model_validator
 from app.utils.validators import validate_cpf_format, format_cpf, validate_name, validate_age, validate_enrollment_data
 
@@ -50,4 +51,40 @@ class EnrollmentStatus(BaseModel):
     id: str
     status: str
     message: str | None = None
-    age_group_id: str | None = None 
\ No newline at end of file
+    age_group_id: str | None = None 
+
+class EnrollmentListItem(BaseModel):
+    id: str
+    name: str | None = None
+    age: int | None = None
+    status: str
+    message: str | None = None
+    age_group_id: str | None = None
+    created_at: datetime | None = None
+
+class EnrollmentPage(BaseModel):
+    items: list[EnrollmentListItem]
+    # None quando não há mais páginas
+    next_cursor: str | None = None
+
+class EnrollmentStatusBatchRequest(BaseModel):
+    ids: list[str] = Field(..., description="Ids das inscrições a consultar")
+
+class EnrollmentStatusBatchResult(BaseModel):
+    total: int
+    found: int
+    # id -> status; None para ids inexistentes
+    statuses: dict[str, EnrollmentStatus | None]
+    not_found: list[str]
+
+class EnrollmentBatchItemResult(BaseModel):
+    index: int
+    id: str | None = None
+    status: str | None = None
+    error: str | None = None
+
+class EnrollmentBatchResult(BaseModel):
+    total: int
+    accepted: int
+    rejected: int
+    results: list[EnrollmentBatchItemResult]
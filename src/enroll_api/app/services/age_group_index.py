@@ -0,0 +1,135 @@
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+# Limites de idade aceitos por AgeGroupCreate/AgeGroupUpdate
+MIN_AGE = 0
+MAX_AGE = 120
+
+
+@dataclass(frozen=True)
+class AgeGroupSnapshot:
+    """Fotografia imutável do mapeamento idade → age group"""
+    version: int
+    slots: Tuple[Optional[Mapping[str, Any]], ...]
+    total_groups: int = 0
+    loaded_at: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.version > 0
+
+
+def build_slots(docs: Iterable[Dict[str, Any]]) -> Tuple[Tuple[Optional[Mapping[str, Any]], ...], int]:
+    """
+    Monta a tabela com uma posição por idade (0 a 120).
+    Em caso de sobreposição prevalece o primeiro documento na ordem natural
+    da coleção, o mesmo resultado que o find_one por faixa retornava.
+    """
+    slots = [None] * (MAX_AGE - MIN_AGE + 1)
+    total = 0
+    for doc in docs:
+        total += 1
+        entry = MappingProxyType({
+            "_id": doc["_id"],
+            "min_age": doc["min_age"],
+            "max_age": doc["max_age"],
+        })
+        start = max(doc["min_age"], MIN_AGE)
+        end = min(doc["max_age"], MAX_AGE)
+        for age in range(start, end + 1):
+            if slots[age - MIN_AGE] is None:
+                slots[age - MIN_AGE] = entry
+    return tuple(slots), total
+
+
+class AgeGroupIndex:
+    """
+    Índice em memória (por processo) para resolver o age group de uma idade
+    em O(1), sem consultar o MongoDB.
+
+    Cada recarga gera um novo snapshot que substitui o anterior com uma única
+    atribuição; leitores nunca observam uma tabela parcialmente construída.
+    O número de versão é crescente: uma recarga iniciada antes de outra mais
+    recente nunca sobrescreve o resultado dela.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._floor = 0
+        self._snapshot = AgeGroupSnapshot(version=0, slots=(None,) * (MAX_AGE - MIN_AGE + 1))
+
+    @property
+    def snapshot(self) -> AgeGroupSnapshot:
+        return self._snapshot
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._snapshot.loaded
+
+    def _begin_refresh(self) -> int:
+        with self._lock:
+            self._sequence += 1
+            return self._sequence
+
+    def _install(self, sequence: int, docs: Iterable[Dict[str, Any]]) -> bool:
+        slots, total = build_slots(docs)
+        snapshot = AgeGroupSnapshot(
+            version=sequence,
+            slots=slots,
+            total_groups=total,
+            loaded_at=time.time(),
+        )
+        with self._lock:
+            if sequence <= max(self._snapshot.version, self._floor):
+                return False
+            self._snapshot = snapshot
+        return True
+
+    def load(self, docs: Iterable[Dict[str, Any]]) -> bool:
+        """Instala um snapshot a partir de documentos já lidos"""
+        return self._install(self._begin_refresh(), list(docs))
+
+    def refresh(self, collection) -> bool:
+        """Recarrega o índice usando uma coleção do driver síncrono"""
+        sequence = self._begin_refresh()
+        docs = list(collection.find({}, {"min_age": 1, "max_age": 1}))
+        return self._install(sequence, docs)
+
+    async def refresh_async(self, collection) -> bool:
+        """Recarrega o índice usando uma coleção do driver assíncrono"""
+        sequence = self._begin_refresh()
+        docs = [doc async for doc in collection.find({}, {"min_age": 1, "max_age": 1})]
+        return self._install(sequence, docs)
+
+    def invalidate(self):
+        """Marca o índice como não carregado, forçando recarga na próxima consulta"""
+        with self._lock:
+            # Recargas iniciadas antes da invalidação não podem mais ser instaladas
+            self._floor = self._sequence
+            self._snapshot = AgeGroupSnapshot(
+                version=0, slots=(None,) * (MAX_AGE - MIN_AGE + 1)
+            )
+
+    def lookup(self, age: int) -> Optional[Mapping[str, Any]]:
+        """Retorna o age group que contém a idade, ou None"""
+        if not isinstance(age, int) or age < MIN_AGE or age > MAX_AGE:
+            return None
+        return self._snapshot.slots[age - MIN_AGE]
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "loaded": snapshot.loaded,
+            "version": snapshot.version,
+            "total_groups": snapshot.total_groups,
+            "covered_ages": sum(1 for slot in snapshot.slots if slot is not None),
+            "loaded_at": snapshot.loaded_at,
+        }
+
+
+# Instância global do índice
+age_group_index = AgeGroupIndex()
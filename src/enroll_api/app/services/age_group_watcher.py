@@ -0,0 +1,139 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from pymongo.errors import OperationFailure
+from app.config.config import config
+from app.db.mongo import async_mongo_db, change_streams_unsupported
+from app.services.age_group_index import age_group_index, AgeGroupIndex
+
+# Documento em cache_versions usado quando change streams não estão disponíveis
+VERSION_DOCUMENT_ID = "age_groups"
+
+# Intervalo antes de tentar reabrir o change stream após erro de conexão
+RETRY_DELAY = 5.0
+
+
+async def bump_age_group_version(collection):
+    """Incrementa o contador de versão lido pelos nós em modo de polling"""
+    await collection.update_one(
+        {"_id": VERSION_DOCUMENT_ID},
+        {"$inc": {"version": 1}, "$currentDate": {"updated_at": True}},
+        upsert=True
+    )
+
+
+def _lag_seconds(changed_at: Optional[datetime]) -> Optional[float]:
+    """Calcula o atraso entre a escrita no banco e a recarga local"""
+    if changed_at is None:
+        return None
+    if changed_at.tzinfo is None:
+        changed_at = changed_at.replace(tzinfo=timezone.utc)
+    return max(time.time() - changed_at.timestamp(), 0.0)
+
+
+class AgeGroupWatcher:
+    """
+    Mantém o índice local de age groups coerente com escritas feitas por
+    outros processos e nós.
+
+    Usa um change stream na coleção age_groups; se o servidor não suportar
+    change streams (ex.: MongoDB standalone), faz polling de um documento
+    contador em cache_versions, cujo custo é um find_one por _id.
+    """
+
+    def __init__(self, index: AgeGroupIndex = age_group_index,
+                 poll_interval: float = config.AGE_GROUP_VERSION_POLL_INTERVAL):
+        self.index = index
+        self.poll_interval = poll_interval
+        self.mode: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._refreshes = 0
+        self._last_lag: Optional[float] = None
+        self._max_lag: Optional[float] = None
+        self._last_error: Optional[str] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _refresh(self, changed_at: Optional[datetime] = None):
+        await self.index.refresh_async(async_mongo_db.age_groups)
+        self._refreshes += 1
+        lag = _lag_seconds(changed_at)
+        if lag is not None:
+            self._last_lag = lag
+            self._max_lag = lag if self._max_lag is None else max(self._max_lag, lag)
+
+    async def run(self):
+        while True:
+            try:
+                await self._watch_change_stream()
+            except OperationFailure as e:
+                if not change_streams_unsupported(e):
+                    # Falha transitória (ex.: failover, stream invalidado): reabre o stream
+                    self._last_error = str(e)
+                    print(f"Erro no change stream de age groups ({e.code}). Nova tentativa em {RETRY_DELAY}s...")
+                    await asyncio.sleep(RETRY_DELAY)
+                    continue
+                print(f"⚠️ Change streams indisponíveis ({e.code}); usando contador de versão")
+                await self._poll_version()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._last_error = str(e)
+                print(f"Erro no watcher de age groups: {e}. Nova tentativa em {RETRY_DELAY}s...")
+                await asyncio.sleep(RETRY_DELAY)
+
+    async def _watch_change_stream(self):
+        async with await async_mongo_db.age_groups.watch() as stream:
+            self.mode = "change_stream"
+            # Cobre escritas ocorridas antes da abertura do stream
+            await self._refresh()
+            async for change in stream:
+                await self._refresh(change.get("wallTime"))
+
+    async def _poll_version(self):
+        self.mode = "version_poll"
+        last_version = None
+        while True:
+            try:
+                doc = await async_mongo_db.cache_versions.find_one({"_id": VERSION_DOCUMENT_ID})
+                version = doc.get("version") if doc else None
+                if version != last_version:
+                    # Na primeira leitura não há escrita a medir, apenas sincroniza
+                    changed_at = doc.get("updated_at") if doc and last_version is not None else None
+                    await self._refresh(changed_at)
+                    last_version = version
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._last_error = str(e)
+                print(f"Erro ao verificar versão dos age groups: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "running": self._task is not None and not self._task.done(),
+            "refreshes": self._refreshes,
+            "last_lag_ms": round(self._last_lag * 1000, 1) if self._last_lag is not None else None,
+            "max_lag_ms": round(self._max_lag * 1000, 1) if self._max_lag is not None else None,
+            # Pior caso esperado de desatualização no modo atual
+            "staleness_bound_ms": self.poll_interval * 1000 if self.mode == "version_poll" else None,
+            "last_error": self._last_error,
+        }
+
+
+# Instância global do watcher
+age_group_watcher = AgeGroupWatcher()
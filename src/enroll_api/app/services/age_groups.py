@@ -1,41 +1,60 @@
-from app.db.mongo import mongo_db
+from app.db.mongo import async_mongo_db
 from app.models.age_group import AgeGroup, AgeGroupCreate, AgeGroupUpdate
+from app.services.age_group_index import age_group_index
+from app.services.age_group_watcher import bump_age_group_version
 from bson import ObjectId
 
+async def refresh_age_group_index():
+    """Reconstrói o índice idade → age group após uma escrita"""
+    try:
+        # Sinaliza a escrita aos nós que não recebem change streams
+        await bump_age_group_version(async_mongo_db.cache_versions)
+    except Exception as e:
+        print(f"Erro ao incrementar versão dos age groups: {e}")
+    try:
+        await age_group_index.refresh_async(async_mongo_db.age_groups)
+    except Exception as e:
+        # A escrita já foi feita; força recarga na próxima consulta
+        print(f"Erro ao recarregar índice de age groups: {e}")
+        age_group_index.invalidate()
+
 async def create_age_group(age_group: AgeGroupCreate):
     age_group_dict = age_group.model_dump()
-    result = mongo_db.age_groups.insert_one(age_group_dict)
-    created_age_group = mongo_db.age_groups.find_one({"_id": result.inserted_id})
+    result = await async_mongo_db.age_groups.insert_one(age_group_dict)
+    created_age_group = await async_mongo_db.age_groups.find_one({"_id": result.inserted_id})
     created_age_group["id"] = str(created_age_group.pop("_id"))
+    await refresh_age_group_index()
     return created_age_group
 
 async def get_age_group(age_group_id: str):
-    result = mongo_db.age_groups.find_one({"_id": ObjectId(age_group_id)})
+    result = await async_mongo_db.age_groups.find_one({"_id": ObjectId(age_group_id)})
     if result:
         result["id"] = str(result.pop("_id"))
     return result
 
 async def get_all_age_groups():
-    result = mongo_db.age_groups.find()
     age_groups = []
-    for doc in result:
+    async for doc in async_mongo_db.age_groups.find():
         doc["id"] = str(doc.pop("_id"))
         age_groups.append(doc)
     return age_groups
 
 async def update_age_group(age_group_id: str, age_group: AgeGroupUpdate):
-    result = mongo_db.age_groups.update_one(
-        {"_id": ObjectId(age_group_id)}, 
+    result = await async_mongo_db.age_groups.update_one(
+        {"_id": ObjectId(age_group_id)},
         {"$set": age_group.model_dump()}
     )
     if result.modified_count > 0:
-        updated = mongo_db.age_groups.find_one({"_id": ObjectId(age_group_id)})
+        updated = await async_mongo_db.age_groups.find_one({"_id": ObjectId(age_group_id)})
         updated["id"] = str(updated.pop("_id"))
+        await refresh_age_group_index()
         return updated
     return None
 
 async def delete_age_group(age_group_id: str):
-    result = mongo_db.age_groups.delete_one({"_id": ObjectId(age_group_id)})
+    result = await async_mongo_db.age_groups.delete_one({"_id": ObjectId(age_group_id)})
+    if result.deleted_count > 0:
+        await refresh_age_group_index()
     return result.deleted_count
 
 
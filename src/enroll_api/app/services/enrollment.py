@@ -1,17 +1,30 @@
 import uuid
 import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
 from app.db.mongo import mongo_db
-from app.db.rabbitMQ import publish_message
-from app.models.enrollment import EnrollmentCreate, EnrollmentStatus
+from app.db.rabbitMQ import publish_message, publish_messages
+from app.services.age_group_index import age_group_index
+from app.services.outbox import outbox_relay, new_outbox_record
+from app.config.config import config
+from app.models.enrollment import (
+    EnrollmentCreate, EnrollmentStatus, EnrollmentBatchItemResult, EnrollmentBatchResult, EnrollmentStatusBatchResult
+)
 from fastapi import HTTPException
 
 # Função para verificar se a idade está em um age group válido
 def find_valid_age_group(age: int):
-    age_group = mongo_db.age_groups.find_one({
-        "min_age": {"$lte": age},
-        "max_age": {"$gte": age}
-    })
-    return age_group
+    # Consulta O(1) no índice em memória; o banco só é lido se o índice
+    # ainda não foi carregado (ex.: falha na carga durante o startup)
+    if not age_group_index.is_loaded:
+        age_group_index.refresh(mongo_db.age_groups)
+    return age_group_index.lookup(age)
 
 # Função para publicar inscrição na fila
 def publish_enrollment(enrollment: EnrollmentCreate) -> str:
@@ -23,20 +36,274 @@ def publish_enrollment(enrollment: EnrollmentCreate) -> str:
             detail=f"Idade {enrollment.age} não está dentro de nenhum grupo de idade válido"
         )
     
-    enrollment_id = str(uuid.uuid4())
+    data = build_enrollment_data(enrollment, age_group)
+    enrollment_id = data["id"]
+    
+    if config.ENROLLMENT_PUBLISH_MODE == "outbox":
+        # A publicação fica a cargo do relay; a requisição depende só do MongoDB
+        created_at = datetime.now(timezone.utc)
+        mongo_db.enrollments.insert_one({
+            "_id": enrollment_id, **data, "created_at": created_at, "pending_since": created_at,
+            "outbox": new_outbox_record()
+        })
+        outbox_relay.notify()
+        return enrollment_id
+    
+    # pending_since permite ao reaper encontrar inscrições cuja mensagem se perdeu
+    created_at = datetime.now(timezone.utc)
+    mongo_db.enrollments.insert_one({"_id": enrollment_id, **data, "created_at": created_at, "pending_since": created_at})
+    if publish_message(json.dumps(data)) is False:
+        # A mensagem certamente não foi enfileirada: sem a inscrição, uma nova
+        # tentativa do cliente não gera duplicata
+        mongo_db.enrollments.delete_one({"_id": enrollment_id})
+        raise HTTPException(status_code=503, detail="Fila de inscrições indisponível no momento, tente novamente")
+    # Sem confirmação (None) a mensagem ainda pode chegar à fila: a inscrição
+    # fica pending e o reaper a republica se ela se perdeu
+    return enrollment_id
+
+def build_enrollment_data(enrollment: EnrollmentCreate, age_group) -> Dict[str, Any]:
+    """Monta o documento/mensagem de uma nova inscrição pendente"""
     data = enrollment.model_dump()
-    data["id"] = enrollment_id
+    data["id"] = str(uuid.uuid4())
     data["status"] = "pending"
     data["age_group_id"] = str(age_group["_id"])  # Adiciona referência do age group
+    return data
+
+def _format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in err['loc']) or 'body'}: {err['msg']}"
+        for err in error.errors()
+    )
+
+# Função para publicar um lote de inscrições na fila
+def publish_enrollments_batch(items: List[Any]) -> EnrollmentBatchResult:
+    """
+    Valida, persiste e publica um lote de inscrições.
+    Cada item é tratado de forma independente: falhas de validação, de
+    escrita ou de publicação rejeitam apenas o próprio item.
+    """
+    results: Dict[int, EnrollmentBatchItemResult] = {}
+    pending: List[tuple] = []  # (índice no lote, dados da inscrição)
     
-    mongo_db.enrollments.insert_one({"_id": enrollment_id, **data})
-    publish_message(json.dumps(data))
-    return enrollment_id
+    # Validação e resolução de age groups em uma única passada
+    for index, item in enumerate(items):
+        try:
+            enrollment = EnrollmentCreate.model_validate(item)
+        except ValidationError as e:
+            results[index] = EnrollmentBatchItemResult(index=index, error=_format_validation_error(e))
+            continue
+        
+        age_group = find_valid_age_group(enrollment.age)
+        if not age_group:
+            results[index] = EnrollmentBatchItemResult(
+                index=index,
+                error=f"Idade {enrollment.age} não está dentro de nenhum grupo de idade válido"
+            )
+            continue
+        
+        pending.append((index, build_enrollment_data(enrollment, age_group)))
+    
+    use_outbox = config.ENROLLMENT_PUBLISH_MODE == "outbox"
+    
+    # Persistência com um único insert_many não ordenado
+    if pending:
+        failed_positions = {}
+        created_at = datetime.now(timezone.utc)
+        try:
+            mongo_db.enrollments.insert_many(
+                [
+                    {"_id": data["id"], **data, "created_at": created_at, "pending_since": created_at,
+                     **({"outbox": new_outbox_record()} if use_outbox else {})}
+                    for _, data in pending
+                ],
+                ordered=False
+            )
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                failed_positions[write_error["index"]] = write_error.get("errmsg", "Erro ao salvar inscrição")
+        
+        for position, message in failed_positions.items():
+            index, _ = pending[position]
+            results[index] = EnrollmentBatchItemResult(index=index, error=message)
+        pending = [entry for position, entry in enumerate(pending) if position not in failed_positions]
+    
+    # Em modo outbox o relay publica; a inscrição já está garantida no banco
+    if pending and use_outbox:
+        for index, data in pending:
+            results[index] = EnrollmentBatchItemResult(index=index, id=data["id"], status="pending")
+        outbox_relay.notify()
+        pending = []
+    
+    # Publicação de todas as mensagens em uma sessão de canal com confirms
+    if pending:
+        confirmed = publish_messages([json.dumps(data) for _, data in pending])
+        unpublished_ids = []
+        for (index, data), ok in zip(pending, confirmed):
+            if ok is False:
+                unpublished_ids.append(data["id"])
+                results[index] = EnrollmentBatchItemResult(index=index, error="Falha ao publicar inscrição na fila")
+            else:
+                # Sem confirmação (ok None) a mensagem ainda pode chegar à fila: a
+                # inscrição fica pending e o reaper a republica se ela se perdeu
+                results[index] = EnrollmentBatchItemResult(index=index, id=data["id"], status="pending")
+        
+        # Remove apenas inscrições cuja mensagem certamente não foi enviada
+        if unpublished_ids:
+            mongo_db.enrollments.delete_many({"_id": {"$in": unpublished_ids}})
+    
+    ordered_results = [results[index] for index in sorted(results)]
+    accepted = sum(1 for result in ordered_results if result.id)
+    return EnrollmentBatchResult(
+        total=len(items),
+        accepted=accepted,
+        rejected=len(items) - accepted,
+        results=ordered_results
+    )
+
+# Status que nunca mudam depois de gravados. "failed" fica de fora: o replay
+# da DLQ devolve a inscrição para pending
+IMMUTABLE_STATUSES = ("processed",)
+
+class EnrollmentStatusCache:
+    """
+    Cache LRU limitado de status de inscrições.
+
+    Status imutáveis ficam em cache até serem removidos pelo LRU; os demais
+    expiram após um TTL curto. Consultas simultâneas do mesmo id que não
+    estão em cache são agrupadas em uma única leitura (singleflight).
+    """
+
+    def __init__(self, max_entries: int = config.ENROLLMENT_STATUS_CACHE_SIZE,
+                 pending_ttl: float = config.ENROLLMENT_STATUS_CACHE_PENDING_TTL):
+        self.max_entries = max_entries
+        self.pending_ttl = pending_ttl
+        self._lock = threading.Lock()
+        # id -> (status, expira_em); expira_em None = sem expiração
+        self._entries: "OrderedDict[str, Tuple[EnrollmentStatus, Optional[float]]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
 
-def get_enrollment_status(enrollment_id: str) -> EnrollmentStatus:
-    doc = mongo_db.enrollments.find_one({"_id": enrollment_id})
+    def get_or_load(self, enrollment_id: str,
+                    loader: Callable[[str], Optional[EnrollmentStatus]]) -> Optional[EnrollmentStatus]:
+        with self._lock:
+            entry = self._entries.get(enrollment_id)
+            if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+                self._entries.move_to_end(enrollment_id)
+                self.hits += 1
+                return entry[0]
+            future = self._inflight.get(enrollment_id)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[enrollment_id] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            status = loader(enrollment_id)
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(enrollment_id, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._inflight.pop(enrollment_id, None)
+            # Inexistentes não são guardados: o id pode ser gravado logo em seguida
+            if status is not None:
+                self._store(enrollment_id, status)
+        future.set_result(status)
+        return status
+
+    def get_many(self, enrollment_ids: List[str]) -> Dict[str, EnrollmentStatus]:
+        """Retorna os status válidos em cache; os ausentes contam como falha"""
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for enrollment_id in enrollment_ids:
+                entry = self._entries.get(enrollment_id)
+                if entry is not None and (entry[1] is None or entry[1] > now):
+                    self._entries.move_to_end(enrollment_id)
+                    found[enrollment_id] = entry[0]
+            self.hits += len(found)
+            self.misses += len(enrollment_ids) - len(found)
+        return found
+
+    def put_many(self, statuses: List[EnrollmentStatus]):
+        with self._lock:
+            for status in statuses:
+                self._store(status.id, status)
+
+    def _store(self, enrollment_id: str, status: EnrollmentStatus):
+        expires_at = None if status.status in IMMUTABLE_STATUSES else time.monotonic() + self.pending_ttl
+        self._entries[enrollment_id] = (status, expires_at)
+        self._entries.move_to_end(enrollment_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+# Instância global do cache de status
+enrollment_status_cache = EnrollmentStatusCache()
+
+def get_enrollment_status(enrollment_id: str, use_cache: bool = True) -> EnrollmentStatus:
+    if use_cache:
+        return enrollment_status_cache.get_or_load(enrollment_id, _load_enrollment_status)
+    return _load_enrollment_status(enrollment_id)
+
+def get_enrollment_statuses(enrollment_ids: List[str]) -> EnrollmentStatusBatchResult:
+    """
+    Busca o status de vários enrollments: os que não estão em cache são lidos
+    com uma única consulta $in. Ids repetidos são consultados uma vez.
+    """
+    ids = list(dict.fromkeys(enrollment_ids))
+    statuses = enrollment_status_cache.get_many(ids)
+    missing = [enrollment_id for enrollment_id in ids if enrollment_id not in statuses]
+    if missing:
+        loaded = [
+            _status_from_doc(doc)
+            for doc in mongo_db.enrollments.find({"_id": {"$in": missing}}, STATUS_PROJECTION)
+        ]
+        enrollment_status_cache.put_many(loaded)
+        statuses.update((status.id, status) for status in loaded)
+
+    not_found = [enrollment_id for enrollment_id in ids if enrollment_id not in statuses]
+    return EnrollmentStatusBatchResult(
+        total=len(ids),
+        found=len(ids) - len(not_found),
+        statuses={enrollment_id: statuses.get(enrollment_id) for enrollment_id in ids},
+        not_found=not_found
+    )
+
+# Apenas os campos de EnrollmentStatus
+STATUS_PROJECTION = {"status": 1, "message": 1, "age_group_id": 1}
+
+def _load_enrollment_status(enrollment_id: str) -> Optional[EnrollmentStatus]:
+    doc = mongo_db.enrollments.find_one({"_id": enrollment_id}, STATUS_PROJECTION)
     if not doc:
         return None
+    return _status_from_doc(doc)
+
+def _status_from_doc(doc: Dict[str, Any]) -> EnrollmentStatus:
     return EnrollmentStatus(
         id=doc["_id"], 
         status=doc.get("status", "unknown"), 
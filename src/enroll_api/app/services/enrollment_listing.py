@@ -0,0 +1,161 @@
+import base64
+import binascii
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from fastapi import HTTPException
+from app.config.config import config
+from app.db.mongo import mongo_db
+from app.models.enrollment import EnrollmentListItem, EnrollmentPage
+
+# Campos retornados na listagem (o CPF fica de fora)
+LISTING_PROJECTION = {"name": 1, "age": 1, "status": 1, "message": 1, "age_group_id": 1, "created_at": 1}
+
+# Colunas da exportação (apenas admins; inclui o CPF para conciliação)
+EXPORT_FIELDS = ["id", "name", "age", "cpf", "status", "message", "age_group_id", "created_at", "processed_at"]
+EXPORT_PROJECTION = {field: 1 for field in EXPORT_FIELDS if field != "id"}
+
+
+def encode_cursor(created_at: Optional[datetime], enrollment_id: str) -> str:
+    """Cursor opaco com a chave (created_at, _id) do último item da página"""
+    key = [created_at.isoformat() if created_at else None, enrollment_id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, enrollment_id = json.loads(base64.urlsafe_b64decode(padded))
+        return (datetime.fromisoformat(created_at) if created_at else None), str(enrollment_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Datas sem fuso são tratadas como UTC, como as gravadas pela API
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def build_listing_filter(status: Optional[str] = None, age_group_id: Optional[str] = None,
+                         created_from: Optional[datetime] = None, created_to: Optional[datetime] = None,
+                         cursor: Optional[str] = None) -> Dict[str, Any]:
+    query: Dict[str, Any] = {}
+    if status is not None:
+        query["status"] = status
+    if age_group_id is not None:
+        query["age_group_id"] = age_group_id
+    if created_from is not None or created_to is not None:
+        query["created_at"] = {}
+        if created_from is not None:
+            query["created_at"]["$gte"] = _as_utc(created_from)
+        if created_to is not None:
+            query["created_at"]["$lt"] = _as_utc(created_to)
+
+    if cursor is not None:
+        # Keyset em ordem decrescente: itens com chave menor que a do cursor.
+        # Inscrições antigas sem created_at vêm por último (null < datas)
+        last_created_at, last_id = decode_cursor(cursor)
+        if last_created_at is None:
+            query["$or"] = [{"created_at": None, "_id": {"$lt": last_id}}]
+        else:
+            query["$or"] = [
+                {"created_at": {"$lt": last_created_at}},
+                {"created_at": last_created_at, "_id": {"$lt": last_id}},
+                {"created_at": None},
+            ]
+    return query
+
+
+def list_enrollments(status: Optional[str] = None, age_group_id: Optional[str] = None,
+                     created_from: Optional[datetime] = None, created_to: Optional[datetime] = None,
+                     cursor: Optional[str] = None, limit: int = 50) -> EnrollmentPage:
+    """
+    Lista inscrições da mais recente para a mais antiga, com paginação por
+    cursor (keyset em created_at, _id): o custo de cada página não depende
+    de quantas páginas vieram antes. Cada filtro tem um índice composto
+    terminado em (created_at, _id) no registro de app.db.indexes.
+    """
+    query = build_listing_filter(status, age_group_id, created_from, created_to, cursor)
+    # Um item a mais indica se há próxima página
+    docs: List[Dict[str, Any]] = list(
+        mongo_db.enrollments.find(query, LISTING_PROJECTION)
+        .sort([("created_at", -1), ("_id", -1)])
+        .limit(limit + 1)
+    )
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1].get("created_at"), docs[-1]["_id"])
+
+    return EnrollmentPage(
+        items=[
+            EnrollmentListItem(
+                id=doc["_id"],
+                name=doc.get("name"),
+                age=doc.get("age"),
+                status=doc.get("status", "unknown"),
+                message=doc.get("message"),
+                age_group_id=doc.get("age_group_id"),
+                created_at=doc.get("created_at")
+            )
+            for doc in docs
+        ],
+        next_cursor=next_cursor
+    )
+
+
+def _export_row(doc: Dict[str, Any]) -> Dict[str, Any]:
+    row = {field: doc.get(field) for field in EXPORT_FIELDS}
+    row["id"] = doc["_id"]
+    for field in ("created_at", "processed_at"):
+        if isinstance(row[field], datetime):
+            row[field] = row[field].isoformat()
+    return row
+
+
+def export_enrollments(export_format: str = "ndjson", status: Optional[str] = None,
+                       age_group_id: Optional[str] = None, created_from: Optional[datetime] = None,
+                       created_to: Optional[datetime] = None,
+                       batch_size: int = config.ENROLLMENT_EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """
+    Gera a exportação em NDJSON ou CSV direto do cursor do MongoDB, em
+    ordem (created_at, _id). Cada pedaço gerado corresponde a um lote do
+    cursor: a memória usada não depende do tamanho do resultado.
+    """
+    query = build_listing_filter(status, age_group_id, created_from, created_to)
+    cursor = (
+        mongo_db.enrollments.find(query, EXPORT_PROJECTION)
+        .sort([("created_at", 1), ("_id", 1)])
+        .batch_size(batch_size)
+    )
+
+    buffer = io.StringIO()
+    writer = None
+    if export_format == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+
+    rows = 0
+    try:
+        for doc in cursor:
+            row = _export_row(doc)
+            if writer is not None:
+                writer.writerow(row)
+            else:
+                buffer.write(json.dumps(row, ensure_ascii=False))
+                buffer.write("\n")
+            rows += 1
+            if rows % batch_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        # Cliente desconectado no meio da exportação: libera o cursor no servidor
+        cursor.close()
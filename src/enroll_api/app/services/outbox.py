@@ -0,0 +1,162 @@
+import json
+import os
+import socket
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from app.config.config import config
+from app.db.indexes import ensure_index
+from app.db.mongo import mongo_db
+from app.db.rabbitMQ import publish_messages
+from app.models.enrollment import EnrollmentCreate
+
+# O registro de outbox fica embutido no próprio documento da inscrição:
+# a escrita é atômica mesmo no MongoDB standalone (sem transações)
+OUTBOX_FIELD = "outbox"
+
+# Campos da mensagem, os mesmos montados por build_enrollment_data; campos de
+# controle do documento (created_at, leases, outbox, reaper) ficam de fora
+MESSAGE_FIELDS = (*EnrollmentCreate.model_fields, "id", "status", "age_group_id")
+
+
+def new_outbox_record() -> Dict[str, Any]:
+    """Registro de outbox gravado junto com a inscrição"""
+    return {"queued_at": datetime.now(timezone.utc), "attempts": 0}
+
+
+def outbox_message(doc: Dict[str, Any]) -> str:
+    """Reconstrói a mensagem da fila a partir do documento da inscrição"""
+    data = {field: doc[field] for field in MESSAGE_FIELDS if field in doc}
+    return json.dumps(data, default=str)
+
+
+class OutboxRelay:
+    """
+    Publica na fila as inscrições gravadas em modo outbox.
+
+    Cada ciclo reserva um lote com um lease (vários relays podem rodar em
+    paralelo sem publicar a mesma linha duas vezes), publica tudo com
+    publisher confirms e remove o registro de outbox das mensagens
+    confirmadas. Mensagens não confirmadas voltam a ficar disponíveis
+    quando o lease expira.
+    """
+
+    def __init__(self, batch_size: int = config.OUTBOX_RELAY_BATCH_SIZE,
+                 interval: float = config.OUTBOX_RELAY_INTERVAL,
+                 lease_seconds: int = config.OUTBOX_LEASE_SECONDS):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{id(self)}"
+        self.published = 0
+        self.failed = 0
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def notify(self):
+        """Acorda o relay após novas inscrições (evita esperar o intervalo)"""
+        self._wakeup.set()
+
+    def _claim_batch(self) -> List[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        available = {
+            OUTBOX_FIELD: {"$exists": True},
+            "$or": [
+                {f"{OUTBOX_FIELD}.lease_until": {"$exists": False}},
+                {f"{OUTBOX_FIELD}.lease_until": {"$lt": now}},
+            ],
+        }
+        candidates = [
+            doc["_id"] for doc in mongo_db.enrollments.find(available, {"_id": 1})
+            .sort(f"{OUTBOX_FIELD}.queued_at", 1)
+            .limit(self.batch_size)
+        ]
+        if not candidates:
+            return []
+
+        # O filtro é reavaliado no update: linhas reservadas por outro relay são ignoradas
+        mongo_db.enrollments.update_many(
+            {"_id": {"$in": candidates}, **available},
+            {"$set": {
+                f"{OUTBOX_FIELD}.lease_owner": self.owner,
+                f"{OUTBOX_FIELD}.lease_until": now + timedelta(seconds=self.lease_seconds),
+            }, "$inc": {f"{OUTBOX_FIELD}.attempts": 1}}
+        )
+        return list(mongo_db.enrollments.find(
+            {"_id": {"$in": candidates}, f"{OUTBOX_FIELD}.lease_owner": self.owner}
+        ))
+
+    def relay_batch(self) -> int:
+        """Publica um lote do outbox; retorna quantas mensagens foram confirmadas"""
+        docs = self._claim_batch()
+        if not docs:
+            return 0
+
+        confirmed = publish_messages([outbox_message(doc) for doc in docs])
+        sent_ids = [doc["_id"] for doc, ok in zip(docs, confirmed) if ok]
+        if sent_ids:
+            mongo_db.enrollments.update_many(
+                {"_id": {"$in": sent_ids}, f"{OUTBOX_FIELD}.lease_owner": self.owner},
+                {"$unset": {OUTBOX_FIELD: ""}}
+            )
+
+        self.published += len(sent_ids)
+        self.failed += len(docs) - len(sent_ids)
+        return len(sent_ids)
+
+    def ensure_index(self):
+        """Índice parcial: cobre apenas inscrições ainda não publicadas"""
+        ensure_index("outbox_queued_at")
+
+    def run_forever(self):
+        """Loop do relay; termina quando stop() é chamado"""
+        print(f"[OUTBOX] Relay iniciado ({self.owner})")
+        try:
+            self.ensure_index()
+        except Exception as e:
+            print(f"[OUTBOX] Não foi possível criar índice do outbox: {e}")
+        while not self._stopping.is_set():
+            try:
+                sent = self.relay_batch()
+            except Exception as e:
+                print(f"[OUTBOX] Erro ao publicar lote do outbox: {e}")
+                sent = 0
+            # Lote cheio indica backlog: continua sem esperar
+            if sent < self.batch_size:
+                self._wakeup.wait(self.interval)
+                self._wakeup.clear()
+        print("[OUTBOX] Relay encerrado")
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self.run_forever, name="outbox-relay", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "published": self.published,
+            "failed": self.failed,
+            "pending": mongo_db.enrollments.count_documents({OUTBOX_FIELD: {"$exists": True}}),
+        }
+
+
+# Instância global do relay
+outbox_relay = OutboxRelay()
+
+
+if __name__ == "__main__":
+    # Relay como processo separado: python -m app.services.outbox
+    try:
+        outbox_relay.run_forever()
+    except KeyboardInterrupt:
+        print("[OUTBOX] Parando relay...")
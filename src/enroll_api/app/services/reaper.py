@@ -0,0 +1,207 @@
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from app.config.config import config
+from app.db.indexes import ensure_index
+from app.db.mongo import mongo_db
+from app.db.rabbitMQ import get_queue_depth, publish_messages
+from app.services.outbox import OUTBOX_FIELD, outbox_message
+
+# Campos de controle do reaper, que não fazem parte da mensagem
+REAPER_FIELDS = ("reaped_at", "reap_token", "reap_lease_until", "republish_count")
+
+
+class StalePendingReaper:
+    """
+    Republica inscrições que continuam pending depois de um limite de tempo,
+    cuja mensagem se perdeu (falha na publicação ou perda de dados no broker).
+
+    O limite conta a partir de pending_since, gravado em toda entrada em
+    pending (criação, nova tentativa do worker, replay da DLQ): inscrições
+    aguardando em uma fila de retry não são republicadas.
+
+    Cada varredura reserva lotes limitados com um lease curto por inscrição
+    (várias instâncias podem rodar em paralelo sem republicar a mesma) e
+    registra em reaped_at quando o broker confirmou a republicação; a
+    inscrição só volta a ser elegível depois de mais um intervalo de limite.
+    Sem confirmação, ela volta a ser elegível quando o lease vence.
+    Inscrições em modo outbox ficam com o relay. Mensagens duplicadas são
+    descartadas pelo worker ao reivindicar a inscrição.
+
+    Enquanto a fila principal tiver mais de max_queue_depth mensagens
+    prontas, a varredura é adiada: durante um backlog as inscrições antigas
+    ainda estão na fila, e republicá-las só geraria duplicatas.
+    """
+
+    def __init__(self, threshold_seconds: int = config.REAPER_PENDING_THRESHOLD,
+                 batch_size: int = config.REAPER_BATCH_SIZE,
+                 max_per_sweep: int = config.REAPER_MAX_PER_SWEEP,
+                 interval: float = config.REAPER_INTERVAL,
+                 lease_seconds: int = config.REAPER_LEASE_SECONDS,
+                 max_queue_depth: int = config.REAPER_MAX_QUEUE_DEPTH):
+        self.threshold_seconds = threshold_seconds
+        self.batch_size = batch_size
+        self.max_per_sweep = max_per_sweep
+        self.interval = interval
+        self.lease_seconds = lease_seconds
+        self.max_queue_depth = max_queue_depth
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{id(self)}"
+        self.sweeps = 0
+        self.recovered = 0
+        self.failed = 0
+        self.skipped = 0
+        self.last_sweep_at: Optional[datetime] = None
+        self.last_recovered = 0
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stale_filter(self, now: datetime) -> Dict[str, Any]:
+        cutoff = now - timedelta(seconds=self.threshold_seconds)
+        return {
+            "status": "pending",
+            OUTBOX_FIELD: {"$exists": False},
+            "$and": [
+                {"$or": [
+                    # Índice (status, pending_since)
+                    {"pending_since": {"$lt": cutoff}},
+                    # Inscrições gravadas antes de pending_since existir
+                    {"pending_since": {"$exists": False}, "created_at": {"$lt": cutoff}},
+                ]},
+                {"$or": [
+                    {"reaped_at": {"$exists": False}},
+                    {"reaped_at": {"$lt": cutoff}},
+                ]},
+                {"$or": [
+                    {"reap_lease_until": {"$exists": False}},
+                    {"reap_lease_until": {"$lt": now}},
+                ]},
+            ],
+        }
+
+    def _claim_batch(self, now: datetime) -> List[Dict[str, Any]]:
+        stale = self._stale_filter(now)
+        # Mais antigas em pending primeiro
+        candidates = [
+            doc["_id"] for doc in mongo_db.enrollments.find(stale, {"_id": 1})
+            .sort("pending_since", 1)
+            .limit(self.batch_size)
+        ]
+        if not candidates:
+            return []
+
+        # O filtro é reavaliado no update: inscrições reservadas por outra instância são ignoradas
+        token = uuid.uuid4().hex
+        mongo_db.enrollments.update_many(
+            {"_id": {"$in": candidates}, **stale},
+            {"$set": {
+                "reap_token": token,
+                "reap_lease_until": now + timedelta(seconds=self.lease_seconds),
+            }, "$inc": {"republish_count": 1}}
+        )
+        return list(mongo_db.enrollments.find(
+            {"_id": {"$in": candidates}, "reap_token": token},
+            {field: 0 for field in REAPER_FIELDS}
+        ))
+
+    def _mark_republished(self, ids: List[str], now: datetime):
+        """Libera o lease; só a próxima janela de limite torna a inscrição elegível de novo"""
+        mongo_db.enrollments.update_many(
+            {"_id": {"$in": ids}},
+            {"$set": {"reaped_at": now}, "$unset": {"reap_lease_until": ""}}
+        )
+
+    def sweep(self) -> int:
+        """Republica inscrições pendentes antigas; retorna quantas foram confirmadas pelo broker"""
+        now = datetime.now(timezone.utc)
+        depth = get_queue_depth()
+        if depth is None or depth > self.max_queue_depth:
+            # Backlog na fila (ou broker indisponível): nada a republicar por ora
+            self.skipped += 1
+            if depth is not None:
+                print(f"[REAPER] Fila com {depth} mensagens prontas: varredura adiada")
+            return 0
+        recovered = 0
+        processed = 0
+        while processed < self.max_per_sweep:
+            docs = self._claim_batch(now)
+            if not docs:
+                break
+            processed += len(docs)
+
+            confirmed = publish_messages([outbox_message(doc) for doc in docs])
+            sent_ids = [doc["_id"] for doc, ok in zip(docs, confirmed) if ok]
+            if sent_ids:
+                self._mark_republished(sent_ids, now)
+            sent = len(sent_ids)
+            recovered += sent
+            # As não confirmadas voltam a ser elegíveis quando o lease vencer
+            self.failed += len(docs) - sent
+            if len(docs) < self.batch_size:
+                break
+
+        self.sweeps += 1
+        self.recovered += recovered
+        self.last_recovered = recovered
+        self.last_sweep_at = now
+        if recovered:
+            print(f"[REAPER] {recovered} inscrições pendentes republicadas")
+        return recovered
+
+    def ensure_index(self):
+        """Índices usados pela busca de inscrições pendentes antigas"""
+        ensure_index("status_pending_since")
+        ensure_index("status_created_at_id")
+
+    def run_forever(self):
+        """Loop do reaper; termina quando stop() é chamado"""
+        print(f"[REAPER] Reaper iniciado ({self.owner})")
+        try:
+            self.ensure_index()
+        except Exception as e:
+            print(f"[REAPER] Não foi possível criar os índices do reaper: {e}")
+        while not self._stopping.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"[REAPER] Erro na varredura de inscrições pendentes: {e}")
+            self._stopping.wait(self.interval)
+        print("[REAPER] Reaper encerrado")
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self.run_forever, name="pending-reaper", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "threshold_seconds": self.threshold_seconds,
+            "sweeps": self.sweeps,
+            "recovered": self.recovered,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "last_recovered": self.last_recovered,
+            "last_sweep_at": self.last_sweep_at,
+        }
+
+
+# Instância global do reaper
+pending_reaper = StalePendingReaper()
+
+
+if __name__ == "__main__":
+    # Reaper como processo separado: python -m app.services.reaper
+    try:
+        pending_reaper.run_forever()
+    except KeyboardInterrupt:
+        print("[REAPER] Parando reaper...")
@@ -0,0 +1,138 @@
+import asyncio
+from typing import Any, Dict, Optional, Set
+from pymongo.errors import OperationFailure
+from app.config.config import config
+from app.db.mongo import async_mongo_db, change_streams_unsupported
+
+# Status após os quais a inscrição não muda mais
+TERMINAL_STATUSES = ("processed", "failed")
+
+# Intervalo antes de tentar reabrir o change stream após erro de conexão
+RETRY_DELAY = 5.0
+
+
+class EnrollmentStatusWatcher:
+    """
+    Observador único (por processo) de mudanças de status das inscrições.
+
+    Clientes de SSE e long-poll se inscrevem por id e recebem os eventos em
+    uma asyncio.Queue; o banco é observado uma única vez, independentemente
+    do número de clientes. Usa um change stream na coleção enrollments; sem
+    suporte a change streams, faz uma única consulta $in com os ids
+    observados a cada intervalo.
+    """
+
+    def __init__(self, poll_interval: float = config.ENROLLMENT_STATUS_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self.mode: Optional[str] = None
+        self.events = 0
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._known: Dict[str, Optional[str]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._last_error: Optional[str] = None
+
+    def subscribe(self, enrollment_id: str) -> asyncio.Queue:
+        """Registra interesse em um id; inicia o observador se necessário"""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(enrollment_id, set()).add(queue)
+        self._known.setdefault(enrollment_id, None)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return queue
+
+    def unsubscribe(self, enrollment_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(enrollment_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[enrollment_id]
+            self._known.pop(enrollment_id, None)
+
+    def dispatch(self, event: Dict[str, Any]):
+        """Entrega um evento de status aos inscritos no id"""
+        enrollment_id = event["id"]
+        queues = self._subscribers.get(enrollment_id)
+        if not queues:
+            return
+        self._known[enrollment_id] = event["status"]
+        self.events += 1
+        for queue in queues:
+            queue.put_nowait(event)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self):
+        while True:
+            try:
+                await self._watch_change_stream()
+            except OperationFailure as e:
+                if not change_streams_unsupported(e):
+                    # Falha transitória (ex.: failover, cursor encerrado): reabre o stream
+                    self._last_error = str(e)
+                    print(f"Erro no change stream de inscrições ({e.code}). Nova tentativa em {RETRY_DELAY}s...")
+                    await asyncio.sleep(RETRY_DELAY)
+                    continue
+                print(f"⚠️ Change streams indisponíveis ({e.code}); usando polling de status")
+                await self._poll_status()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._last_error = str(e)
+                print(f"Erro no watcher de status de inscrições: {e}. Nova tentativa em {RETRY_DELAY}s...")
+                await asyncio.sleep(RETRY_DELAY)
+
+    async def _watch_change_stream(self):
+        pipeline = [{"$match": {
+            "operationType": "update",
+            "updateDescription.updatedFields.status": {"$exists": True},
+        }}]
+        async with await async_mongo_db.enrollments.watch(pipeline) as stream:
+            self.mode = "change_stream"
+            async for change in stream:
+                fields = change["updateDescription"]["updatedFields"]
+                self.dispatch({
+                    "id": change["documentKey"]["_id"],
+                    "status": fields["status"],
+                    "message": fields.get("message"),
+                })
+
+    async def _poll_status(self):
+        self.mode = "status_poll"
+        while True:
+            ids = list(self._subscribers)
+            if ids:
+                try:
+                    async for doc in async_mongo_db.enrollments.find(
+                        {"_id": {"$in": ids}}, {"status": 1, "message": 1}
+                    ):
+                        if doc.get("status") != self._known.get(doc["_id"]):
+                            self.dispatch({"id": doc["_id"], "status": doc.get("status"), "message": doc.get("message")})
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self._last_error = str(e)
+                    print(f"Erro ao verificar status das inscrições observadas: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "running": self._task is not None and not self._task.done(),
+            "watched_enrollments": len(self._subscribers),
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "events": self.events,
+            "last_error": self._last_error,
+        }
+
+
+# Instância global do watcher
+enrollment_status_watcher = EnrollmentStatusWatcher()
@@ -0,0 +1,141 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from app.auth.basic_auth import BasicAuthManager, auth_manager
+from app.config.config import config
+
+try:
+    # Notificações do sistema de arquivos (inotify no Linux); opcional
+    import watchfiles
+except ImportError:
+    watchfiles = None
+
+# Intervalo antes de reabrir a observação após erro
+RETRY_DELAY = 5.0
+
+FileSignature = Optional[Tuple[int, int, int]]
+
+
+def file_signature(path: str) -> FileSignature:
+    """mtime, tamanho e inode do arquivo (None se não existir)"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class UsersFileWatcher:
+    """
+    Recarrega o arquivo de usuários quando ele muda, sem reinício nem
+    chamada a POST /admin/users/reload (que só atinge o worker que a atende).
+
+    Cada processo da API executa o próprio watcher. Com o pacote watchfiles
+    instalado, reage às notificações do sistema de arquivos (inotify); senão
+    compara mtime, tamanho e inode a cada poll_interval. A recarga publica
+    um novo snapshot de usuários com uma única atribuição.
+    """
+
+    def __init__(self, manager: BasicAuthManager = auth_manager,
+                 poll_interval: float = config.USERS_FILE_POLL_INTERVAL,
+                 use_inotify: bool = config.USERS_FILE_INOTIFY):
+        self.manager = manager
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.mode: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._signature: FileSignature = None
+        self._reloads = 0
+        self._failures = 0
+        self._last_reload_at: Optional[float] = None
+        self._last_error: Optional[str] = None
+
+    @property
+    def path(self) -> str:
+        return self.manager.users_file_path or config.USERS_FILE_PATH
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def check(self) -> bool:
+        """Recarrega os usuários se o arquivo mudou desde a última verificação"""
+        signature = file_signature(self.path)
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        if signature is None:
+            # Arquivo removido: mantém os usuários atuais até ele voltar
+            print(f"⚠️ Arquivo de usuários {self.path} não encontrado; mantendo usuários atuais")
+            return False
+        return await self._reload()
+
+    async def _reload(self) -> bool:
+        if await run_in_threadpool(self.manager.reload_users):
+            self._reloads += 1
+            self._last_reload_at = time.time()
+            return True
+        # JSON inválido ou sem usuários (ex.: escrita em andamento): tenta na próxima mudança
+        self._failures += 1
+        return False
+
+    async def run(self):
+        self._signature = file_signature(self.path)
+        # Cobre alterações feitas entre o carregamento inicial e o início do watcher
+        loaded_at = self.manager.snapshot.loaded_at or 0
+        if self._signature is not None and self._signature[0] / 1e9 > loaded_at:
+            await self._reload()
+        while True:
+            try:
+                if self.use_inotify and watchfiles is not None:
+                    await self._watch_events()
+                else:
+                    await self._poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._last_error = str(e)
+                print(f"Erro no watcher de usuários: {e}. Nova tentativa em {RETRY_DELAY}s...")
+                await asyncio.sleep(RETRY_DELAY)
+
+    async def _watch_events(self):
+        self.mode = "inotify"
+        path = os.path.abspath(self.path)
+        # Observa o diretório: editores costumam salvar com renomeação atômica
+        async for changes in watchfiles.awatch(os.path.dirname(path)):
+            if any(os.path.abspath(changed) == path for _, changed in changes):
+                await self.check()
+
+    async def _poll(self):
+        self.mode = "mtime_poll"
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self.check()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "running": self._task is not None and not self._task.done(),
+            "path": self.path,
+            "snapshot_version": self.manager.snapshot.version,
+            "reloads": self._reloads,
+            "failures": self._failures,
+            "last_reload_at": self._last_reload_at,
+            "staleness_bound_ms": self.poll_interval * 1000 if self.mode == "mtime_poll" else None,
+            "last_error": self._last_error,
+        }
+
+
+# Instância global do watcher
+users_file_watcher = UsersFileWatcher()
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+from fastapi.concurrency import run_in_threadpool
+from app.config.config import config
+from app.db.indexes import apply_indexes, print_report
+from app.db.mongo import async_mongo_db, get_async_mongo_client, get_mongo_client
+from app.db.publisher import get_publisher
+from app.db.rabbitMQ import get_rabbitmq_channel
+from app.services.age_group_index import age_group_index
+
+
+class StartupWarmup:
+    """
+    Aquecimento da API no startup: conecta MongoDB e RabbitMQ em paralelo,
+    abre as primeiras conexões do pool e carrega os caches, para que a
+    primeira requisição após um deploy não pague esse custo.
+
+    A API só é reportada como pronta (GET /ready) quando todas as etapas
+    terminam; se alguma falhar, o aquecimento é repetido em background.
+    """
+
+    def __init__(self, mongo_connections: int = config.STARTUP_MONGO_CONNECTIONS,
+                 timeout: float = config.STARTUP_WARMUP_TIMEOUT,
+                 retry_interval: float = config.STARTUP_RETRY_INTERVAL):
+        self.mongo_connections = max(mongo_connections, 1)
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.ready = False
+        self.attempts = 0
+        self.components: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def _step(self, name: str, coro) -> bool:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(coro, self.timeout)
+            self.components[name] = {"ready": True, "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+            return True
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            self.components[name] = {"ready": False, "error": error}
+            print(f"⚠️ Aquecimento de {name} falhou: {error}")
+            return False
+
+    async def _warm_mongo(self):
+        # Pings simultâneos: cada um ocupa uma conexão, que depois fica no pool
+        client = await run_in_threadpool(get_mongo_client)
+        await asyncio.gather(*[
+            run_in_threadpool(client.admin.command, "ping") for _ in range(self.mongo_connections)
+        ])
+        async_client = get_async_mongo_client()
+        await asyncio.gather(*[async_client.admin.command("ping") for _ in range(self.mongo_connections)])
+
+    async def _warm_rabbitmq(self):
+        if config.RABBITMQ_PUBLISHER_THREAD:
+            if not await run_in_threadpool(get_publisher().wait_ready, self.timeout):
+                raise TimeoutError("publicador RabbitMQ não conectou")
+        else:
+            await run_in_threadpool(get_rabbitmq_channel)
+
+    async def _warm_age_groups(self):
+        await age_group_index.refresh_async(async_mongo_db.age_groups)
+
+    async def _apply_indexes(self):
+        print_report(await run_in_threadpool(apply_indexes))
+
+    async def run(self) -> bool:
+        """Executa o aquecimento uma vez; retorna se a API ficou pronta"""
+        self.attempts += 1
+        mongo_ok, rabbitmq_ok = await asyncio.gather(
+            self._step("mongodb", self._warm_mongo()),
+            self._step("rabbitmq", self._warm_rabbitmq()),
+        )
+        caches_ok = False
+        if mongo_ok:
+            steps = [self._step("age_group_index", self._warm_age_groups())]
+            if config.MONGO_APPLY_INDEXES:
+                steps.append(self._step("indexes", self._apply_indexes()))
+            caches_ok = all(await asyncio.gather(*steps))
+        self.ready = mongo_ok and rabbitmq_ok and caches_ok
+        return self.ready
+
+    async def run_until_ready(self):
+        while not self.ready:
+            await asyncio.sleep(self.retry_interval)
+            if await self.run():
+                print(f"✅ API pronta após {self.attempts} tentativas de aquecimento")
+
+    def start_retrying(self):
+        """Repete o aquecimento em background até a API ficar pronta"""
+        if not self.ready and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self.run_until_ready())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.ready = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "attempts": self.attempts,
+            "components": self.components,
+        }
+
+
+# Instância global do aquecimento
+startup_warmup = StartupWarmup()
@@ -0,0 +1,112 @@
+"""
+Devolve mensagens da DLQ para a fila principal em lotes com limite de vazão.
+
+Uso:
+    python replay_dlq.py [--batch-size 100] [--rate 50] [--limit N] [--dry-run]
+
+Cada inscrição reenviada volta de failed para pending (para que o worker
+possa reivindicá-la) e a mensagem recomeça com o contador de tentativas zerado.
+A mensagem só é removida da DLQ depois que o broker confirma a republicação.
+"""
+import argparse
+import json
+import time
+import pika
+import worker
+
+
+def enrollment_id_from(body):
+    """Extrai o id da inscrição da mensagem, se houver"""
+    try:
+        data = json.loads(body)
+        return data.get("id") if isinstance(data, dict) else None
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def reset_enrollment(enrollment_id):
+    """failed → pending, para que a nova entrega seja reivindicada pelo worker"""
+    worker.mongo_db.enrollments.update_one(
+        {"_id": enrollment_id, "status": worker.STATUS_FAILED},
+        {"$set": {"status": worker.STATUS_PENDING, "message": "Reenviada a partir da DLQ"},
+         "$currentDate": {"pending_since": True}}
+    )
+
+
+def replay_batch(channel, batch_size, dry_run=False):
+    """Reenvia até batch_size mensagens da DLQ; retorna quantas foram reenviadas"""
+    replayed = 0
+    last_tag = None
+    for _ in range(batch_size):
+        method, properties, body = channel.basic_get(queue=worker.DEAD_LETTER_QUEUE, auto_ack=False)
+        if method is None:
+            break
+
+        if dry_run:
+            print(f"[REPLAY] (dry-run) {enrollment_id_from(body)}: {(properties.headers or {}).get(worker.RETRY_HEADER, 0)} tentativas")
+            last_tag = method.delivery_tag
+            replayed += 1
+            continue
+
+        enrollment_id = enrollment_id_from(body)
+        if enrollment_id is not None:
+            reset_enrollment(enrollment_id)
+
+        headers = {key: value for key, value in (properties.headers or {}).items() if key != worker.RETRY_HEADER}
+        channel.basic_publish(
+            exchange='',
+            routing_key=worker.RABBITMQ_QUEUE,
+            body=body,
+            properties=pika.BasicProperties(delivery_mode=2, headers=headers)
+        )
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+        replayed += 1
+
+    if last_tag is not None:
+        # Dry-run: devolve o lote inteiro à DLQ sem alterar nada
+        channel.basic_nack(delivery_tag=last_tag, multiple=True, requeue=True)
+    return replayed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reenvia mensagens da DLQ para a fila de inscrições")
+    parser.add_argument("--batch-size", type=int, default=100, help="mensagens por lote")
+    parser.add_argument("--rate", type=float, default=50.0, help="máximo de mensagens por segundo")
+    parser.add_argument("--limit", type=int, default=None, help="máximo de mensagens a reenviar")
+    parser.add_argument("--dry-run", action="store_true", help="apenas lista as mensagens da DLQ")
+    args = parser.parse_args()
+
+    if not args.dry_run and not worker.connect_mongodb():
+        raise SystemExit("Falha ao conectar ao MongoDB")
+
+    connection = worker.connect_rabbitmq_with_retry(
+        worker.RABBITMQ_HOST, worker.RABBITMQ_PORT, worker.RABBITMQ_USER, worker.RABBITMQ_PASSWORD
+    )
+    channel = connection.channel()
+    worker.declare_retry_topology(channel)
+    # basic_publish retorna só depois da confirmação do broker
+    channel.confirm_delivery()
+
+    total = 0
+    try:
+        while args.limit is None or total < args.limit:
+            batch_size = args.batch_size if args.limit is None else min(args.batch_size, args.limit - total)
+            started = time.monotonic()
+            replayed = replay_batch(channel, batch_size, args.dry_run)
+            total += replayed
+            if replayed < batch_size or args.dry_run:
+                # DLQ vazia (em dry-run as mensagens voltam para a DLQ e seriam lidas de novo)
+                break
+            print(f"[REPLAY] {total} mensagens reenviadas")
+            # Limita a vazão: cada lote ocupa pelo menos batch_size / rate segundos
+            connection.sleep(max(replayed / args.rate - (time.monotonic() - started), 0))
+    finally:
+        connection.close()
+        if worker.mongo_client:
+            worker.mongo_client.close()
+
+    print(f"[REPLAY] Concluído: {total} mensagens {'encontradas' if args.dry_run else 'reenviadas'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import math
+import multiprocessing
+import os
+import signal
+import time
+import worker
+
+# Limites do pool de processos worker
+WORKER_MIN_PROCESSES = max(int(os.getenv("WORKER_MIN_PROCESSES", 1)), 1)
+WORKER_MAX_PROCESSES = max(int(os.getenv("WORKER_MAX_PROCESSES", os.cpu_count() or 1)), WORKER_MIN_PROCESSES)
+# Mensagens na fila por processo antes de adicionar outro processo
+WORKER_BACKLOG_PER_PROCESS = max(int(os.getenv("WORKER_BACKLOG_PER_PROCESS", 100)), 1)
+# Intervalo entre leituras da profundidade da fila (segundos)
+SUPERVISOR_POLL_INTERVAL = float(os.getenv("SUPERVISOR_POLL_INTERVAL", 5))
+# Tempo máximo para um processo concluir as mensagens em processamento após SIGTERM
+WORKER_DRAIN_TIMEOUT = float(os.getenv("WORKER_DRAIN_TIMEOUT", 60))
+# Espera antes de repor um processo que caiu; dobra a cada queda seguida até o máximo
+WORKER_RESTART_BACKOFF = float(os.getenv("WORKER_RESTART_BACKOFF", 1))
+WORKER_RESTART_BACKOFF_MAX = float(os.getenv("WORKER_RESTART_BACKOFF_MAX", 60))
+
+
+def desired_processes(queue_depth, current, min_processes=WORKER_MIN_PROCESSES,
+                      max_processes=WORKER_MAX_PROCESSES, backlog_per_process=WORKER_BACKLOG_PER_PROCESS):
+    """
+    Calcula o tamanho do pool para a profundidade atual da fila.
+    Cresce de uma vez até o necessário; reduz um processo por leitura,
+    para não derrubar o pool em uma oscilação momentânea da fila.
+    """
+    target = math.ceil(queue_depth / backlog_per_process)
+    if target < current:
+        target = current - 1
+    return min(max(target, min_processes), max_processes)
+
+
+class WorkerSupervisor:
+    """
+    Mantém um pool de processos worker.py: reinicia processos que caíram e
+    ajusta o tamanho do pool entre os limites configurados conforme a
+    profundidade da fila (lida com queue_declare passivo).
+
+    Quedas seguidas (ex.: MongoDB fora do ar) espaçam as reposições com
+    backoff exponencial; um processo que fica de pé por mais que o atraso
+    máximo zera a contagem.
+    """
+
+    def __init__(self, min_processes=WORKER_MIN_PROCESSES, max_processes=WORKER_MAX_PROCESSES,
+                 poll_interval=SUPERVISOR_POLL_INTERVAL, drain_timeout=WORKER_DRAIN_TIMEOUT,
+                 restart_backoff=WORKER_RESTART_BACKOFF, restart_backoff_max=WORKER_RESTART_BACKOFF_MAX):
+        self.min_processes = min_processes
+        self.max_processes = max_processes
+        self.poll_interval = poll_interval
+        self.drain_timeout = drain_timeout
+        self.restart_backoff = restart_backoff
+        self.restart_backoff_max = restart_backoff_max
+        self.target = min_processes
+        self.processes = []
+        self.retiring = []
+        self.crashes = 0           # Quedas seguidas, sem um processo estável entre elas
+        self._restart_at = 0.0     # Antes disso, processos que caíram não são repostos
+        self._started_at = {}      # nome do processo -> instante em que foi iniciado
+        self._stopping = False
+        self._next_id = 0
+        self._connection = None
+        self._channel = None
+        # spawn: os filhos não herdam a conexão do supervisor com o RabbitMQ
+        self._context = multiprocessing.get_context("spawn")
+
+    def _spawn(self):
+        self._next_id += 1
+        process = self._context.Process(target=worker.main, name=f"enrollment-worker-{self._next_id}")
+        process.start()
+        self.processes.append(process)
+        self._started_at[process.name] = time.monotonic()
+        print(f"[SUPERVISOR] Processo {process.name} iniciado (pid {process.pid})")
+
+    def _retire(self):
+        # SIGTERM: o worker conclui as mensagens em processamento antes de sair
+        process = self.processes.pop()
+        process.terminate()
+        self.retiring.append(process)
+        print(f"[SUPERVISOR] Processo {process.name} drenando para encerrar (pid {process.pid})")
+
+    def reap(self):
+        """Remove processos encerrados; os que caíram são repostos em seguida"""
+        now = time.monotonic()
+        for process in list(self.processes):
+            if not process.is_alive():
+                process.join()
+                self.processes.remove(process)
+                uptime = now - self._started_at.pop(process.name, now)
+                self.crashes = 1 if uptime >= self.restart_backoff_max else self.crashes + 1
+                delay = min(self.restart_backoff * 2 ** (self.crashes - 1), self.restart_backoff_max)
+                self._restart_at = max(self._restart_at, now + delay)
+                print(f"[SUPERVISOR] ⚠️ Processo {process.name} terminou (código {process.exitcode}), reiniciando em {delay:g}s...")
+        for process in list(self.retiring):
+            if not process.is_alive():
+                process.join()
+                self.retiring.remove(process)
+                self._started_at.pop(process.name, None)
+
+    def spawn_missing(self):
+        """Completa o pool até o alvo, respeitando o backoff de reinício"""
+        if time.monotonic() < self._restart_at:
+            return
+        while len(self.processes) < self.target:
+            self._spawn()
+
+    def queue_depth(self):
+        """Lê o número de mensagens prontas na fila; None se o RabbitMQ estiver indisponível"""
+        try:
+            if self._connection is None or self._connection.is_closed:
+                self._connection = worker.connect_rabbitmq_with_retry(
+                    worker.RABBITMQ_HOST, worker.RABBITMQ_PORT,
+                    worker.RABBITMQ_USER, worker.RABBITMQ_PASSWORD, retries=1
+                )
+                self._channel = self._connection.channel()
+            frame = self._channel.queue_declare(queue=worker.RABBITMQ_QUEUE, passive=True)
+            return frame.method.message_count
+        except Exception as e:
+            print(f"[SUPERVISOR] Não foi possível ler a profundidade da fila: {e}")
+            self._close_connection()
+            return None
+
+    def scale(self, queue_depth):
+        target = desired_processes(queue_depth, self.target, self.min_processes, self.max_processes)
+        if target != self.target:
+            print(f"[SUPERVISOR] Fila com {queue_depth} mensagens: ajustando pool de {self.target} para {target} processos")
+        self.target = target
+        while len(self.processes) > self.target:
+            self._retire()
+
+    def _sleep(self, seconds):
+        # Mantém os heartbeats da conexão de monitoramento enquanto espera
+        if self._connection is not None and self._connection.is_open:
+            try:
+                self._connection.sleep(seconds)
+                return
+            except Exception:
+                self._close_connection()
+        time.sleep(seconds)
+
+    def _close_connection(self):
+        try:
+            if self._connection is not None and self._connection.is_open:
+                self._connection.close()
+        except Exception:
+            pass
+        self._connection = None
+        self._channel = None
+
+    def _request_stop(self, signum, frame):
+        print("[SUPERVISOR] Sinal de parada recebido, drenando processos...")
+        self._stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        print(f"[SUPERVISOR] Pool entre {self.min_processes} e {self.max_processes} processos")
+
+        last_poll = 0.0
+        while not self._stopping:
+            self.reap()
+            self.spawn_missing()
+            if time.monotonic() - last_poll >= self.poll_interval:
+                depth = self.queue_depth()
+                if depth is not None:
+                    self.scale(depth)
+                last_poll = time.monotonic()
+            self._sleep(1)
+
+        self.shutdown()
+
+    def shutdown(self):
+        """Envia SIGTERM a todos os processos e aguarda a drenagem"""
+        self.retiring.extend(self.processes)
+        self.processes = []
+        for process in self.retiring:
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + self.drain_timeout
+        for process in self.retiring:
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                print(f"[SUPERVISOR] Processo {process.name} não encerrou a tempo, finalizando à força")
+                process.kill()
+                process.join()
+        self.retiring = []
+        self._close_connection()
+        print("[SUPERVISOR] Supervisor encerrado")
+
+
+if __name__ == "__main__":
+    WorkerSupervisor().run()
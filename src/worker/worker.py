@@ -1,8 +1,17 @@
 import pika
 import os
+import sys
 import json
 import time
-from pymongo import MongoClient
+import signal
+import socket
+import uuid
+import functools
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 
 # Configurações com defaults apropriados para teste e produção
 RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "enroll_api_rabbitmq")
@@ -11,24 +20,46 @@ RABBITMQ_USER = os.getenv("RABBITMQ_DEFAULT_USER", "user")
 RABBITMQ_PASSWORD = os.getenv("RABBITMQ_DEFAULT_PASS", "password")
 RABBITMQ_QUEUE = os.getenv("RABBITMQ_QUEUE", "enrollment_queue")
 
-# Configuração do MongoDB - corrigida para usar o mesmo banco da aplicação
-MONGO_HOST = os.getenv("MONGO_HOST", "enroll_api_mongo")
-MONGO_PORT = int(os.getenv("MONGO_PORT", 27017))
-MONGO_USERNAME = os.getenv("MONGO_INITDB_ROOT_USERNAME", "")
-MONGO_PASSWORD = os.getenv("MONGO_INITDB_ROOT_PASSWORD", "")
-MONGO_DB = os.getenv("MONGO_DB", "enrollment_db")  # Corrigido para usar o mesmo banco da aplicação
+# Configuração do MongoDB compartilhada com a API (src/enroll_api/app/config/mongo_settings.py)
+SHARED_CONFIG_PATHS = (
+    "/shared",  # Imagem Docker (copiado no build e montado pelo compose)
+    # Execução direta a partir do repositório
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "enroll_api", "app", "config"),
+)
+sys.path.extend(path for path in SHARED_CONFIG_PATHS if path not in sys.path)
+import mongo_settings
 
-# Constrói URI do MongoDB baseado nas configurações
-if MONGO_USERNAME and MONGO_PASSWORD:
-    MONGO_URI = f"mongodb://{MONGO_USERNAME}:{MONGO_PASSWORD}@{MONGO_HOST}:{MONGO_PORT}/"
-else:
-    MONGO_URI = f"mongodb://{MONGO_HOST}:{MONGO_PORT}/"
+MONGO_URI = mongo_settings.MONGO_URI
+MONGO_DB = mongo_settings.MONGO_DB
+
+# Mensagens processadas em paralelo (1 = uma por vez); o prefetch acompanha esse valor
+WORKER_CONCURRENCY = max(int(os.getenv("WORKER_CONCURRENCY", 1)), 1)
+# Atualizações de status agrupadas em um único bulk_write (1 = grava cada mensagem)
+WORKER_BATCH_SIZE = max(int(os.getenv("WORKER_BATCH_SIZE", 1)), 1)
+# Tempo máximo que uma inscrição processada espera pelo lote (segundos)
+WORKER_BATCH_WINDOW = float(os.getenv("WORKER_BATCH_WINDOW", 0.2))
+# Duração do lease de processamento; leases vencidos (worker caiu) podem ser reivindicados
+WORKER_LEASE_SECONDS = int(os.getenv("WORKER_LEASE_SECONDS", 30))
+# Atrasos (segundos) de cada nova tentativa; esgotadas as tentativas a mensagem vai para a DLQ
+WORKER_RETRY_DELAYS = [int(delay) for delay in os.getenv("WORKER_RETRY_DELAYS", "5,30,120").split(",") if delay.strip()]
+# Intervalo entre os logs de vazão (segundos)
+WORKER_STATS_INTERVAL = float(os.getenv("WORKER_STATS_INTERVAL", 30))
+
+# Topologia de retry: filas com TTL que devolvem a mensagem à fila principal, e a DLQ
+RETRY_HEADER = "x-retry-count"
+DEAD_LETTER_QUEUE = f"{RABBITMQ_QUEUE}.dlq"
+
+# Identifica o processo que detém um lease (diagnóstico); quem pode gravar o
+# resultado é decidido pelo lease_token, único por entrega da mensagem
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
 
 print(f"[WORKER] Configurações:")
 print(f"  RabbitMQ: {RABBITMQ_USER}@{RABBITMQ_HOST}:{RABBITMQ_PORT}")
 print(f"  MongoDB: {MONGO_URI}")
 print(f"  Database: {MONGO_DB}")
 print(f"  Queue: {RABBITMQ_QUEUE}")
+print(f"  Concorrência: {WORKER_CONCURRENCY}")
+print(f"  Lote de status: {WORKER_BATCH_SIZE} (janela {WORKER_BATCH_WINDOW}s)")
 
 # Variáveis globais para conexões (inicializadas posteriormente)
 mongo_client = None
@@ -40,7 +71,7 @@ def connect_mongodb():
     
     try:
         print("[WORKER] Conectando ao MongoDB...")
-        mongo_client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+        mongo_client = MongoClient(MONGO_URI, **mongo_settings.client_options("enroll_worker"))
         mongo_db = mongo_client[MONGO_DB]
         # Testa a conexão
         mongo_client.admin.command('ping')
@@ -80,26 +111,166 @@ def connect_rabbitmq_with_retry(host, port, user, password, retries=15, delay=5)
     
     raise Exception(f"[WORKER] Não foi possível conectar ao RabbitMQ após {retries} tentativas.")
 
-def process_enrollment(ch, method, properties, body):
-    """Processa uma inscrição da fila"""
+ACK = "ack"                # Confirma sem gravar nada (mensagem descartada)
+PROCESSED = "processed"    # Confirma depois de gravar o status no lote
+RETRY = "retry"            # Falha: nova tentativa com atraso (ou DLQ, esgotadas as tentativas)
+DEFER = "defer"            # Lease ativo de outro worker: adia sem contar tentativa
+
+# Máquina de estados da inscrição: pending → processing → processed | failed
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_PROCESSED = "processed"
+STATUS_FAILED = "failed"
+TERMINAL_STATUSES = (STATUS_PROCESSED, STATUS_FAILED)
+# Campos do lease, removidos ao sair de processing
+LEASE_FIELDS = {"lease_owner": "", "lease_token": "", "lease_until": ""}
+
+
+class DrainRateMeter:
+    """Mede a vazão do worker (mensagens confirmadas por segundo)"""
+    
+    def __init__(self):
+        self.total = 0
+        self._window_count = 0
+        self._window_start = time.monotonic()
+    
+    def record(self):
+        self.total += 1
+        self._window_count += 1
+    
+    def report(self, in_flight=0):
+        """Registra a vazão desde o último relatório e inicia uma nova janela"""
+        now = time.monotonic()
+        elapsed = max(now - self._window_start, 1e-9)
+        rate = self._window_count / elapsed
+        print(f"[WORKER] Vazão: {rate:.2f} msg/s (total: {self.total}, em processamento: {in_flight})")
+        self._window_count = 0
+        self._window_start = now
+        return rate
+
+
+drain_meter = DrainRateMeter()
+
+
+class Delivery(namedtuple("Delivery", ["tag", "body", "headers", "lease_token"])):
+    """
+    Mensagem recebida, com o necessário para confirmá-la ou republicá-la.
+    lease_token identifica esta entrega no lease da inscrição: uma entrega
+    duplicada, mesmo no mesmo processo, nunca assume o lease de outra.
+    """
+    
+    @classmethod
+    def receive(cls, method, properties, body):
+        return cls(method.delivery_tag, body, properties.headers or {}, uuid.uuid4().hex)
+    
+    @property
+    def retries(self):
+        return int(self.headers.get(RETRY_HEADER, 0))
+
+
+def retry_queue_name(delay):
+    return f"{RABBITMQ_QUEUE}.retry.{delay}s"
+
+def declare_retry_topology(channel):
+    """Declara a fila principal, uma fila de espera por atraso e a DLQ"""
+    channel.queue_declare(queue=RABBITMQ_QUEUE, durable=True)
+    for delay in WORKER_RETRY_DELAYS:
+        # Sem consumidores: a mensagem expira após o TTL e volta para a fila principal
+        channel.queue_declare(queue=retry_queue_name(delay), durable=True, arguments={
+            "x-message-ttl": delay * 1000,
+            "x-dead-letter-exchange": "",
+            "x-dead-letter-routing-key": RABBITMQ_QUEUE,
+        })
+    channel.queue_declare(queue=DEAD_LETTER_QUEUE, durable=True)
+
+def claim_enrollment(enrollment_id, lease_token):
+    """
+    Reivindica a inscrição para esta entrega em uma única operação atômica:
+    pending → processing, ou retoma um processing cujo lease venceu.
+    Uma reentrega após falha ao gravar o lote também espera o lease vencer.
+    Retorna None se a inscrição não puder ser reivindicada.
+    """
+    now = datetime.now(timezone.utc)
+    return mongo_db.enrollments.find_one_and_update(
+        {"_id": enrollment_id, "$or": [
+            {"status": STATUS_PENDING},
+            {"status": STATUS_PROCESSING, "lease_until": {"$lt": now}},
+        ]},
+        {
+            "$set": {
+                "status": STATUS_PROCESSING,
+                "lease_owner": WORKER_ID,
+                "lease_token": lease_token,
+                "lease_until": now + timedelta(seconds=WORKER_LEASE_SECONDS),
+            },
+            "$inc": {"attempts": 1},
+        },
+        projection={"name": 1, "attempts": 1},
+        return_document=ReturnDocument.AFTER
+    )
+
+def release_enrollment(enrollment_id, lease_token, error):
+    """processing → pending para a próxima tentativa, se o lease ainda é desta entrega"""
+    mongo_db.enrollments.update_one(
+        {"_id": enrollment_id, "status": STATUS_PROCESSING, "lease_token": lease_token},
+        {
+            "$set": {"status": STATUS_PENDING, "message": f"Nova tentativa agendada após erro: {error}"},
+            "$unset": LEASE_FIELDS,
+            # O reaper conta o limite a partir da volta para pending, não da criação
+            "$currentDate": {"pending_since": True},
+        }
+    )
+
+def fail_enrollment(enrollment_id, lease_token, attempts):
+    """pending/processing → failed quando a mensagem vai para a DLQ"""
+    mongo_db.enrollments.update_one(
+        # Não toca em inscrições com lease ativo de outra entrega
+        {"_id": enrollment_id, "status": {"$in": [STATUS_PENDING, STATUS_PROCESSING]}, "$or": [
+            {"lease_token": {"$in": [None, lease_token]}},
+            {"lease_until": {"$lt": datetime.now(timezone.utc)}},
+        ]},
+        {
+            "$set": {"status": STATUS_FAILED, "message": f"Falha no processamento após {attempts} tentativas"},
+            "$unset": LEASE_FIELDS,
+        }
+    )
+
+def unclaimed_outcome(enrollment_id):
+    """Decide o destino de uma mensagem cuja inscrição não foi reivindicada"""
+    doc = mongo_db.enrollments.find_one({"_id": enrollment_id}, {"status": 1, "lease_owner": 1})
+    if not doc:
+        print(f"[WORKER] Inscrição {enrollment_id} não encontrada no banco - pode ter sido removida ou ser de teste antigo")
+        return ACK  # Descarta mensagem órfã
+    if doc.get("status") in TERMINAL_STATUSES:
+        print(f"[WORKER] Inscrição {enrollment_id} já foi finalizada anteriormente ({doc['status']}), descartando duplicata")
+        return ACK
+    # Em processamento por outro worker: se ele cair, o lease vence e a próxima entrega assume
+    print(f"[WORKER] Inscrição {enrollment_id} em processamento por {doc.get('lease_owner')}, adiando")
+    return DEFER
+
+def handle_enrollment(body, lease_token):
+    """
+    Processa o corpo de uma mensagem da fila; lease_token identifica a entrega.
+    Não acessa o canal nem grava o status: retorna (resultado, id da inscrição)
+    para quem consome a mensagem.
+    """
+    enrollment_id = None
+    claimed_id = None
     try:
         # Verifica se o body não está vazio
         if not body:
             print(f"[WORKER] Mensagem vazia recebida, descartando...")
-            ch.basic_ack(delivery_tag=method.delivery_tag)
-            return
+            return ACK, None
         
         # Tenta decodificar como string primeiro
         try:
             body_str = body.decode('utf-8') if isinstance(body, bytes) else str(body)
             if not body_str.strip():
                 print(f"[WORKER] Mensagem vazia após decodificação, descartando...")
-                ch.basic_ack(delivery_tag=method.delivery_tag)
-                return
+                return ACK, None
         except Exception as e:
             print(f"[WORKER] Erro ao decodificar mensagem: {e}, descartando...")
-            ch.basic_ack(delivery_tag=method.delivery_tag)
-            return
+            return ACK, None
         
         # Tenta fazer parse do JSON
         try:
@@ -107,61 +278,309 @@ def process_enrollment(ch, method, properties, body):
         except json.JSONDecodeError as e:
             print(f"[WORKER] JSON inválido recebido: {e}")
             print(f"[WORKER] Conteúdo da mensagem: {body_str[:100]}...")
-            ch.basic_ack(delivery_tag=method.delivery_tag)  # Descarta mensagem inválida
-            return
+            return ACK, None  # Descarta mensagem inválida
         
         # Verifica se tem os campos necessários
         if not isinstance(data, dict) or "id" not in data:
             print(f"[WORKER] Mensagem sem campo 'id' obrigatório: {data}")
-            ch.basic_ack(delivery_tag=method.delivery_tag)
-            return
+            return ACK, None
         
         enrollment_id = data["id"]
         print(f"[WORKER] Processando inscrição {enrollment_id}...")
         
-        # Verifica se o enrollment existe no banco antes de processar
-        existing_enrollment = mongo_db.enrollments.find_one({"_id": enrollment_id})
-        if not existing_enrollment:
-            print(f"[WORKER] Inscrição {enrollment_id} não encontrada no banco - pode ter sido removida ou ser de teste antigo")
-            ch.basic_ack(delivery_tag=method.delivery_tag)  # Descarta mensagem órfã
-            return
-        
-        # Verifica se já foi processada
-        if existing_enrollment.get("status") == "processed":
-            print(f"[WORKER] Inscrição {enrollment_id} já foi processada anteriormente")
-            ch.basic_ack(delivery_tag=method.delivery_tag)
-            return
+        # Corridas com outros workers são resolvidas pelo próprio banco; inscrições
+        # removidas ou já finalizadas só são lidas quando a reivindicação falha
+        enrollment = claim_enrollment(enrollment_id, lease_token)
+        if enrollment is None:
+            return unclaimed_outcome(enrollment_id), None
+        claimed_id = enrollment_id
         
-        print(f"[WORKER] Iniciando processamento da inscrição {enrollment_id} (nome: {existing_enrollment.get('name', 'N/A')})")
+        print(f"[WORKER] Iniciando processamento da inscrição {enrollment_id} (nome: {enrollment.get('name', 'N/A')}, tentativa {enrollment.get('attempts')})")
         
         # Simula processamento (mínimo 2s conforme requisito)
         time.sleep(2)
         
-        # Atualiza status no MongoDB
-        result = mongo_db.enrollments.update_one(
-            {"_id": enrollment_id},
-            {"$set": {"status": "processed", "message": "Inscrição processada com sucesso!"}}
-        )
-        
-        if result.modified_count > 0:
-            print(f"[WORKER] ✅ Inscrição {enrollment_id} processada com sucesso!")
-        else:
-            print(f"[WORKER] ⚠️ Falha ao atualizar status da inscrição {enrollment_id}")
-        
-        ch.basic_ack(delivery_tag=method.delivery_tag)
+        # O status é gravado pelo StatusBatcher, junto com as demais inscrições do lote
+        return PROCESSED, enrollment_id
         
     except Exception as e:
         print(f"[WORKER] ❌ Erro inesperado ao processar inscrição: {e}")
         print(f"[WORKER] Tipo do body: {type(body)}")
         print(f"[WORKER] Conteúdo do body: {body}")
-        # Rejeita a mensagem sem recolocar para evitar loop infinito
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+        if claimed_id is not None:
+            try:
+                release_enrollment(claimed_id, lease_token, e)
+            except Exception as update_error:
+                # O lease vence e a próxima tentativa reivindica a inscrição mesmo assim
+                print(f"[WORKER] Erro ao liberar inscrição {claimed_id}: {update_error}")
+        return RETRY, enrollment_id
+
+class StatusBatcher:
+    """
+    Agrupa as inscrições processadas e grava os status com um único
+    bulk_write não ordenado. Depois confirma com basic_ack(multiple=True)
+    o maior intervalo contíguo de delivery tags já resolvidas: um ack
+    múltiplo nunca cobre mensagens ainda em processamento ou cuja escrita falhou.
+    
+    Mensagens com falha são republicadas na fila de retry do próximo atraso
+    (ou na DLQ) antes de serem confirmadas, em vez de rejeitadas.
+    
+    Roda apenas na thread da conexão (o canal do pika não é thread-safe).
+    """
+    
+    def __init__(self, connection, channel, batch_size=WORKER_BATCH_SIZE, window=WORKER_BATCH_WINDOW):
+        self.connection = connection
+        self.channel = channel
+        self.batch_size = batch_size
+        self.window = window
+        self.flushes = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self._writes = []          # (delivery, enrollment_id) aguardando o bulk_write
+        self._resolved = {}        # delivery_tag -> True (confirmar) / False (já rejeitada)
+        self._acked_through = 0    # Maior delivery tag já coberta pelos acks
+        self._timer = None
+    
+    def complete(self, delivery, outcome, enrollment_id=None):
+        """Registra o resultado de uma mensagem"""
+        if outcome == PROCESSED:
+            self._writes.append((delivery, enrollment_id))
+            if len(self._writes) >= self.batch_size:
+                self.flush()
+            elif self._timer is None:
+                self._timer = self.connection.call_later(self.window, self._on_timer)
+        elif outcome == ACK:
+            self._resolved[delivery.tag] = True
+            drain_meter.record()
+            self._ack_contiguous()
+        elif outcome == DEFER:
+            self._republish(delivery, enrollment_id, count_attempt=False)
+            self._ack_contiguous()
+        else:
+            self._republish(delivery, enrollment_id)
+            self._ack_contiguous()
+    
+    def _on_timer(self):
+        self._timer = None
+        self.flush()
+    
+    def flush(self):
+        """Grava o lote pendente e confirma as mensagens gravadas"""
+        if self._timer is not None:
+            self.connection.remove_timeout(self._timer)
+            self._timer = None
+        if not self._writes:
+            return
+        
+        batch, self._writes = self._writes, []
+        operations = [
+            UpdateOne(
+                # processing → processed, apenas se o lease ainda pertence a esta entrega
+                {"_id": enrollment_id, "status": STATUS_PROCESSING, "lease_token": delivery.lease_token},
+                {
+                    "$set": {"status": STATUS_PROCESSED, "message": "Inscrição processada com sucesso!"},
+                    "$unset": LEASE_FIELDS,
+                    "$currentDate": {"processed_at": True},
+                }
+            )
+            for delivery, enrollment_id in batch
+        ]
+        failed = set()
+        try:
+            result = mongo_db.enrollments.bulk_write(operations, ordered=False)
+            updated = result.modified_count
+        except BulkWriteError as e:
+            # Em modo não ordenado as demais operações do lote foram aplicadas
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            updated = e.details.get("nModified", 0)
+            print(f"[WORKER] ⚠️ {len(failed)} de {len(batch)} atualizações de status falharam")
+        except Exception as e:
+            # Falha do lote inteiro (ex.: conexão): todas as mensagens ganham nova tentativa
+            print(f"[WORKER] ❌ Erro ao gravar lote de status: {e}")
+            for delivery, enrollment_id in batch:
+                self._republish(delivery, enrollment_id)
+            self._ack_contiguous()
+            return
+        
+        for index, (delivery, enrollment_id) in enumerate(batch):
+            if index in failed:
+                self._republish(delivery, enrollment_id)
+            else:
+                self._resolved[delivery.tag] = True
+                drain_meter.record()
+        
+        self.flushes += 1
+        print(f"[WORKER] ✅ Lote gravado: {len(batch) - len(failed)} inscrições ({updated} atualizadas)")
+        self._ack_contiguous()
+    
+    def _republish(self, delivery, enrollment_id=None, count_attempt=True):
+        """Publica a mensagem na fila de retry (ou na DLQ) e a marca para confirmação"""
+        retries = delivery.retries + 1 if count_attempt else delivery.retries
+        if count_attempt and retries > len(WORKER_RETRY_DELAYS):
+            target = DEAD_LETTER_QUEUE
+            print(f"[WORKER] ❌ Inscrição {enrollment_id} enviada para a DLQ após {retries} tentativas")
+        else:
+            # Adiamentos não contam tentativa: esperam o menor atraso pelo fim do lease
+            delay = WORKER_RETRY_DELAYS[retries - 1] if count_attempt else WORKER_RETRY_DELAYS[0]
+            target = retry_queue_name(delay)
+            print(f"[WORKER] Inscrição {enrollment_id} agendada para nova tentativa em {delay}s")
+        
+        published = self._publish(target, delivery, retries)
+        if not published and target != DEAD_LETTER_QUEUE and self.channel.is_open:
+            print(f"[WORKER] Fila {target} indisponível, enviando mensagem {delivery.tag} para a DLQ")
+            target = DEAD_LETTER_QUEUE
+            published = self._publish(target, delivery, retries)
+        if not published:
+            self._requeue_later(delivery)
+            return
+        
+        if target == DEAD_LETTER_QUEUE:
+            if enrollment_id is not None:
+                try:
+                    fail_enrollment(enrollment_id, delivery.lease_token, retries)
+                except Exception as e:
+                    print(f"[WORKER] Erro ao marcar inscrição {enrollment_id} como falha: {e}")
+            self.dead_lettered += 1
+        else:
+            self.retried += 1
+        self._resolved[delivery.tag] = True
+        drain_meter.record()
+    
+    def _publish(self, target, delivery, retries):
+        """Publica a cópia da mensagem em target; False se o broker não a aceitou"""
+        try:
+            self.channel.basic_publish(
+                exchange='',
+                routing_key=target,
+                body=delivery.body,
+                properties=pika.BasicProperties(
+                    delivery_mode=2,
+                    headers={**delivery.headers, RETRY_HEADER: retries}
+                )
+            )
+            return True
+        except Exception as e:
+            print(f"[WORKER] Erro ao republicar mensagem {delivery.tag} em {target}: {e}")
+            return False
+    
+    def _requeue_later(self, delivery):
+        """
+        Devolve a mensagem original à fila quando nem o retry nem a DLQ a aceitaram.
+        Um requeue imediato a reentregaria na hora, em loop: com o canal aberto
+        o nack espera o menor atraso de retry; com o canal fechado o broker já
+        devolveu a mensagem, entregue de novo quando o canal for restabelecido.
+        """
+        if not self.channel.is_open:
+            self._reject(delivery.tag, requeue=True)
+            return
+        
+        def requeue():
+            self._reject(delivery.tag, requeue=True)
+            self._ack_contiguous()
+        self.connection.call_later(WORKER_RETRY_DELAYS[0], requeue)
+    
+    def _reject(self, delivery_tag, requeue):
+        if self.channel.is_open:
+            self.channel.basic_nack(delivery_tag=delivery_tag, requeue=requeue)
+        self._resolved[delivery_tag] = False
+        drain_meter.record()
+    
+    def _ack_contiguous(self):
+        ack_tag = None
+        while self._acked_through + 1 in self._resolved:
+            self._acked_through += 1
+            if self._resolved.pop(self._acked_through):
+                ack_tag = self._acked_through
+        if ack_tag is None:
+            return
+        if not self.channel.is_open:
+            # Sem ack o broker devolve as mensagens à fila quando o canal cai
+            print(f"[WORKER] Canal fechado, mensagens até {ack_tag} serão reentregues")
+            return
+        # Mensagens rejeitadas no intervalo já não estão pendentes e não são afetadas
+        self.channel.basic_ack(delivery_tag=ack_tag, multiple=True)
+
+
+# Inicializado em main(), depois que o canal é aberto
+status_batcher = None
+
+def process_enrollment(ch, method, properties, body):
+    """Processa uma inscrição da fila (uma mensagem por vez)"""
+    delivery = Delivery.receive(method, properties, body)
+    outcome, enrollment_id = handle_enrollment(body, delivery.lease_token)
+    status_batcher.complete(delivery, outcome, enrollment_id)
+
+class ConcurrentConsumer:
+    """
+    Processa até `concurrency` mensagens em paralelo em um pool de threads.
+    
+    O canal do pika não é thread-safe: as threads do pool só executam
+    handle_enrollment, e o resultado é devolvido à thread da conexão com
+    add_callback_threadsafe, onde o StatusBatcher grava o status e confirma.
+    """
+    
+    def __init__(self, connection, concurrency):
+        self.connection = connection
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="enrollment")
+        self.in_flight = 0  # Acessado apenas na thread da conexão
+    
+    def on_message(self, ch, method, properties, body):
+        self.in_flight += 1
+        delivery = Delivery.receive(method, properties, body)
+        future = self.executor.submit(handle_enrollment, body, delivery.lease_token)
+        future.add_done_callback(
+            lambda f: self.connection.add_callback_threadsafe(
+                functools.partial(self._complete, delivery, f)
+            )
+        )
+    
+    def _complete(self, delivery, future):
+        self.in_flight -= 1
+        try:
+            outcome, enrollment_id = future.result()
+        except Exception as e:
+            print(f"[WORKER] ❌ Erro inesperado no pool de processamento: {e}")
+            outcome, enrollment_id = RETRY, None
+        status_batcher.complete(delivery, outcome, enrollment_id)
+    
+    def shutdown(self):
+        """Aguarda as mensagens em processamento e envia os acks pendentes"""
+        self.executor.shutdown(wait=True)
+        if self.connection.is_open:
+            self.connection.process_data_events(time_limit=0)
+
+def schedule_drain_report(connection, consumer=None):
+    """Registra a vazão periodicamente na thread da conexão"""
+    def report():
+        drain_meter.report(consumer.in_flight if consumer else 0)
+        connection.call_later(WORKER_STATS_INTERVAL, report)
+    connection.call_later(WORKER_STATS_INTERVAL, report)
+
+def stop_worker(connection, channel, consumer=None):
+    """Para de consumir, conclui as mensagens em processamento e fecha as conexões"""
+    print("[WORKER] Parando worker...")
+    if channel.is_open:
+        channel.stop_consuming()
+    if consumer:
+        consumer.shutdown()
+    if status_batcher is not None and channel.is_open:
+        status_batcher.flush()
+    drain_meter.report()
+    if connection.is_open:
+        connection.close()
+    if mongo_client:
+        mongo_client.close()
 
 def main():
     """Função principal do worker"""
+    global status_batcher
     try:
         print("[WORKER] Iniciando worker...")
         
+        # Sem atrasos não há filas de retry para adiamentos e novas tentativas
+        if not WORKER_RETRY_DELAYS:
+            raise Exception("WORKER_RETRY_DELAYS precisa de ao menos um atraso (ex.: 5,30,120)")
+        
         # Conecta ao MongoDB primeiro
         if not connect_mongodb():
             raise Exception("Falha ao conectar ao MongoDB")
@@ -170,29 +589,40 @@ def main():
         connection = connect_rabbitmq_with_retry(RABBITMQ_HOST, RABBITMQ_PORT, RABBITMQ_USER, RABBITMQ_PASSWORD)
         channel = connection.channel()
         
-        # Declara a fila (garante que existe)
-        channel.queue_declare(queue=RABBITMQ_QUEUE, durable=True)
+        # Declara a fila principal, as filas de retry e a DLQ
+        declare_retry_topology(channel)
+        # Republicações para retry/DLQ só são confirmadas depois do ack do broker
+        channel.confirm_delivery()
         
-        # Configura QoS para processar uma mensagem por vez
-        channel.basic_qos(prefetch_count=1)
+        # Prefetch cobre as mensagens em processamento e as que aguardam o lote de status
+        channel.basic_qos(prefetch_count=WORKER_CONCURRENCY + WORKER_BATCH_SIZE - 1)
+        status_batcher = StatusBatcher(connection, channel)
         
         # Configura o consumidor
-        channel.basic_consume(queue=RABBITMQ_QUEUE, on_message_callback=process_enrollment)
+        consumer = None
+        if WORKER_CONCURRENCY > 1:
+            consumer = ConcurrentConsumer(connection, WORKER_CONCURRENCY)
+            channel.basic_consume(queue=RABBITMQ_QUEUE, on_message_callback=consumer.on_message)
+        else:
+            channel.basic_consume(queue=RABBITMQ_QUEUE, on_message_callback=process_enrollment)
+        schedule_drain_report(connection, consumer)
+        
+        # SIGTERM (docker stop / supervisor): encerra o consumo sem perder mensagens em processamento
+        def request_stop(signum, frame):
+            print("[WORKER] SIGTERM recebido, drenando mensagens em processamento...")
+            connection.add_callback_threadsafe(channel.stop_consuming)
+        signal.signal(signal.SIGTERM, request_stop)
         
         print(f"[WORKER] Aguardando inscrições na fila '{RABBITMQ_QUEUE}'...")
         print("[WORKER] Para parar, pressione CTRL+C")
         
-        # Inicia o consumo
+        # Inicia o consumo (retorna após stop_consuming)
         channel.start_consuming()
+        stop_worker(connection, channel, consumer)
         
     except KeyboardInterrupt:
-        print("[WORKER] Parando worker...")
         if 'channel' in locals():
-            channel.stop_consuming()
-        if 'connection' in locals():
-            connection.close()
-        if mongo_client:
-            mongo_client.close()
+            stop_worker(connection, channel, locals().get('consumer'))
     except Exception as e:
         print(f"[WORKER] Erro fatal: {e}")
         raise
@@ -40,9 +40,12 @@ if "MONGO_INITDB_ROOT_PASSWORD" in os.environ:
 os.environ["RABBITMQ_HOST"] = "localhost"
 os.environ["RABBITMQ_PORT"] = "5672"
 os.environ["BASIC_AUTH_USERS"] = "admin:secret123,config:config123,test:test123"
+os.environ["AUTH_TOKEN_SECRET"] = "test-token-secret-0123456789abcdef"
 
 # Import da aplicação após configurar variáveis de ambiente
 from app.main import app
+from app.services.age_group_index import age_group_index
+from app.services.enrollment import enrollment_status_cache
 
 def clean_db():
     """Função utilitária para limpar completamente o banco e fila"""
@@ -98,6 +101,13 @@ class APITestClient:
         """Delega chamadas para o cliente FastAPI"""
         return getattr(self.client, name)
 
+@pytest.fixture(autouse=True)
+def reset_enrollment_status_cache():
+    """Evita que status em cache de um teste vazem para o seguinte"""
+    enrollment_status_cache.clear()
+    yield
+    enrollment_status_cache.clear()
+
 @pytest.fixture(scope="session")
 def api_client():
     """Fixture que fornece um cliente de teste para toda a sessão"""
@@ -159,6 +169,9 @@ def clean_database(mongo_client):
     db.age_groups.delete_many({})
     db.enrollments.delete_many({})
     
+    # Remoções diretas no banco não passam pelo serviço; força recarga do índice
+    age_group_index.invalidate()
+    
     # Limpa a fila RabbitMQ também
     try:
         connection = pika.BlockingConnection(pika.ConnectionParameters(host='localhost', port=5672))
@@ -173,6 +186,7 @@ def clean_database(mongo_client):
     # Limpa as coleções após o teste
     db.age_groups.delete_many({})
     db.enrollments.delete_many({})
+    age_group_index.invalidate()
     
     # Limpa a fila RabbitMQ novamente após o teste
     try:
@@ -236,7 +250,11 @@ def wait_for_enrollment_processing(api_client: APITestClient, enrollment_id: str
     
     while time.time() - start_time < timeout:
         try:
-            response = api_client.client.get(f"/enrollments/{enrollment_id}", headers={"Authorization": auth_header})
+            # Long-poll: a API responde assim que o status muda
+            wait = max(min(timeout - (time.time() - start_time), 10), 0.1)
+            response = api_client.client.get(
+                f"/enrollments/{enrollment_id}", params={"wait": wait}, headers={"Authorization": auth_header}
+            )
             if response.status_code == 200:
                 data = response.json()
                 status = data.get("status", "unknown")
@@ -249,11 +267,12 @@ def wait_for_enrollment_processing(api_client: APITestClient, enrollment_id: str
                 # Se status é "pending", continua aguardando
             else:
                 print(f"Erro ao buscar status do enrollment {enrollment_id}: {response.status_code}")
+                # Sem long-poll (ex.: 404 antes da inscrição ficar visível): evita repetir em seguida
+                time.sleep(0.5)
                 
         except Exception as e:
             print(f"Erro ao verificar status do enrollment {enrollment_id}: {e}")
-        
-        time.sleep(0.5)  # Aguarda meio segundo antes de tentar novamente
+            time.sleep(0.5)  # Aguarda meio segundo antes de tentar novamente
     
     # Timeout atingido
     try:
@@ -24,6 +24,28 @@ class TestAdminEndpoints:
             # Verifica que a senha não está exposta
             assert "password" not in user
 
+    def test_list_users_paginated(self, api_client: APITestClient):
+        """Testa paginação da listagem de usuários por username"""
+        auth_header = create_basic_auth_header("admin", "secret123")
+        response = api_client.client.get("/admin/users?limit=2", headers={"Authorization": auth_header})
+        
+        assert response.status_code == 200
+        first_page = response.json()
+        assert len(first_page) == 2
+        after = response.headers["X-Next-After"]
+        assert after == first_page[-1]["username"]
+        
+        response = api_client.client.get(f"/admin/users?limit=100&after={after}", headers={"Authorization": auth_header})
+        assert response.status_code == 200
+        second_page = response.json()
+        assert "X-Next-After" not in response.headers
+        usernames = [user["username"] for user in first_page + second_page]
+        assert usernames == sorted(usernames)
+        assert len(usernames) >= 4
+        
+        response = api_client.client.get("/admin/users?limit=0", headers={"Authorization": auth_header})
+        assert response.status_code == 422
+
     def test_list_users_as_manager(self, api_client: APITestClient):
         """Testa listagem de usuários como manager (também admin)"""
         auth_header = create_basic_auth_header("manager", "manager789")
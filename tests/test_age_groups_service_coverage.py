@@ -4,7 +4,7 @@ Testes específicos para melhorar cobertura do serviço age_groups.py
 
 import pytest
 import asyncio
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from bson import ObjectId
 from app.services.age_groups import (
     create_age_group,
@@ -16,6 +16,32 @@ from app.services.age_groups import (
 from app.models.age_group import AgeGroupCreate, AgeGroupUpdate
 
 
+class AsyncCursorMock:
+    """Simula o cursor assíncrono retornado por find()"""
+
+    def __init__(self, docs):
+        self._docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def make_async_collection():
+    """Cria mock de coleção do driver assíncrono (operações aguardáveis)"""
+    collection = MagicMock()
+    collection.insert_one = AsyncMock()
+    collection.find_one = AsyncMock()
+    collection.update_one = AsyncMock()
+    collection.delete_one = AsyncMock()
+    return collection
+
+
 class TestAgeGroupsServiceCoverage:
     """Testes para melhorar cobertura do serviço age_groups"""
 
@@ -23,7 +49,7 @@ class TestAgeGroupsServiceCoverage:
     async def test_create_age_group_success(self):
         """Testa criação bem-sucedida de age group"""
         # Mock do MongoDB
-        mock_collection = MagicMock()
+        mock_collection = make_async_collection()
         mock_result = MagicMock()
         mock_result.inserted_id = ObjectId("507f1f77bcf86cd799439011")
         mock_collection.insert_one.return_value = mock_result
@@ -36,7 +62,7 @@ class TestAgeGroupsServiceCoverage:
         }
         mock_collection.find_one.return_value = created_doc
         
-        with patch('app.services.age_groups.mongo_db') as mock_db:
+        with patch('app.services.age_groups.async_mongo_db') as mock_db:
             mock_db.age_groups = mock_collection
             
             age_group_data = AgeGroupCreate(min_age=18, max_age=25)
@@ -54,7 +80,7 @@ class TestAgeGroupsServiceCoverage:
     @pytest.mark.asyncio
     async def test_get_age_group_found(self):
         """Testa busca de age group existente"""
-        mock_collection = MagicMock()
+        mock_collection = make_async_collection()
         found_doc = {
             "_id": ObjectId("507f1f77bcf86cd799439011"),
             "min_age": 18,
@@ -62,7 +88,7 @@ class TestAgeGroupsServiceCoverage:
         }
         mock_collection.find_one.return_value = found_doc
         
-        with patch('app.services.age_groups.mongo_db') as mock_db:
+        with patch('app.services.age_groups.async_mongo_db') as mock_db:
             mock_db.age_groups = mock_collection
             
             result = await get_age_group("507f1f77bcf86cd799439011")
@@ -78,10 +104,10 @@ class TestAgeGroupsServiceCoverage:
     @pytest.mark.asyncio
     async def test_get_age_group_not_found(self):
         """Testa busca de age group inexistente"""
-        mock_collection = MagicMock()
+        mock_collection = make_async_collection()
         mock_collection.find_one.return_value = None
         
-        with patch('app.services.age_groups.mongo_db') as mock_db:
+        with patch('app.services.age_groups.async_mongo_db') as mock_db:
             mock_db.age_groups = mock_collection
             
             result = await get_age_group("507f1f77bcf86cd799439011")
@@ -93,9 +119,9 @@ class TestAgeGroupsServiceCoverage:
     @pytest.mark.asyncio
     async def test_get_age_group_invalid_object_id(self):
         """Testa busca com ObjectId inválido"""
-        mock_collection = MagicMock()
+        mock_collection = make_async_collection()
         
-        with patch('app.services.age_groups.mongo_db') as mock_db:
+        with patch('app.services.age_groups.async_mongo_db') as mock_db:
             mock_db.age_groups = mock_collection
             
             # ObjectId inválido deve gerar exceção
@@ -105,7 +131,7 @@ class TestAgeGroupsServiceCoverage:
     @pytest.mark.asyncio
     async def test_get_all_age_groups_with_data(self):
         """Testa busca de todos os age groups com dados"""
-        mock_collection = MagicMock()
+        mock_collection = make_async_collection()
         
         # Mock do cursor com múltiplos documentos
         mock_docs = [
@@ -113,9 +139,9 @@ class TestAgeGroupsServiceCoverage:
             {"_id": ObjectId("507f1f77bcf86cd799439012"), "min_age": 26, "max_age": 35},
             {"_id": ObjectId("507f1f77bcf86cd799439013"), "min_age": 36, "max_age": 45}
         ]
-        mock_collection.find.return_value = iter(mock_docs)
+        mock_collection.find.return_value = AsyncCursorMock(mock_docs)
         
-        with patch('app.services.age_groups.mongo_db') as mock_db:
+        with patch('app.services.age_groups.async_mongo_db') as mock_db:
             mock_db.age_groups = mock_collection
             
             result = await get_all_age_groups()
@@ -144,10 +170,10 @@ class TestAgeGroupsServiceCoverage:
     @pytest.mark.asyncio
     async def test_get_all_age_groups_empty(self):
         """Testa busca de todos os age groups sem dados"""
-        mock_collection = MagicMock()
-        mock_collection.find.return_value = iter([])  # Lista vazia
+        mock_collection = make_async_collection()
+        mock_collection.find.return_value = AsyncCursorMock([])  # Lista vazia
         
-        with patch('app.services.age_groups.mongo_db') as mock_db:
+        with patch('app.services.age_groups.async_mongo_db') as mock_db:
             mock_db.age_groups = mock_collection
             
             result = await get_all_age_groups()
@@ -159,7 +185,7 @@ class TestAgeGroupsServiceCoverage:
     @pytest.mark.asyncio
     async def test_update_age_group_success(self):
         """Testa atualização bem-sucedida de age group"""
-        mock_collection = MagicMock()
+        mock_collection = make_async_collection()
         
         # Mock do resultado da atualização
         mock_update_result = MagicMock()
@@ -174,7 +200,7 @@ class TestAgeGroupsServiceCoverage:
         }
         mock_collection.find_one.return_value = updated_doc
         
-        with patch('app.services.age_groups.mongo_db') as mock_db:
+        with patch('app.services.age_groups.async_mongo_db') as mock_db:
             mock_db.age_groups = mock_collection
             
             age_group_update = AgeGroupUpdate(min_age=20, max_age=30)
@@ -195,14 +221,14 @@ class TestAgeGroupsServiceCoverage:
     @pytest.mark.asyncio
     async def test_update_age_group_not_modified(self):
         """Testa atualização de age group que não foi modificado"""
-        mock_collection = MagicMock()
+        mock_collection = make_async_collection()
         
         # Mock do resultado da atualização (nenhum documento modificado)
         mock_update_result = MagicMock()
         mock_update_result.modified_count = 0
         mock_collection.update_one.return_value = mock_update_result
         
-        with patch('app.services.age_groups.mongo_db') as mock_db:
+        with patch('app.services.age_groups.async_mongo_db') as mock_db:
             mock_db.age_groups = mock_collection
             
             age_group_update = AgeGroupUpdate(min_age=20, max_age=30)
@@ -221,9 +247,9 @@ class TestAgeGroupsServiceCoverage:
     @pytest.mark.asyncio
     async def test_update_age_group_invalid_object_id(self):
         """Testa atualização com ObjectId inválido"""
-        mock_collection = MagicMock()
+        mock_collection = make_async_collection()
         
-        with patch('app.services.age_groups.mongo_db') as mock_db:
+        with patch('app.services.age_groups.async_mongo_db') as mock_db:
             mock_db.age_groups = mock_collection
             
             age_group_update = AgeGroupUpdate(min_age=20, max_age=30)
@@ -235,14 +261,14 @@ class TestAgeGroupsServiceCoverage:
     @pytest.mark.asyncio
     async def test_delete_age_group_success(self):
         """Testa exclusão bem-sucedida de age group"""
-        mock_collection = MagicMock()
+        mock_collection = make_async_collection()
         
         # Mock do resultado da exclusão
         mock_delete_result = MagicMock()
         mock_delete_result.deleted_count = 1
         mock_collection.delete_one.return_value = mock_delete_result
         
-        with patch('app.services.age_groups.mongo_db') as mock_db:
+        with patch('app.services.age_groups.async_mongo_db') as mock_db:
             mock_db.age_groups = mock_collection
             
             result = await delete_age_group("507f1f77bcf86cd799439011")
@@ -254,14 +280,14 @@ class TestAgeGroupsServiceCoverage:
     @pytest.mark.asyncio
     async def test_delete_age_group_not_found(self):
         """Testa exclusão de age group inexistente"""
-        mock_collection = MagicMock()
+        mock_collection = make_async_collection()
         
         # Mock do resultado da exclusão (nenhum documento excluído)
         mock_delete_result = MagicMock()
         mock_delete_result.deleted_count = 0
         mock_collection.delete_one.return_value = mock_delete_result
         
-        with patch('app.services.age_groups.mongo_db') as mock_db:
+        with patch('app.services.age_groups.async_mongo_db') as mock_db:
             mock_db.age_groups = mock_collection
             
             result = await delete_age_group("507f1f77bcf86cd799439011")
@@ -273,9 +299,9 @@ class TestAgeGroupsServiceCoverage:
     @pytest.mark.asyncio
     async def test_delete_age_group_invalid_object_id(self):
         """Testa exclusão com ObjectId inválido"""
-        mock_collection = MagicMock()
+        mock_collection = make_async_collection()
         
-        with patch('app.services.age_groups.mongo_db') as mock_db:
+        with patch('app.services.age_groups.async_mongo_db') as mock_db:
             mock_db.age_groups = mock_collection
             
             # ObjectId inválido deve gerar exceção
@@ -289,7 +315,7 @@ class TestAgeGroupsServiceIntegration:
     @pytest.mark.asyncio
     async def test_create_and_get_age_group_flow(self):
         """Testa fluxo completo de criação e busca"""
-        mock_collection = MagicMock()
+        mock_collection = make_async_collection()
         
         # Setup para create
         mock_insert_result = MagicMock()
@@ -312,7 +338,7 @@ class TestAgeGroupsServiceIntegration:
         # Configura retornos diferentes para cada chamada
         mock_collection.find_one.side_effect = [created_doc, get_doc]
         
-        with patch('app.services.age_groups.mongo_db') as mock_db:
+        with patch('app.services.age_groups.async_mongo_db') as mock_db:
             mock_db.age_groups = mock_collection
             
             # Criar age group
@@ -330,7 +356,7 @@ class TestAgeGroupsServiceIntegration:
     @pytest.mark.asyncio
     async def test_update_and_get_age_group_flow(self):
         """Testa fluxo completo de atualização e busca"""
-        mock_collection = MagicMock()
+        mock_collection = make_async_collection()
         
         # Setup para update
         mock_update_result = MagicMock()
@@ -353,7 +379,7 @@ class TestAgeGroupsServiceIntegration:
         # Configura retornos diferentes para cada chamada
         mock_collection.find_one.side_effect = [updated_doc, get_doc]
         
-        with patch('app.services.age_groups.mongo_db') as mock_db:
+        with patch('app.services.age_groups.async_mongo_db') as mock_db:
             mock_db.age_groups = mock_collection
             
             # Atualizar age group
@@ -371,16 +397,16 @@ class TestAgeGroupsServiceIntegration:
     @pytest.mark.asyncio
     async def test_create_multiple_and_get_all_flow(self):
         """Testa fluxo de criação múltipla e busca de todos"""
-        mock_collection = MagicMock()
+        mock_collection = make_async_collection()
         
         # Setup para múltiplas criações (simplificado)
         mock_docs = [
             {"_id": ObjectId("507f1f77bcf86cd799439011"), "min_age": 18, "max_age": 25},
             {"_id": ObjectId("507f1f77bcf86cd799439012"), "min_age": 26, "max_age": 35}
         ]
-        mock_collection.find.return_value = iter(mock_docs)
+        mock_collection.find.return_value = AsyncCursorMock(mock_docs)
         
-        with patch('app.services.age_groups.mongo_db') as mock_db:
+        with patch('app.services.age_groups.async_mongo_db') as mock_db:
             mock_db.age_groups = mock_collection
             
             # Buscar todos os age groups
@@ -394,7 +420,7 @@ class TestAgeGroupsServiceIntegration:
     @pytest.mark.asyncio
     async def test_delete_and_verify_removal_flow(self):
         """Testa fluxo de exclusão e verificação"""
-        mock_collection = MagicMock()
+        mock_collection = make_async_collection()
         
         # Setup para delete
         mock_delete_result = MagicMock()
@@ -404,7 +430,7 @@ class TestAgeGroupsServiceIntegration:
         # Setup para get após delete (não encontrado)
         mock_collection.find_one.return_value = None
         
-        with patch('app.services.age_groups.mongo_db') as mock_db:
+        with patch('app.services.age_groups.async_mongo_db') as mock_db:
             mock_db.age_groups = mock_collection
             
             # Excluir age group
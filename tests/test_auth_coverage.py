@@ -6,6 +6,7 @@ import pytest
 import json
 import os
 import tempfile
+import bcrypt
 from unittest.mock import patch, mock_open
 from app.auth.basic_auth import (
     BasicAuthManager, 
@@ -13,6 +14,7 @@ from app.auth.basic_auth import (
     create_basic_auth_header,
     auth_manager
 )
+from app.auth.passwords import VerifiedCredentialCache, hash_password, is_password_hash, verify_password
 
 
 class TestBasicAuthManagerCoverage:
@@ -167,6 +169,11 @@ class TestBasicAuthUtilities:
         assert username == "admin"
         assert password == "secret"
 
+    def test_decode_basic_auth_scheme_is_case_insensitive(self):
+        """Testa que o esquema Basic é aceito em qualquer caixa"""
+        assert decode_basic_auth("basic YWRtaW46c2VjcmV0") == ("admin", "secret")
+        assert decode_basic_auth("BASIC YWRtaW46c2VjcmV0") == ("admin", "secret")
+
     def test_create_basic_auth_header(self):
         """Testa criação de header Basic Auth"""
         header = create_basic_auth_header("admin", "secret")
@@ -249,4 +256,456 @@ class TestBasicAuthManagerIntegration:
         assert isinstance(auth_manager, BasicAuthManager)
         
         # Verifica que tem usuários carregados
-        assert len(auth_manager.users) > 0 
\ No newline at end of file
+        assert len(auth_manager.users) > 0 
+
+class TestPasswordHashing:
+    """Testes para hash de senhas e cache de credenciais verificadas"""
+
+    def _manager(self, users):
+        manager = BasicAuthManager()
+        manager.users = users
+        manager.credential_cache.clear()
+        return manager
+
+    def test_hash_and_verify(self):
+        """Testa geração e verificação de hash bcrypt"""
+        hashed = hash_password("s3nha", rounds=4)
+        assert is_password_hash(hashed)
+        assert verify_password("s3nha", hashed)
+        assert not verify_password("errada", hashed)
+
+    def test_legacy_plaintext_still_verifies(self):
+        """Testa que senhas antigas em texto puro continuam aceitas"""
+        assert not is_password_hash("filepass")
+        assert verify_password("filepass", "filepass")
+        assert not verify_password("wrong", "filepass")
+        assert not verify_password("any", None)
+
+    def test_users_file_stores_hashes(self):
+        """Testa que o users.json distribuído não guarda senhas em texto puro"""
+        manager = BasicAuthManager()
+        users, _ = manager._load_users_from_file()
+        assert users
+        assert all(is_password_hash(user["password"]) for user in users.values())
+
+    def test_cache_hit_skips_hash_verification(self):
+        """Testa que credenciais já verificadas não recalculam o hash"""
+        manager = self._manager({"user": {"password": hash_password("pass", rounds=4), "role": "user", "description": ""}})
+        assert manager.verify_credentials("user", "pass")
+        with patch('app.auth.basic_auth.verify_password') as mock_verify:
+            assert manager.verify_credentials("user", "pass")
+            mock_verify.assert_not_called()
+        assert manager.credential_cache.stats()["hits"] == 1
+
+    def test_unknown_user_pays_the_same_hash_check(self):
+        """Testa que um usuário inexistente também passa por um bcrypt.checkpw"""
+        manager = self._manager({"user": {"password": hash_password("pass", rounds=4), "role": "user", "description": ""}})
+        with patch('app.auth.passwords.config.AUTH_BCRYPT_ROUNDS', 4), \
+             patch('app.auth.passwords._dummy_hash', None), \
+             patch('app.auth.passwords.bcrypt.checkpw', wraps=bcrypt.checkpw) as mock_checkpw:
+            assert not manager.verify_credentials("ghost", "pass")
+        mock_checkpw.assert_called_once()
+        assert manager.credential_cache.stats()["entries"] == 0
+
+    def test_failed_verification_not_cached(self):
+        """Testa que senhas inválidas não entram no cache"""
+        manager = self._manager({"user": {"password": hash_password("pass", rounds=4), "role": "user", "description": ""}})
+        assert not manager.verify_credentials("user", "wrong")
+        assert manager.credential_cache.stats()["entries"] == 0
+
+    def test_cache_expires(self):
+        """Testa expiração das entradas do cache"""
+        cache = VerifiedCredentialCache(ttl=60, max_entries=10)
+        with patch('app.auth.passwords.time.monotonic', return_value=1000.0):
+            cache.add("user", "pass")
+            assert cache.contains("user", "pass")
+        with patch('app.auth.passwords.time.monotonic', return_value=1061.0):
+            assert not cache.contains("user", "pass")
+        assert cache.stats()["entries"] == 0
+
+    def test_cache_evicts_least_recently_used(self):
+        """Testa o limite de entradas do cache"""
+        cache = VerifiedCredentialCache(ttl=60, max_entries=2)
+        cache.add("a", "1")
+        cache.add("b", "2")
+        assert cache.contains("a", "1")
+        cache.add("c", "3")
+        assert cache.contains("a", "1")
+        assert not cache.contains("b", "2")
+        assert cache.contains("c", "3")
+
+    def test_reload_clears_cache(self):
+        """Testa que recarregar usuários invalida o cache"""
+        manager = self._manager({"user": {"password": "pass", "role": "user", "description": ""}})
+        assert manager.verify_credentials("user", "pass")
+        with patch.object(manager, '_load_users_from_file', return_value=(
+            {"user": {"password": "nova", "role": "user", "description": ""}}, {}
+        )):
+            assert manager.reload_users()
+        assert manager.credential_cache.stats()["entries"] == 0
+        assert not manager.verify_credentials("user", "pass")
+
+    async def test_async_verification_runs_in_executor(self):
+        """Testa a verificação assíncrona no pool de threads dedicado"""
+        manager = self._manager({"user": {"password": hash_password("pass", rounds=4), "role": "user", "description": ""}})
+        assert await manager.verify_credentials_async("user", "pass")
+        assert manager._verify_executor is not None
+        assert not await manager.verify_credentials_async("user", "wrong")
+        with patch.object(manager, '_verify_uncached') as mock_verify:
+            assert await manager.verify_credentials_async("user", "pass")
+            mock_verify.assert_not_called()
+        manager._verify_executor.shutdown()
+
+
+class TestBasicAuthMiddleware:
+    """Testes para o middleware ASGI de autenticação"""
+
+    def _client(self):
+        from fastapi.testclient import TestClient
+        from app.auth.middleware import BasicAuthMiddleware
+        from app.main import app
+        auth_manager._header_principals = {}
+        return TestClient(BasicAuthMiddleware(app))
+
+    def test_valid_credentials_attach_principal(self):
+        """Testa que o usuário autenticado chega à rota pelo escopo"""
+        client = self._client()
+        response = client.get("/me", headers={"Authorization": create_basic_auth_header("admin", "secret123")})
+        assert response.status_code == 200
+        assert response.json()["user"]["username"] == "admin"
+
+    def test_repeated_header_uses_snapshot(self):
+        """Testa que um header já autenticado não é verificado novamente"""
+        client = self._client()
+        header = create_basic_auth_header("config", "config123")
+        assert client.get("/me", headers={"Authorization": header}).status_code == 200
+        with patch.object(auth_manager, 'verify_credentials_async') as mock_verify:
+            response = client.get("/me", headers={"Authorization": header})
+            mock_verify.assert_not_called()
+        assert response.status_code == 200
+        assert auth_manager.lookup_authorization(header.encode())["username"] == "config"
+
+    def test_lowercase_scheme_attaches_principal(self):
+        """Testa que o middleware aceita o esquema basic em minúsculas"""
+        client = self._client()
+        header = create_basic_auth_header("admin", "secret123").replace("Basic ", "basic ")
+        response = client.get("/me", headers={"Authorization": header})
+        assert response.status_code == 200
+        assert response.json()["user"]["username"] == "admin"
+
+    def test_invalid_and_missing_credentials(self):
+        """Testa 401 para credenciais inválidas, ausentes ou malformadas"""
+        client = self._client()
+        header = create_basic_auth_header("admin", "wrong")
+        response = client.get("/me", headers={"Authorization": header})
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Credenciais inválidas"
+        assert auth_manager.lookup_authorization(header.encode()) is None
+        assert client.get("/me").status_code == 401
+        assert client.get("/me", headers={"Authorization": "Basic !!!"}).status_code == 401
+        assert client.get("/").status_code == 200
+
+    def test_admin_role_from_principal(self):
+        """Testa que get_admin_user verifica o papel do usuário do escopo"""
+        client = self._client()
+        response = client.get("/admin/users", headers={"Authorization": create_basic_auth_header("operator", "operator456")})
+        assert response.status_code == 403
+        response = client.get("/admin/users", headers={"Authorization": create_basic_auth_header("manager", "manager789")})
+        assert response.status_code == 200
+
+    def test_reload_clears_snapshot(self):
+        """Testa que recarregar usuários descarta os headers autenticados"""
+        manager = BasicAuthManager()
+        manager.users = {"user": {"password": "pass", "role": "user", "description": ""}}
+        header = create_basic_auth_header("user", "pass").encode()
+        manager._remember_authorization(header, manager.get_user_info("user"))
+        assert manager.lookup_authorization(header) is not None
+        with patch.object(manager, '_load_users_from_file', return_value=(
+            {"user": {"password": "nova", "role": "user", "description": ""}}, {}
+        )):
+            assert manager.reload_users()
+        assert manager.lookup_authorization(header) is None
+
+    def test_snapshot_is_replaced_not_mutated(self):
+        """Testa que cada inclusão publica um novo dicionário e respeita o limite"""
+        manager = BasicAuthManager()
+        manager.credential_cache.max_entries = 2
+        user_info = {"username": "u", "role": "user", "description": ""}
+        manager._remember_authorization(b"Basic a", user_info)
+        previous = manager._header_principals
+        manager._remember_authorization(b"Basic b", user_info)
+        assert previous is not manager._header_principals
+        assert list(previous) == [manager._header_key(b"Basic a")]
+        manager._remember_authorization(b"Basic c", user_info)
+        assert list(manager._header_principals) == [manager._header_key(b"Basic c")]
+
+    def test_header_map_does_not_keep_plaintext_credentials(self):
+        """Testa que o dicionário de headers é indexado por HMAC, não pelo header"""
+        manager = BasicAuthManager()
+        header = create_basic_auth_header("user", "pass").encode()
+        manager._remember_authorization(header, {"username": "user", "role": "user", "description": ""})
+        assert header not in manager._header_principals
+        assert manager.lookup_authorization(header)["username"] == "user"
+        assert BasicAuthManager()._header_key(header) != manager._header_key(header)
+
+
+class TestUserSnapshot:
+    """Testes para o snapshot imutável de usuários"""
+
+    USERS = {
+        "admin": {"password": "secret", "role": "admin", "description": "Administrator"},
+        "user": {"password": "pass", "role": "user", "description": "Regular user"},
+    }
+
+    def test_snapshot_precomputes_indexes(self):
+        """Testa índices por role e informações públicas pré-calculadas"""
+        manager = BasicAuthManager()
+        manager.users = self.USERS
+        snapshot = manager.snapshot
+        assert snapshot.roles["admin"] == ("admin",)
+        assert snapshot.roles["user"] == ("user",)
+        assert manager.get_user_info("user") is snapshot.principals["user"]
+        assert "password" not in snapshot.principals["admin"]
+        with pytest.raises(TypeError):
+            snapshot.users["other"] = {}
+
+    def test_reload_swaps_whole_snapshot(self):
+        """Testa que usuários e metadados são trocados juntos"""
+        manager = BasicAuthManager()
+        manager.users = self.USERS
+        old_snapshot = manager.snapshot
+        with patch.object(manager, '_load_users_from_file', return_value=(
+            {"new": {"password": "x", "role": "admin", "description": ""}}, {"version": "2"}
+        )):
+            assert manager.reload_users()
+        assert manager.snapshot is not old_snapshot
+        assert manager.snapshot.version > old_snapshot.version
+        assert list(manager.users) == ["new"]
+        assert manager.users_metadata == {"version": "2"}
+        # Leitores com o snapshot antigo continuam vendo um conjunto coerente
+        assert set(old_snapshot.users) == {"admin", "user"}
+
+    def test_verification_in_flight_during_reload_not_cached(self):
+        """Testa que uma verificação contra usuários antigos não entra no cache após a recarga"""
+        manager = BasicAuthManager()
+        manager.users = self.USERS
+
+        def verify_then_reload(username, password):
+            manager.users = {"user": {"password": "changed", "role": "user", "description": ""}}
+            return True
+
+        with patch.object(manager, '_verify_uncached', side_effect=verify_then_reload):
+            assert manager.verify_credentials("user", "pass")
+        assert manager.credential_cache.stats()["entries"] == 0
+        assert not manager.verify_credentials("user", "pass")
+
+
+class TestUserStores:
+    """Testes para os backends de usuários"""
+
+    def _collection(self, docs):
+        """Coleção simulada com find_one por _id"""
+        from unittest.mock import MagicMock
+        collection = MagicMock()
+        collection.find_one.side_effect = lambda query, projection=None: docs.get(query["_id"])
+        return collection
+
+    def test_snapshot_pagination(self):
+        """Testa a paginação por username do backend em memória"""
+        from app.auth.user_store import build_user_snapshot
+        snapshot = build_user_snapshot(1, {
+            name: {"password": "x", "role": "user", "description": ""} for name in ["c", "a", "d", "b"]
+        }, {})
+        assert [u["username"] for u in snapshot.list_users(limit=2)] == ["a", "b"]
+        assert [u["username"] for u in snapshot.list_users(limit=2, after="b")] == ["c", "d"]
+        assert snapshot.list_users(limit=2, after="d") == []
+        assert snapshot.count() == 4
+        assert snapshot.count_role("user") == 4
+
+    def test_mongo_store_loads_lazily_with_lru(self):
+        """Testa que usuários são lidos sob demanda e mantidos no cache LRU"""
+        from app.auth.user_store import MongoUserStore, NOT_CACHED
+        collection = self._collection({
+            "a": {"_id": "a", "password": "pa", "role": "admin", "description": ""},
+            "b": {"_id": "b", "password": "pb", "role": "user", "description": ""},
+        })
+        store = MongoUserStore(collection=collection, max_entries=2, ttl=60)
+
+        assert store.peek("a") is NOT_CACHED
+        assert store.get("a").principal == {"username": "a", "role": "admin", "description": ""}
+        assert store.get("a").password == "pa"
+        assert collection.find_one.call_count == 1
+
+        # Usernames inexistentes também ficam em cache
+        assert store.get("missing") is None
+        assert store.peek("missing") is None
+        assert collection.find_one.call_count == 2
+
+        store.get("b")  # Excede max_entries: descarta o menos usado ("a")
+        assert store.peek("a") is NOT_CACHED
+        store.invalidate()
+        assert store.peek("b") is NOT_CACHED
+
+    def test_user_store_is_abstract(self):
+        """Testa que um backend sem os métodos obrigatórios não pode ser instanciado"""
+        from app.auth.user_store import UserStore
+        with pytest.raises(TypeError):
+            UserStore()
+
+        class PartialStore(UserStore):
+            def get(self, username):
+                return None
+
+        with pytest.raises(TypeError):
+            PartialStore()
+
+    def test_mongo_store_caps_verification_cache_ttl(self):
+        """Testa que o cache de verificações não dura mais que o cache de usuários"""
+        from app.auth.user_store import MongoUserStore
+        manager = BasicAuthManager(store=MongoUserStore(collection=self._collection({}), ttl=5))
+        assert manager.credential_cache.ttl == 5
+        manager = BasicAuthManager(store=MongoUserStore(collection=self._collection({}), ttl=3600))
+        assert manager.credential_cache.ttl == VerifiedCredentialCache().ttl
+
+    def test_mongo_store_entries_expire(self):
+        """Testa a expiração do cache de usuários"""
+        from app.auth.user_store import MongoUserStore, NOT_CACHED
+        store = MongoUserStore(collection=self._collection({}), ttl=30)
+        with patch('app.auth.user_store.time.monotonic', return_value=1000.0):
+            store.get("a")
+            assert store.peek("a") is None
+        with patch('app.auth.user_store.time.monotonic', return_value=1031.0):
+            assert store.peek("a") is NOT_CACHED
+
+    def test_mongo_store_paginates_with_keyset(self):
+        """Testa listagem paginada por _id no MongoDB"""
+        from app.auth.user_store import MongoUserStore
+        collection = self._collection({})
+        collection.find.return_value.sort.return_value.limit.return_value = [
+            {"_id": "c", "role": "user", "description": "C"}
+        ]
+        store = MongoUserStore(collection=collection)
+
+        users = store.list_users(limit=10, after="b")
+
+        assert users == [{"username": "c", "role": "user", "description": "C"}]
+        assert collection.find.call_args[0][0] == {"_id": {"$gt": "b"}}
+        assert "password" not in collection.find.call_args[0][1]
+        collection.find.return_value.sort.assert_called_once_with("_id", 1)
+        collection.find.return_value.sort.return_value.limit.assert_called_once_with(10)
+
+    async def test_manager_with_mongo_store(self):
+        """Testa o BasicAuthManager com backend MongoDB: nada é carregado no startup"""
+        from app.auth.user_store import MongoUserStore
+        collection = self._collection({
+            "api": {"_id": "api", "password": hash_password("token", rounds=4), "role": "user", "description": "Integração"}
+        })
+        with patch.object(BasicAuthManager, '_load_users_from_file') as mock_load:
+            manager = BasicAuthManager(store=MongoUserStore(collection=collection))
+            mock_load.assert_not_called()
+        collection.find_one.assert_not_called()
+        assert manager.source == "mongodb"
+
+        assert await manager.verify_credentials_async("api", "token")
+        assert not await manager.verify_credentials_async("api", "wrong")
+        assert not await manager.verify_credentials_async("ghost", "token")
+        assert (await manager.get_user_info_async("api"))["description"] == "Integração"
+        assert collection.find_one.call_count == 2  # "api" e "ghost", uma vez cada
+
+        assert manager.reload_users()
+        assert manager.credential_cache.stats()["entries"] == 0
+        assert manager.get_user_info("api")["role"] == "user"
+        assert collection.find_one.call_count == 3
+        manager._verify_executor.shutdown()
+
+
+class TestAccessTokens:
+    """Testes para os tokens Bearer emitidos por POST /auth/token"""
+
+    def _token(self, api_client, username, password):
+        response = api_client.client.post("/auth/token", headers={"Authorization": create_basic_auth_header(username, password)})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["token_type"] == "bearer"
+        assert data["expires_in"] > 0
+        return data["access_token"]
+
+    def test_token_roundtrip(self):
+        """Testa emissão e verificação do token"""
+        from app.auth.tokens import create_access_token, verify_access_token
+        token, expires_at = create_access_token({"username": "admin", "role": "admin", "description": "x"}, ttl=60)
+        assert verify_access_token(token) == {"username": "admin", "role": "admin", "description": "x"}
+        assert "secret" not in token
+
+    def test_short_token_secret_rejected(self):
+        """Testa que AUTH_TOKEN_SECRET com menos de 32 bytes é recusado"""
+        from app.auth.tokens import _load_secret
+        with pytest.raises(ValueError):
+            _load_secret("curto")
+        assert _load_secret("x" * 32) == b"x" * 32
+
+    def test_missing_token_secret_requires_opt_in(self):
+        """Testa que sem AUTH_TOKEN_SECRET o startup falha, salvo opt-in de desenvolvimento"""
+        from app.auth.tokens import _load_secret
+        with pytest.raises(ValueError):
+            _load_secret("", allow_ephemeral=False)
+        assert len(_load_secret("", allow_ephemeral=True)) == 32
+
+    def test_tampered_or_expired_token_rejected(self):
+        """Testa rejeição de tokens alterados, expirados ou malformados"""
+        import base64
+        from app.auth.tokens import create_access_token, verify_access_token
+        token, _ = create_access_token({"username": "config", "role": "user"}, ttl=60)
+        payload, signature = token.split(".")
+        forged = base64.urlsafe_b64encode(b'{"sub":"config","role":"admin","exp":9999999999}').rstrip(b"=").decode()
+        assert verify_access_token(f"{forged}.{signature}") is None
+        assert verify_access_token(f"{payload}.{signature[:-2]}xx") is None
+        assert verify_access_token("sem-assinatura") is None
+        assert verify_access_token("ação.ção") is None
+
+        expired, _ = create_access_token({"username": "config", "role": "user"}, ttl=-1)
+        assert verify_access_token(expired) is None
+
+    def test_bearer_token_authenticates_without_password_check(self, api_client):
+        """Testa que requisições com token não verificam a senha"""
+        token = self._token(api_client, "config", "config123")
+        with patch.object(auth_manager, 'verify_credentials_async') as mock_verify:
+            response = api_client.client.get("/me", headers={"Authorization": f"Bearer {token}"})
+            mock_verify.assert_not_called()
+        assert response.status_code == 200
+        assert response.json()["user"] == auth_manager.get_user_info("config")
+
+    def test_bearer_token_role_checks(self, api_client):
+        """Testa que get_admin_user usa o role do token"""
+        user_token = self._token(api_client, "operator", "operator456")
+        admin_token = self._token(api_client, "manager", "manager789")
+        assert api_client.client.get("/admin/users", headers={"Authorization": f"Bearer {user_token}"}).status_code == 403
+        assert api_client.client.get("/admin/users", headers={"Authorization": f"Bearer {admin_token}"}).status_code == 200
+
+    def test_invalid_token_and_token_exchange_rejected(self, api_client):
+        """Testa 401 para token inválido e para troca de token por token"""
+        response = api_client.client.get("/me", headers={"Authorization": "Bearer invalido.token"})
+        assert response.status_code == 401
+        assert response.headers["WWW-Authenticate"] == "Bearer"
+
+        token = self._token(api_client, "admin", "secret123")
+        response = api_client.client.post("/auth/token", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 401
+        assert api_client.client.post("/auth/token").status_code == 401
+        response = api_client.client.post("/auth/token", headers={"Authorization": create_basic_auth_header("admin", "wrong")})
+        assert response.status_code == 401
+
+    def test_bearer_token_with_middleware(self):
+        """Testa tokens no caminho do BasicAuthMiddleware"""
+        from fastapi.testclient import TestClient
+        from app.auth.middleware import BasicAuthMiddleware
+        from app.main import app
+        client = TestClient(BasicAuthMiddleware(app))
+        response = client.post("/auth/token", headers={"Authorization": create_basic_auth_header("admin", "secret123")})
+        token = response.json()["access_token"]
+
+        assert client.get("/admin/users", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+        response = client.get("/me", headers={"Authorization": "Bearer invalido.token"})
+        assert response.status_code == 401
+        assert response.headers["WWW-Authenticate"] == "Bearer"
+        assert client.post("/auth/token", headers={"Authorization": f"Bearer {token}"}).status_code == 401
@@ -127,6 +127,221 @@ class TestEndpointsCoverage:
             )
             assert response.status_code == 200
 
+    def test_enrollment_batch_endpoint(self, api_client: APITestClient):
+        """Testa o endpoint de criação de enrollments em lote"""
+        from app.models.enrollment import EnrollmentBatchResult, EnrollmentBatchItemResult
+        user_auth = create_basic_auth_header("config", "config123")
+        
+        with patch('app.endpoints.enrollment.publish_enrollments_batch') as mock_batch:
+            mock_batch.return_value = EnrollmentBatchResult(
+                total=2, accepted=1, rejected=1,
+                results=[
+                    EnrollmentBatchItemResult(index=0, id="id-1", status="pending"),
+                    EnrollmentBatchItemResult(index=1, error="CPF inválido")
+                ]
+            )
+            
+            response = api_client.client.post(
+                "/enrollments/batch",
+                json=[
+                    {"name": "João Silva", "age": 25, "cpf": "11144477735"},
+                    {"name": "Maria", "age": 25, "cpf": "123"}
+                ],
+                headers={"Authorization": user_auth}
+            )
+            assert response.status_code == 200
+            assert response.json()["accepted"] == 1
+            assert response.json()["results"][1]["error"] == "CPF inválido"
+        
+        # Lote vazio
+        response = api_client.client.post("/enrollments/batch", json=[], headers={"Authorization": user_auth})
+        assert response.status_code == 400
+        
+        # Lote acima do limite
+        with patch('app.endpoints.enrollment.config') as mock_config:
+            mock_config.ENROLLMENT_BATCH_MAX_SIZE = 1
+            response = api_client.client.post(
+                "/enrollments/batch",
+                json=[{"name": "A"}, {"name": "B"}],
+                headers={"Authorization": user_auth}
+            )
+            assert response.status_code == 413
+
+    def test_readiness_endpoint(self, api_client: APITestClient):
+        """Testa que /ready responde 503 até o aquecimento terminar"""
+        from app.services.warmup import startup_warmup
+        
+        with patch.object(startup_warmup, "ready", False):
+            response = api_client.client.get("/ready")
+            assert response.status_code == 503
+            assert response.json()["ready"] is False
+        
+        with patch.object(startup_warmup, "ready", True):
+            response = api_client.client.get("/ready")
+            assert response.status_code == 200
+
+    def test_enrollment_list_endpoint(self, api_client: APITestClient):
+        """Testa a listagem paginada de enrollments (apenas admins)"""
+        from app.models.enrollment import EnrollmentListItem, EnrollmentPage
+        admin_auth = create_basic_auth_header("admin", "secret123")
+        user_auth = create_basic_auth_header("config", "config123")
+        
+        with patch('app.endpoints.enrollment.list_enrollments') as mock_list:
+            mock_list.return_value = EnrollmentPage(
+                items=[EnrollmentListItem(id="id-1", name="João Silva", age=25, status="pending")],
+                next_cursor="abc"
+            )
+            
+            response = api_client.client.get(
+                "/enrollments/",
+                params={"status": "pending", "created_from": "2024-01-01T00:00:00Z", "limit": 10, "cursor": "xyz"},
+                headers={"Authorization": admin_auth}
+            )
+            assert response.status_code == 200
+            assert response.json()["items"][0]["id"] == "id-1"
+            assert response.json()["next_cursor"] == "abc"
+            args = mock_list.call_args[0]
+            assert args[0] == "pending"
+            assert args[2].year == 2024
+            assert args[4:] == ("xyz", 10)
+        
+        response = api_client.client.get("/enrollments/", params={"limit": 0}, headers={"Authorization": admin_auth})
+        assert response.status_code == 422
+        
+        response = api_client.client.get("/enrollments/", headers={"Authorization": user_auth})
+        assert response.status_code == 403
+        
+        response = api_client.client.get("/enrollments/")
+        assert response.status_code == 401
+
+    def test_enrollment_export_endpoint(self, api_client: APITestClient):
+        """Testa a exportação em streaming de enrollments (apenas admins)"""
+        admin_auth = create_basic_auth_header("admin", "secret123")
+        user_auth = create_basic_auth_header("config", "config123")
+        
+        with patch('app.endpoints.admin.export_enrollments') as mock_export:
+            mock_export.return_value = iter(['{"id": "id-1"}\n', '{"id": "id-2"}\n'])
+            
+            response = api_client.client.get(
+                "/admin/enrollments/export",
+                params={"format": "ndjson", "status": "processed", "created_from": "2024-01-01T00:00:00Z"},
+                headers={"Authorization": admin_auth}
+            )
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("application/x-ndjson")
+            assert "enrollments.ndjson" in response.headers["content-disposition"]
+            assert response.text.splitlines() == ['{"id": "id-1"}', '{"id": "id-2"}']
+            args = mock_export.call_args[0]
+            assert args[:2] == ("ndjson", "processed")
+            assert args[3].year == 2024
+        
+        response = api_client.client.get(
+            "/admin/enrollments/export", params={"format": "xml"}, headers={"Authorization": admin_auth}
+        )
+        assert response.status_code == 422
+        
+        response = api_client.client.get("/admin/enrollments/export", headers={"Authorization": user_auth})
+        assert response.status_code == 403
+
+    def test_enrollment_status_batch_endpoint(self, api_client: APITestClient):
+        """Testa a consulta de status de vários enrollments em uma requisição"""
+        from app.models.enrollment import EnrollmentStatus, EnrollmentStatusBatchResult
+        user_auth = create_basic_auth_header("config", "config123")
+        
+        with patch('app.endpoints.enrollment.get_enrollment_statuses') as mock_statuses:
+            mock_statuses.return_value = EnrollmentStatusBatchResult(
+                total=2, found=1,
+                statuses={"id-1": EnrollmentStatus(id="id-1", status="processed"), "id-2": None},
+                not_found=["id-2"]
+            )
+            
+            response = api_client.client.post(
+                "/enrollments/status:batch",
+                json={"ids": ["id-1", "id-2"]},
+                headers={"Authorization": user_auth}
+            )
+            assert response.status_code == 200
+            assert response.json()["statuses"]["id-1"]["status"] == "processed"
+            assert response.json()["statuses"]["id-2"] is None
+            assert response.json()["not_found"] == ["id-2"]
+            mock_statuses.assert_called_once_with(["id-1", "id-2"])
+        
+        response = api_client.client.post("/enrollments/status:batch", json={"ids": []}, headers={"Authorization": user_auth})
+        assert response.status_code == 400
+        
+        with patch('app.endpoints.enrollment.config') as mock_config:
+            mock_config.ENROLLMENT_STATUS_BATCH_MAX_SIZE = 1
+            response = api_client.client.post(
+                "/enrollments/status:batch",
+                json={"ids": ["id-1", "id-2"]},
+                headers={"Authorization": user_auth}
+            )
+            assert response.status_code == 413
+        
+        response = api_client.client.post("/enrollments/status:batch", json={"ids": ["id-1"]})
+        assert response.status_code == 401
+
+    def test_enrollment_status_long_poll(self, api_client: APITestClient):
+        """Testa que ?wait= responde com o novo status publicado pelo watcher"""
+        import asyncio
+        from app.models.enrollment import EnrollmentStatus
+        user_auth = create_basic_auth_header("config", "config123")
+        queue = asyncio.Queue()
+        queue.put_nowait({"id": "id-1", "status": "pending", "message": None})
+        queue.put_nowait({"id": "id-1", "status": "processed", "message": "ok"})
+        
+        with patch('app.endpoints.enrollment.get_enrollment_status') as mock_get_status, \
+             patch('app.endpoints.enrollment.enrollment_status_watcher') as mock_watcher:
+            mock_get_status.return_value = EnrollmentStatus(id="id-1", status="pending", age_group_id="ag-1")
+            mock_watcher.subscribe.return_value = queue
+            
+            response = api_client.client.get(
+                "/enrollments/id-1", params={"wait": 5}, headers={"Authorization": user_auth}
+            )
+            
+            assert response.status_code == 200
+            assert response.json()["status"] == "processed"
+            assert response.json()["age_group_id"] == "ag-1"
+            mock_get_status.assert_called_once()  # Uma leitura, o resto vem do watcher
+            mock_watcher.unsubscribe.assert_called_once_with("id-1", queue)
+            
+            # Sem mudança dentro do prazo, responde com o status atual
+            mock_watcher.subscribe.return_value = asyncio.Queue()
+            response = api_client.client.get(
+                "/enrollments/id-1", params={"wait": 0.05}, headers={"Authorization": user_auth}
+            )
+            assert response.json()["status"] == "pending"
+
+    def test_enrollment_status_events_stream(self, api_client: APITestClient):
+        """Testa o stream SSE: status atual, mudanças e encerramento no status final"""
+        import asyncio
+        import json
+        from app.models.enrollment import EnrollmentStatus
+        user_auth = create_basic_auth_header("config", "config123")
+        queue = asyncio.Queue()
+        queue.put_nowait({"id": "id-1", "status": "processing", "message": None})
+        queue.put_nowait({"id": "id-1", "status": "processed", "message": "ok"})
+        
+        with patch('app.endpoints.enrollment.get_enrollment_status') as mock_get_status, \
+             patch('app.endpoints.enrollment.enrollment_status_watcher') as mock_watcher:
+            mock_get_status.return_value = EnrollmentStatus(id="id-1", status="pending")
+            mock_watcher.subscribe.return_value = queue
+            
+            response = api_client.client.get("/enrollments/id-1/events", headers={"Authorization": user_auth})
+            
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/event-stream")
+            events = [
+                json.loads(line[len("data: "):])["status"]
+                for line in response.text.splitlines() if line.startswith("data: ")
+            ]
+            assert events == ["pending", "processing", "processed"]
+            mock_watcher.unsubscribe.assert_called_once_with("id-1", queue)
+            
+            mock_get_status.return_value = None
+            response = api_client.client.get("/enrollments/missing/events", headers={"Authorization": user_auth})
+            assert response.status_code == 404
+
     def test_enrollment_status_not_found(self, api_client: APITestClient):
         """Testa cenário de status de enrollment não encontrado"""
         user_auth = create_basic_auth_header("config", "config123")
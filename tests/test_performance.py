@@ -1,8 +1,13 @@
 import pytest
 import time
+import asyncio
 import concurrent.futures
+import httpx
+from unittest.mock import patch
+from bson import ObjectId
 from typing import List, Dict, Any
 from tests.conftest import APITestClient, wait_for_enrollment_processing, create_basic_auth_header
+from app.main import app
 
 
 @pytest.mark.performance
@@ -61,8 +66,8 @@ class TestPerformance:
             for failed in failed_enrollments[:3]:  # Mostra apenas os primeiros 3 erros
                 print(f"  Erro: {failed.get('error', 'Unknown')}")
         
-        # Aceita pelo menos 50% de sucesso (problemas de conexão RabbitMQ podem causar falhas)
-        assert len(successful_enrollments) >= (num_enrollments * 0.5), f"Apenas {len(successful_enrollments)} de {num_enrollments} enrollments foram criados com sucesso"
+        # O publicador serializa o canal na thread de I/O: publicações concorrentes não falham
+        assert len(successful_enrollments) == num_enrollments, f"Apenas {len(successful_enrollments)} de {num_enrollments} enrollments foram criados com sucesso"
         
         # Verifica tempo total (deve ser razoável)
         total_time = end_time - start_time
@@ -333,4 +338,208 @@ class TestPerformance:
         
         # Verifica se o sistema ainda está responsivo
         response = api_client.client.get("/age-groups/", headers={"Authorization": user_auth})
-        assert response.status_code == 200 
\ No newline at end of file
+        assert response.status_code == 200 
+
+
+class BlockingAgeGroupCollection:
+    """Simula o driver síncrono chamado dentro de `async def` (bloqueia o loop)"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def find_one(self, query):
+        time.sleep(self.latency)
+        return {"_id": query["_id"], "min_age": 18, "max_age": 25}
+
+
+class NonBlockingAgeGroupCollection:
+    """Simula o driver assíncrono (libera o loop durante o round trip)"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def find_one(self, query):
+        await asyncio.sleep(self.latency)
+        return {"_id": query["_id"], "min_age": 18, "max_age": 25}
+
+
+@pytest.mark.performance
+class TestAsyncDriverBenchmark:
+    """Benchmark de concorrência do serviço de age groups (MongoDB simulado)"""
+
+    LATENCY = 0.05
+    CONCURRENT_REQUESTS = 20
+
+    async def _run_concurrent_gets(self, collection) -> float:
+        """Dispara requisições simultâneas e retorna a vazão (req/s)"""
+        auth_header = create_basic_auth_header("config", "config123")
+        age_group_id = str(ObjectId())
+
+        with patch('app.services.age_groups.async_mongo_db') as mock_db:
+            mock_db.age_groups = collection
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                start_time = time.perf_counter()
+                responses = await asyncio.gather(*[
+                    client.get(f"/age-groups/{age_group_id}", headers={"Authorization": auth_header})
+                    for _ in range(self.CONCURRENT_REQUESTS)
+                ])
+                elapsed = time.perf_counter() - start_time
+
+        assert all(response.status_code == 200 for response in responses)
+        return self.CONCURRENT_REQUESTS / elapsed
+
+    async def test_age_groups_async_driver_throughput(self):
+        """Compara a vazão com driver bloqueante vs. driver assíncrono"""
+        blocking_rps = await self._run_concurrent_gets(BlockingAgeGroupCollection(self.LATENCY))
+        async_rps = await self._run_concurrent_gets(NonBlockingAgeGroupCollection(self.LATENCY))
+
+        print(f"Driver bloqueante: {blocking_rps:.1f} req/s")
+        print(f"Driver assíncrono: {async_rps:.1f} req/s ({async_rps / blocking_rps:.1f}x)")
+
+        # Com o loop bloqueado as requisições são serializadas (~1/LATENCY req/s)
+        assert blocking_rps < (1 / self.LATENCY) * 1.5
+        assert async_rps > blocking_rps * 3
+
+
+class ExportCursor:
+    """Cursor do MongoDB simulado que gera documentos sob demanda"""
+
+    def __init__(self, count: int):
+        self.count = count
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def close(self):
+        pass
+
+    def __iter__(self):
+        from datetime import datetime
+        created_at = datetime(2024, 1, 1)
+        for i in range(self.count):
+            yield {
+                "_id": f"{i:08d}-0000-0000-0000-000000000000", "name": f"Pessoa {i}", "age": 25,
+                "cpf": "11144477735", "status": "processed", "message": "Processado com sucesso",
+                "age_group_id": "507f1f77bcf86cd799439011", "created_at": created_at, "processed_at": created_at
+            }
+
+
+@pytest.mark.performance
+class TestExportBenchmark:
+    """Benchmark da exportação em streaming de inscrições (MongoDB simulado)"""
+
+    def _export(self, export_format: str, count: int):
+        """Consome a exportação e retorna (linhas/s, pico de memória em bytes)"""
+        import tracemalloc
+        from app.services.enrollment_listing import export_enrollments
+
+        with patch('app.services.enrollment_listing.mongo_db') as mock_db:
+            mock_db.enrollments.find.return_value = ExportCursor(count)
+            tracemalloc.start()
+            start_time = time.perf_counter()
+            total_bytes = sum(len(chunk) for chunk in export_enrollments(export_format, batch_size=1000))
+            elapsed = time.perf_counter() - start_time
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        assert total_bytes > 0
+        return count / elapsed, peak
+
+    @pytest.mark.parametrize("export_format", ["ndjson", "csv"])
+    def test_export_memory_is_flat(self, export_format):
+        """A memória de pico não cresce com o número de inscrições exportadas"""
+        small_rps, small_peak = self._export(export_format, 10_000)
+        large_rps, large_peak = self._export(export_format, 100_000)
+
+        print(f"Exportação {export_format}: {large_rps:,.0f} linhas/s; "
+              f"pico de memória {small_peak / 1024:.0f} KiB (10k) vs {large_peak / 1024:.0f} KiB (100k)")
+
+        # 10x mais linhas com praticamente o mesmo pico: nada é acumulado
+        assert large_peak < small_peak * 1.5
+
+
+@pytest.mark.performance
+class TestAuthMiddlewareBenchmark:
+    """Microbenchmark do custo de autenticação por requisição (sem rede nem rota)"""
+
+    ITERATIONS = 20_000
+
+    def _scope(self, header: str) -> Dict[str, Any]:
+        return {"type": "http", "method": "GET", "path": "/me", "query_string": b"",
+                "headers": [(b"host", b"test"), (b"authorization", header.encode())]}
+
+    async def _dependencies(self, scope) -> Dict[str, str]:
+        """O que o FastAPI executa por rota admin: HTTPBasic, HTTPBearer, get_current_user e get_admin_user"""
+        from starlette.requests import Request
+        from app.auth.basic_auth import bearer_security, get_admin_user, get_current_user, security
+
+        request = Request(scope)
+        credentials = await security(request)
+        token = await bearer_security(request)
+        return await get_admin_user(await get_current_user(request, credentials, token))
+
+    async def _measure(self, run) -> float:
+        """Retorna o custo médio por requisição em microssegundos"""
+        await run()
+        start_time = time.perf_counter()
+        for _ in range(self.ITERATIONS):
+            await run()
+        return (time.perf_counter() - start_time) / self.ITERATIONS * 1e6
+
+    async def test_auth_overhead_before_and_after_middleware(self):
+        """Compara dependências verificando credenciais vs. middleware + leitura do escopo"""
+        from app.auth.middleware import BasicAuthMiddleware
+
+        header = create_basic_auth_header("admin", "secret123")
+
+        async def before():
+            assert (await self._dependencies(self._scope(header)))["username"] == "admin"
+
+        async def endpoint(scope, receive, send):
+            assert (await self._dependencies(scope))["username"] == "admin"
+
+        middleware = BasicAuthMiddleware(endpoint)
+
+        async def after():
+            await middleware(self._scope(header), None, None)
+
+        before_us = await self._measure(before)
+        after_us = await self._measure(after)
+
+        print(f"Autenticação nas dependências: {before_us:.1f} µs/requisição")
+        print(f"Middleware + leitura do escopo: {after_us:.1f} µs/requisição ({before_us / after_us:.1f}x)")
+
+        # Com o header no snapshot não há decodificação, HMAC nem cópia do usuário
+        assert after_us < before_us
+
+    async def test_bearer_token_overhead(self):
+        """Compara o token Bearer com o Basic Auth (cache quente) e com uma verificação bcrypt"""
+        from app.auth.passwords import hash_password, verify_password
+        from app.auth.tokens import create_access_token
+
+        token, _ = create_access_token({"username": "admin", "role": "admin"})
+        basic_header = create_basic_auth_header("admin", "secret123")
+
+        async def bearer():
+            assert (await self._dependencies(self._scope(f"Bearer {token}")))["username"] == "admin"
+
+        async def basic():
+            assert (await self._dependencies(self._scope(basic_header)))["username"] == "admin"
+
+        bearer_us = await self._measure(bearer)
+        basic_us = await self._measure(basic)
+        hashed = hash_password("secret123")
+        start_time = time.perf_counter()
+        assert verify_password("secret123", hashed)
+        bcrypt_us = (time.perf_counter() - start_time) * 1e6
+
+        print(f"Token Bearer: {bearer_us:.1f} µs/requisição")
+        print(f"Basic Auth (credencial em cache): {basic_us:.1f} µs/requisição")
+        print(f"Verificação bcrypt sem cache: {bcrypt_us:,.0f} µs")
+
+        # Um HMAC por requisição, ordens de grandeza abaixo do hash da senha
+        assert bearer_us * 100 < bcrypt_us
@@ -3,20 +3,30 @@ Testes específicos para melhorar cobertura do módulo rabbitMQ.py
 """
 
 import pytest
+import threading
 from unittest.mock import patch, MagicMock
 import pika
+from app.db.publisher import RabbitMQPublisher, PublishNackError
 from app.db.rabbitMQ import (
     connect_rabbitmq_with_retry,
     reset_connections,
     get_rabbitmq_connection,
     get_rabbitmq_channel,
-    publish_message
+    publish_message,
+    publish_messages,
+    get_queue_depth
 )
 
 
 class TestRabbitMQCoverage:
     """Testes para melhorar cobertura do módulo rabbitMQ"""
 
+    @pytest.fixture(autouse=True)
+    def blocking_publish_path(self):
+        """Estes testes cobrem o caminho com BlockingConnection compartilhada"""
+        with patch('app.db.rabbitMQ.config.RABBITMQ_PUBLISHER_THREAD', False):
+            yield
+
     def test_connect_rabbitmq_with_retry_no_credentials_success(self):
         """Testa conexão bem-sucedida sem credenciais"""
         mock_connection = MagicMock()
@@ -237,4 +247,249 @@ class TestRabbitMQCoverage:
             # Verifica se foi chamado com as propriedades corretas
             call_args = mock_channel.basic_publish.call_args
             assert call_args[1]['body'] == "test message"
-            assert call_args[1]['properties'].delivery_mode == 2  # Persistente 
\ No newline at end of file
+            assert call_args[1]['properties'].delivery_mode == 2  # Persistente 
+
+    def test_publish_messages_with_confirms(self):
+        """Testa publicação em lote com confirmação por mensagem"""
+        mock_connection = MagicMock()
+        mock_channel = mock_connection.channel.return_value
+        mock_channel.basic_publish.side_effect = [None, pika.exceptions.NackError([]), None]
+        
+        with patch('app.db.rabbitMQ.get_rabbitmq_connection', return_value=mock_connection):
+            confirmed = publish_messages(["m1", "m2", "m3"])
+        
+        assert confirmed == [True, False, True]
+        mock_channel.confirm_delivery.assert_called_once()
+        assert mock_connection.channel.call_count == 1  # Uma sessão de canal para o lote
+        mock_channel.close.assert_called_once()
+
+    def test_get_queue_depth(self):
+        """Testa a leitura passiva da profundidade da fila em um canal próprio"""
+        mock_connection = MagicMock()
+        mock_channel = mock_connection.channel.return_value
+        mock_channel.queue_declare.return_value.method.message_count = 7
+        
+        with patch('app.db.rabbitMQ.get_rabbitmq_connection', return_value=mock_connection):
+            assert get_queue_depth() == 7
+        
+        assert mock_channel.queue_declare.call_args[1]["passive"] is True
+        mock_channel.close.assert_called_once()
+        
+        with patch('app.db.rabbitMQ.get_rabbitmq_connection', side_effect=Exception("down")), \
+             patch('app.db.rabbitMQ.reset_connections'):
+            assert get_queue_depth() is None
+
+    def test_publish_messages_connection_lost_mid_batch(self):
+        """Testa que a mensagem em envio na queda da conexão fica com resultado desconhecido"""
+        mock_connection = MagicMock()
+        mock_channel = mock_connection.channel.return_value
+        mock_channel.basic_publish.side_effect = [None, pika.exceptions.AMQPConnectionError("lost")]
+        
+        with patch('app.db.rabbitMQ.get_rabbitmq_connection', return_value=mock_connection), \
+             patch('app.db.rabbitMQ.reset_connections'):
+            confirmed = publish_messages(["m1", "m2", "m3"])
+        
+        # m2 pode já estar na fila; m3 nunca foi enviada
+        assert confirmed == [True, None, False]
+
+    def test_publish_messages_connection_failure(self):
+        """Testa que falha de conexão marca as mensagens como não confirmadas"""
+        with patch('app.db.rabbitMQ.get_rabbitmq_connection', side_effect=Exception("Connection failed")), \
+             patch('app.db.rabbitMQ.reset_connections') as mock_reset:
+            confirmed = publish_messages(["m1", "m2"])
+        
+        assert confirmed == [False, False]
+        mock_reset.assert_called_once()
+
+
+def confirm_frame(method_class, delivery_tag, multiple=False):
+    """Frame de confirmação como entregue pelo pika ao callback do canal"""
+    return MagicMock(method=method_class(delivery_tag=delivery_tag, multiple=multiple))
+
+
+def ready_publisher(batch_size=200):
+    """Publicador com canal simulado, sem thread de I/O"""
+    publisher = RabbitMQPublisher(batch_size=batch_size)
+    publisher._connection = MagicMock()
+    publisher._channel = MagicMock()
+    publisher._ready.set()
+    return publisher
+
+
+class TestRabbitMQPublisher:
+    """Testes do publicador com thread de I/O dedicada"""
+
+    def test_publish_enqueues_and_wakes_io_thread(self):
+        """Testa que publish apenas enfileira e agenda a drenagem no ioloop"""
+        publisher = ready_publisher()
+        future = publisher.publish("m1")
+        
+        assert not future.done()
+        publisher._channel.basic_publish.assert_not_called()
+        publisher._connection.ioloop.add_callback_threadsafe.assert_called_once_with(publisher._drain)
+
+    def test_drain_publishes_in_batches(self):
+        """Testa que cada ciclo publica no máximo batch_size mensagens"""
+        publisher = ready_publisher(batch_size=2)
+        for i in range(3):
+            publisher.publish(f"m{i}")
+        
+        publisher._drain()
+        
+        assert publisher._channel.basic_publish.call_count == 2
+        assert sorted(publisher._pending) == [1, 2]
+        publisher._connection.ioloop.call_later.assert_called_once_with(0, publisher._drain)
+        call_args = publisher._channel.basic_publish.call_args
+        assert call_args[1]['properties'].delivery_mode == 2
+
+    def test_multiple_ack_resolves_all_previous_tags(self):
+        """Testa que um ack com multiple=True resolve todas as tags até a confirmada"""
+        publisher = ready_publisher()
+        futures = [publisher.publish(f"m{i}") for i in range(3)]
+        publisher._drain()
+        
+        publisher._on_delivery_confirmation(confirm_frame(pika.spec.Basic.Ack, 2, multiple=True))
+        
+        assert futures[0].result(timeout=0) is True
+        assert futures[1].result(timeout=0) is True
+        assert not futures[2].done()
+        assert list(publisher._pending) == [3]
+
+    def test_nack_fails_only_its_message(self):
+        """Testa que um nack falha apenas o future da mensagem recusada"""
+        publisher = ready_publisher()
+        futures = [publisher.publish(f"m{i}") for i in range(2)]
+        publisher._drain()
+        
+        publisher._on_delivery_confirmation(confirm_frame(pika.spec.Basic.Nack, 1))
+        publisher._on_delivery_confirmation(confirm_frame(pika.spec.Basic.Ack, 2))
+        
+        with pytest.raises(PublishNackError):
+            futures[0].result(timeout=0)
+        assert futures[1].result(timeout=0) is True
+        assert publisher.stats()["nacked"] == 1
+        assert publisher.stats()["confirmed"] == 1
+
+    def test_channel_closed_requeues_unconfirmed_messages(self):
+        """Testa que mensagens sem confirmação são republicadas no novo canal"""
+        publisher = ready_publisher()
+        future = publisher.publish("m1")
+        publisher._drain()
+        
+        publisher._on_channel_closed(MagicMock(), "connection lost")
+        assert not future.done()
+        assert publisher.stats()["queued"] == 1
+        
+        # Reconexão: novo canal, tags recomeçam em 1
+        publisher._channel = MagicMock()
+        publisher._on_queue_declared(MagicMock())
+        publisher._on_delivery_confirmation(confirm_frame(pika.spec.Basic.Ack, 1))
+        
+        assert future.result(timeout=0) is True
+        assert publisher._channel.basic_publish.call_args[1]['body'] == "m1"
+
+    def test_concurrent_publishers_get_one_tag_each(self):
+        """Testa que publicações concorrentes de várias threads não se perdem"""
+        publisher = RabbitMQPublisher()
+        futures = []
+        lock = threading.Lock()
+        
+        def worker():
+            for i in range(50):
+                future = publisher.publish(f"m{i}")
+                with lock:
+                    futures.append(future)
+        
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        publisher._connection = MagicMock()
+        publisher._channel = MagicMock()
+        publisher._ready.set()
+        while publisher.stats()["queued"]:
+            publisher._drain()
+        publisher._on_delivery_confirmation(confirm_frame(pika.spec.Basic.Ack, 400, multiple=True))
+        
+        assert publisher._channel.basic_publish.call_count == 400
+        assert all(future.result(timeout=0) for future in futures)
+
+    def test_stop_fails_messages_never_published(self):
+        """Testa que o encerramento não deixa futures pendentes para sempre"""
+        publisher = RabbitMQPublisher()
+        future = publisher.publish("m1")
+        
+        publisher.stop(timeout=0.1)
+        
+        with pytest.raises(RuntimeError):
+            future.result(timeout=0)
+        with pytest.raises(RuntimeError):
+            publisher.publish("m2")
+
+    def test_publish_message_waits_for_confirmation(self):
+        """Testa que publish_message delega ao publicador e aguarda o confirm"""
+        mock_publisher = MagicMock()
+        
+        with patch('app.db.rabbitMQ.config.RABBITMQ_PUBLISHER_THREAD', True), \
+             patch('app.db.rabbitMQ.get_publisher', return_value=mock_publisher):
+            assert publish_message("test message") is True
+        
+        mock_publisher.publish.assert_called_once_with("test message")
+        mock_publisher.publish.return_value.result.assert_called_once()
+
+    def test_publish_messages_maps_futures_to_confirmations(self):
+        """Testa que publish_messages retorna o resultado de cada future"""
+        ok, nacked, closed = MagicMock(), MagicMock(), MagicMock()
+        nacked.result.side_effect = PublishNackError("nack")
+        closed.result.side_effect = RuntimeError("Publicador RabbitMQ encerrado")
+        mock_publisher = MagicMock()
+        mock_publisher.publish.side_effect = [ok, nacked, closed]
+        
+        with patch('app.db.rabbitMQ.config.RABBITMQ_PUBLISHER_THREAD', True), \
+             patch('app.db.rabbitMQ.get_publisher', return_value=mock_publisher):
+            confirmed = publish_messages(["m1", "m2", "m3"])
+        
+        # Recusada pelo broker: False. Publicador encerrado: desconhecido, fica para o reaper
+        assert confirmed == [True, False, None]
+
+    def test_publish_message_timeout_cancels_unsent_message(self):
+        """Testa que o timeout cancela a mensagem ainda não publicada e retorna False"""
+        from concurrent.futures import Future
+        future = Future()
+        mock_publisher = MagicMock()
+        mock_publisher.publish.return_value = future
+        
+        with patch('app.db.rabbitMQ.config.RABBITMQ_PUBLISHER_THREAD', True), \
+             patch('app.db.rabbitMQ.config.RABBITMQ_PUBLISH_TIMEOUT', 0.01), \
+             patch('app.db.rabbitMQ.get_publisher', return_value=mock_publisher):
+            assert publish_message("test message") is False
+        
+        assert future.cancelled()
+
+    def test_publish_message_timeout_after_send_is_unknown(self):
+        """Testa que o timeout de uma mensagem já enviada ao canal retorna None"""
+        from concurrent.futures import Future
+        future = Future()
+        future.set_running_or_notify_cancel()  # Já publicada, aguardando confirm
+        mock_publisher = MagicMock()
+        mock_publisher.publish.return_value = future
+        
+        with patch('app.db.rabbitMQ.config.RABBITMQ_PUBLISHER_THREAD', True), \
+             patch('app.db.rabbitMQ.config.RABBITMQ_PUBLISH_TIMEOUT', 0.01), \
+             patch('app.db.rabbitMQ.get_publisher', return_value=mock_publisher):
+            assert publish_message("test message") is None
+
+    def test_drain_skips_messages_cancelled_after_timeout(self):
+        """Testa que mensagens canceladas por timeout não chegam ao canal"""
+        publisher = ready_publisher()
+        
+        with patch('app.db.rabbitMQ.config.RABBITMQ_PUBLISHER_THREAD', True), \
+             patch('app.db.rabbitMQ.config.RABBITMQ_PUBLISH_TIMEOUT', 0.01), \
+             patch('app.db.rabbitMQ.get_publisher', return_value=publisher):
+            confirmed = publish_messages(["m1", "m2"])
+        publisher._drain()
+        
+        assert confirmed == [False, False]
+        publisher._channel.basic_publish.assert_not_called()
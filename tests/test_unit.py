@@ -1,13 +1,17 @@
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+import json
+from unittest.mock import Mock, patch, MagicMock, AsyncMock, ANY
 import sys
 import os
 
 # Adiciona o path do src para importar os módulos
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src/enroll_api'))
+# Módulos do worker (worker, supervisor, replay_dlq), importados como no container
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src/worker'))
 
 from app.models.enrollment import EnrollmentCreate, EnrollmentStatus
 from app.models.age_group import AgeGroup, AgeGroupCreate, AgeGroupUpdate
+from app.services.age_group_index import AgeGroupIndex
 
 
 @pytest.mark.unit
@@ -101,16 +105,17 @@ class TestAgeGroupModels:
 class TestEnrollmentService:
     """Testes unitários para o serviço de Enrollment"""
 
+    @patch('app.services.enrollment.age_group_index', new_callable=AgeGroupIndex)
     @patch('app.services.enrollment.mongo_db')
     @patch('app.services.enrollment.publish_message')
-    def test_publish_enrollment_success(self, mock_publish, mock_db):
+    def test_publish_enrollment_success(self, mock_publish, mock_db, mock_index):
         """Testa publicação bem-sucedida de enrollment"""
         # Mock do age group encontrado
-        mock_db.age_groups.find_one.return_value = {
+        mock_db.age_groups.find.return_value = [{
             "_id": "507f1f77bcf86cd799439011",
             "min_age": 18,
             "max_age": 25
-        }
+        }]
         
         # Mock da inserção no banco
         mock_db.enrollments.insert_one.return_value = None
@@ -127,17 +132,46 @@ class TestEnrollmentService:
         enrollment_id = publish_enrollment(enrollment_data)
         
         # Verifica se foi chamado corretamente
-        mock_db.age_groups.find_one.assert_called_once()
+        mock_db.age_groups.find.assert_called_once()  # Carga do índice
+        mock_db.age_groups.find_one.assert_not_called()
         mock_db.enrollments.insert_one.assert_called_once()
         mock_publish.assert_called_once()
         
         assert enrollment_id is not None
+        
+        # Com o índice carregado, novas inscrições não consultam age groups
+        publish_enrollment(enrollment_data)
+        mock_db.age_groups.find.assert_called_once()
 
+    @pytest.mark.parametrize("published, status_code", [(False, 503), (None, None)])
+    @patch('app.services.enrollment.age_group_index', new_callable=AgeGroupIndex)
     @patch('app.services.enrollment.mongo_db')
-    def test_publish_enrollment_no_age_group(self, mock_db):
+    @patch('app.services.enrollment.publish_message')
+    def test_publish_enrollment_unconfirmed(self, mock_publish, mock_db, mock_index, published, status_code):
+        """Testa 503 (sem a inscrição) só quando a mensagem certamente não foi enfileirada"""
+        from fastapi import HTTPException
+        from app.services.enrollment import publish_enrollment
+        mock_db.age_groups.find.return_value = [{"_id": "507f1f77bcf86cd799439011", "min_age": 18, "max_age": 25}]
+        mock_publish.return_value = published
+        enrollment_data = EnrollmentCreate(name="João Silva", age=25, cpf="11144477735")
+        
+        if status_code is None:
+            # Resultado desconhecido: aceita como pending, o reaper cobre a perda
+            assert publish_enrollment(enrollment_data)
+            mock_db.enrollments.delete_one.assert_not_called()
+            return
+        with pytest.raises(HTTPException) as exc_info:
+            publish_enrollment(enrollment_data)
+        assert exc_info.value.status_code == status_code
+        inserted_id = mock_db.enrollments.insert_one.call_args[0][0]["_id"]
+        mock_db.enrollments.delete_one.assert_called_once_with({"_id": inserted_id})
+
+    @patch('app.services.enrollment.age_group_index', new_callable=AgeGroupIndex)
+    @patch('app.services.enrollment.mongo_db')
+    def test_publish_enrollment_no_age_group(self, mock_db, mock_index):
         """Testa publicação de enrollment sem age group válido"""
         # Mock de nenhum age group encontrado
-        mock_db.age_groups.find_one.return_value = None
+        mock_db.age_groups.find.return_value = []
         
         from app.services.enrollment import publish_enrollment
         from fastapi import HTTPException
@@ -188,6 +222,1122 @@ class TestEnrollmentService:
         assert result is None
 
 
+@pytest.mark.unit
+class TestEnrollmentBatchService:
+    """Testes unitários para a criação de inscrições em lote"""
+
+    AGE_GROUPS = [{"_id": "507f1f77bcf86cd799439011", "min_age": 18, "max_age": 30}]
+
+    def _index(self):
+        index = AgeGroupIndex()
+        index.load(self.AGE_GROUPS)
+        return index
+
+    @patch('app.services.enrollment.mongo_db')
+    @patch('app.services.enrollment.publish_messages')
+    def test_batch_mixed_results(self, mock_publish, mock_db):
+        """Testa lote com itens válidos e inválidos"""
+        from app.services.enrollment import publish_enrollments_batch
+        mock_publish.side_effect = lambda messages: [True] * len(messages)
+        
+        with patch('app.services.enrollment.age_group_index', self._index()):
+            result = publish_enrollments_batch([
+                {"name": "João Silva", "age": 25, "cpf": "11144477735"},
+                {"name": "Maria Souza", "age": 25, "cpf": "111.111.111-11"},
+                {"name": "Pedro Lima", "age": 80, "cpf": "52998224725"},
+                {"name": "Ana Costa", "age": 20, "cpf": "52998224725"},
+            ])
+        
+        assert result.total == 4
+        assert result.accepted == 2
+        assert result.rejected == 2
+        assert [r.index for r in result.results] == [0, 1, 2, 3]
+        assert result.results[0].id and result.results[0].status == "pending"
+        assert "CPF inválido" in result.results[1].error
+        assert "Idade 80" in result.results[2].error
+        assert result.results[3].id
+        
+        # Uma única escrita e uma única publicação para todo o lote
+        mock_db.enrollments.insert_many.assert_called_once()
+        assert mock_db.enrollments.insert_many.call_args[1]["ordered"] is False
+        assert len(mock_db.enrollments.insert_many.call_args[0][0]) == 2
+        mock_publish.assert_called_once()
+
+    @patch('app.services.enrollment.mongo_db')
+    @patch('app.services.enrollment.publish_messages')
+    def test_batch_partial_write_failure(self, mock_publish, mock_db):
+        """Testa que falhas no insert_many rejeitam apenas os itens afetados"""
+        from pymongo.errors import BulkWriteError
+        from app.services.enrollment import publish_enrollments_batch
+        mock_db.enrollments.insert_many.side_effect = BulkWriteError({
+            "writeErrors": [{"index": 0, "code": 11000, "errmsg": "duplicate key"}]
+        })
+        mock_publish.side_effect = lambda messages: [True] * len(messages)
+        
+        with patch('app.services.enrollment.age_group_index', self._index()):
+            result = publish_enrollments_batch([
+                {"name": "João Silva", "age": 25, "cpf": "11144477735"},
+                {"name": "Ana Costa", "age": 20, "cpf": "52998224725"},
+            ])
+        
+        assert result.accepted == 1
+        assert result.results[0].error == "duplicate key"
+        assert result.results[1].id
+        assert len(mock_publish.call_args[0][0]) == 1
+
+    @patch('app.services.enrollment.mongo_db')
+    @patch('app.services.enrollment.publish_messages')
+    def test_batch_unconfirmed_messages_are_rolled_back(self, mock_publish, mock_db):
+        """Testa remoção das inscrições cujas mensagens não foram confirmadas"""
+        from app.services.enrollment import publish_enrollments_batch
+        mock_publish.return_value = [True, False]
+        
+        with patch('app.services.enrollment.age_group_index', self._index()):
+            result = publish_enrollments_batch([
+                {"name": "João Silva", "age": 25, "cpf": "11144477735"},
+                {"name": "Ana Costa", "age": 20, "cpf": "52998224725"},
+            ])
+        
+        assert result.accepted == 1
+        assert "publicar" in result.results[1].error
+        deleted_filter = mock_db.enrollments.delete_many.call_args[0][0]
+        assert len(deleted_filter["_id"]["$in"]) == 1
+
+    @patch('app.services.enrollment.mongo_db')
+    @patch('app.services.enrollment.publish_messages')
+    def test_batch_uncertain_messages_stay_pending(self, mock_publish, mock_db):
+        """Testa que mensagens sem confirmação e não canceladas ficam para o reaper"""
+        from app.services.enrollment import publish_enrollments_batch
+        mock_publish.return_value = [None, False]
+        
+        with patch('app.services.enrollment.age_group_index', self._index()):
+            result = publish_enrollments_batch([
+                {"name": "João Silva", "age": 25, "cpf": "11144477735"},
+                {"name": "Ana Costa", "age": 20, "cpf": "52998224725"},
+            ])
+        
+        assert result.results[0].id and result.results[0].status == "pending"
+        assert "publicar" in result.results[1].error
+        deleted_filter = mock_db.enrollments.delete_many.call_args[0][0]
+        assert len(deleted_filter["_id"]["$in"]) == 1
+        assert result.results[0].id not in deleted_filter["_id"]["$in"]
+
+
+@pytest.mark.unit
+class TestOutbox:
+    """Testes unitários para o modo outbox e o relay"""
+
+    @patch('app.services.enrollment.outbox_relay')
+    @patch('app.services.enrollment.config')
+    @patch('app.services.enrollment.mongo_db')
+    @patch('app.services.enrollment.publish_message')
+    def test_publish_enrollment_outbox_mode(self, mock_publish, mock_db, mock_config, mock_relay):
+        """Testa que em modo outbox a requisição só grava no MongoDB"""
+        from app.services.enrollment import publish_enrollment
+        mock_config.ENROLLMENT_PUBLISH_MODE = "outbox"
+        index = AgeGroupIndex()
+        index.load([{"_id": "507f1f77bcf86cd799439011", "min_age": 18, "max_age": 30}])
+        
+        with patch('app.services.enrollment.age_group_index', index):
+            enrollment_id = publish_enrollment(EnrollmentCreate(name="João Silva", age=25, cpf="11144477735"))
+        
+        inserted = mock_db.enrollments.insert_one.call_args[0][0]
+        assert inserted["_id"] == enrollment_id
+        assert inserted["status"] == "pending"
+        assert "queued_at" in inserted["outbox"]
+        mock_publish.assert_not_called()
+        mock_relay.notify.assert_called_once()
+
+    def test_outbox_message_keeps_only_message_fields(self):
+        """Testa que campos de controle do documento não vazam para a mensagem"""
+        from datetime import datetime, timezone
+        from app.services.outbox import outbox_message
+        doc = {
+            "_id": "id-1", "id": "id-1", "name": "João Silva", "age": 25, "cpf": "111.444.777-35",
+            "status": "pending", "age_group_id": "507f1f77bcf86cd799439011",
+            "created_at": datetime.now(timezone.utc), "outbox": {"attempts": 1},
+            "lease_owner": "worker:1", "lease_until": datetime.now(timezone.utc),
+            "reaped_at": datetime.now(timezone.utc), "reap_token": "abc", "attempts": 2,
+        }
+        
+        assert json.loads(outbox_message(doc)) == {
+            "id": "id-1", "name": "João Silva", "age": 25, "cpf": "111.444.777-35",
+            "status": "pending", "age_group_id": "507f1f77bcf86cd799439011",
+        }
+
+    @patch('app.services.outbox.mongo_db')
+    @patch('app.services.outbox.publish_messages')
+    def test_relay_batch_publishes_and_marks_sent(self, mock_publish, mock_db):
+        """Testa que o relay publica o lote e remove o outbox das confirmadas"""
+        from app.services.outbox import OutboxRelay
+        relay = OutboxRelay(batch_size=10)
+        docs = [
+            {"_id": "id-1", "id": "id-1", "name": "A", "status": "pending", "outbox": {"attempts": 1}},
+            {"_id": "id-2", "id": "id-2", "name": "B", "status": "pending", "outbox": {"attempts": 1}},
+        ]
+        mock_db.enrollments.find.side_effect = [
+            MagicMock(**{"sort.return_value.limit.return_value": [{"_id": "id-1"}, {"_id": "id-2"}]}),
+            docs,
+        ]
+        mock_publish.return_value = [True, False]
+        
+        sent = relay.relay_batch()
+        
+        assert sent == 1
+        messages = mock_publish.call_args[0][0]
+        assert json.loads(messages[0]) == {"id": "id-1", "name": "A", "status": "pending"}
+        # Reserva com lease + remoção do outbox apenas da mensagem confirmada
+        claim_filter = mock_db.enrollments.update_many.call_args_list[0][0][0]
+        assert claim_filter["_id"] == {"$in": ["id-1", "id-2"]}
+        sent_filter, sent_update = mock_db.enrollments.update_many.call_args_list[1][0]
+        assert sent_filter["_id"] == {"$in": ["id-1"]}
+        assert sent_update == {"$unset": {"outbox": ""}}
+        assert relay.published == 1
+        assert relay.failed == 1
+
+    @patch('app.services.outbox.mongo_db')
+    @patch('app.services.outbox.publish_messages')
+    def test_relay_batch_empty_outbox(self, mock_publish, mock_db):
+        """Testa que o relay não publica nada com o outbox vazio"""
+        from app.services.outbox import OutboxRelay
+        mock_db.enrollments.find.return_value.sort.return_value.limit.return_value = []
+        
+        assert OutboxRelay().relay_batch() == 0
+        mock_publish.assert_not_called()
+
+
+@pytest.mark.unit
+class TestPendingReaper:
+    """Testes unitários para o reaper de inscrições pendentes"""
+
+    @patch('app.services.enrollment.mongo_db')
+    @patch('app.services.enrollment.publish_message')
+    def test_publish_enrollment_records_created_at(self, mock_publish, mock_db):
+        """Testa que a inscrição é gravada com created_at (e a mensagem não)"""
+        from app.services.enrollment import publish_enrollment
+        index = AgeGroupIndex()
+        index.load([{"_id": "507f1f77bcf86cd799439011", "min_age": 18, "max_age": 30}])
+        
+        with patch('app.services.enrollment.age_group_index', index):
+            publish_enrollment(EnrollmentCreate(name="João Silva", age=25, cpf="11144477735"))
+        
+        inserted = mock_db.enrollments.insert_one.call_args[0][0]
+        assert inserted["created_at"].tzinfo is not None
+        assert inserted["pending_since"] == inserted["created_at"]
+        message = json.loads(mock_publish.call_args[0][0])
+        assert "created_at" not in message and "pending_since" not in message
+
+    @patch('app.services.reaper.get_queue_depth', return_value=0)
+    @patch('app.services.reaper.mongo_db')
+    @patch('app.services.reaper.publish_messages')
+    def test_sweep_republishes_stale_pending(self, mock_publish, mock_db, mock_depth):
+        """Testa que a varredura reserva, republica e contabiliza as recuperadas"""
+        from app.services.reaper import StalePendingReaper
+        reaper = StalePendingReaper(threshold_seconds=300, batch_size=10)
+        docs = [
+            {"_id": "id-1", "id": "id-1", "name": "A", "status": "pending"},
+            {"_id": "id-2", "id": "id-2", "name": "B", "status": "pending"},
+        ]
+        mock_db.enrollments.find.side_effect = [
+            MagicMock(**{"sort.return_value.limit.return_value": [{"_id": "id-1"}, {"_id": "id-2"}]}),
+            docs,
+        ]
+        mock_publish.return_value = [True, False]
+        
+        assert reaper.sweep() == 1
+        
+        stale_filter = mock_db.enrollments.find.call_args_list[0][0][0]
+        assert stale_filter["status"] == "pending"
+        assert {"pending_since": {"$lt": ANY}} in stale_filter["$and"][0]["$or"]
+        assert stale_filter["outbox"] == {"$exists": False}
+        (claim_filter, claim_update), (sent_filter, sent_update) = [
+            call[0] for call in mock_db.enrollments.update_many.call_args_list
+        ]
+        assert claim_update["$inc"] == {"republish_count": 1}
+        assert "reap_lease_until" in claim_update["$set"]
+        assert "reaped_at" not in claim_update["$set"]
+        # Só a confirmada conta como republicada; a outra fica livre quando o lease vencer
+        assert sent_filter == {"_id": {"$in": ["id-1"]}}
+        assert "reaped_at" in sent_update["$set"]
+        assert json.loads(mock_publish.call_args[0][0][0])["id"] == "id-1"
+        stats = reaper.stats()
+        assert stats["recovered"] == 1
+        assert stats["failed"] == 1
+        assert stats["sweeps"] == 1
+
+    @patch('app.services.reaper.get_queue_depth', return_value=0)
+    @patch('app.services.reaper.mongo_db')
+    @patch('app.services.reaper.publish_messages')
+    def test_sweep_is_bounded(self, mock_publish, mock_db, mock_depth):
+        """Testa que uma varredura respeita o máximo de inscrições por execução"""
+        from app.services.reaper import StalePendingReaper
+        reaper = StalePendingReaper(batch_size=2, max_per_sweep=4)
+        full_batch = [{"_id": "a", "id": "a"}, {"_id": "b", "id": "b"}]
+        mock_db.enrollments.find.side_effect = lambda *args, **kwargs: (
+            MagicMock(**{"sort.return_value.limit.return_value": [{"_id": "a"}, {"_id": "b"}]})
+            if args[1] == {"_id": 1} else full_batch
+        )
+        mock_publish.return_value = [True, True]
+        
+        assert reaper.sweep() == 4
+        assert mock_publish.call_count == 2
+
+    @pytest.mark.parametrize("depth", [25, None])
+    @patch('app.services.reaper.mongo_db')
+    @patch('app.services.reaper.publish_messages')
+    def test_sweep_waits_for_queue_backlog(self, mock_publish, mock_db, depth):
+        """Testa que a varredura é adiada com mensagens prontas na fila ou sem broker"""
+        from app.services.reaper import StalePendingReaper
+        reaper = StalePendingReaper(max_queue_depth=10)
+        
+        with patch('app.services.reaper.get_queue_depth', return_value=depth):
+            assert reaper.sweep() == 0
+        
+        mock_db.enrollments.find.assert_not_called()
+        mock_db.enrollments.update_many.assert_not_called()
+        mock_publish.assert_not_called()
+        assert reaper.stats()["skipped"] == 1
+
+    def test_stale_filter_skips_leased_and_recently_pending(self):
+        """Testa que o limite conta de pending_since e respeita o lease de outra instância"""
+        from datetime import datetime, timedelta, timezone
+        from app.services.reaper import StalePendingReaper
+        reaper = StalePendingReaper(threshold_seconds=300)
+        now = datetime.now(timezone.utc)
+        
+        stale = reaper._stale_filter(now)
+        
+        pending_since, reaped, leased = stale["$and"]
+        cutoff = now - timedelta(seconds=300)
+        assert pending_since["$or"][0] == {"pending_since": {"$lt": cutoff}}
+        assert pending_since["$or"][1] == {"pending_since": {"$exists": False}, "created_at": {"$lt": cutoff}}
+        assert {"reaped_at": {"$lt": cutoff}} in reaped["$or"]
+        assert {"reap_lease_until": {"$lt": now}} in leased["$or"]
+        assert "created_at" not in stale
+
+
+@pytest.mark.unit
+class TestEnrollmentStatusCache:
+    """Testes unitários para o cache de status de inscrições"""
+
+    def status(self, value):
+        return EnrollmentStatus(id="id-1", status=value, message=None, age_group_id=None)
+
+    def test_processed_is_cached(self):
+        """Testa que status final é servido do cache sem nova leitura"""
+        from app.services.enrollment import EnrollmentStatusCache
+        cache = EnrollmentStatusCache(max_entries=10, pending_ttl=60)
+        loader = Mock(return_value=self.status("processed"))
+        
+        cache.get_or_load("id-1", loader)
+        result = cache.get_or_load("id-1", loader)
+        
+        assert result.status == "processed"
+        loader.assert_called_once_with("id-1")
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_pending_expires_after_ttl(self):
+        """Testa que status pendente é relido depois do TTL"""
+        from app.services.enrollment import EnrollmentStatusCache
+        cache = EnrollmentStatusCache(max_entries=10, pending_ttl=1.0)
+        loader = Mock(side_effect=[self.status("pending"), self.status("processed")])
+        
+        with patch('app.services.enrollment.time.monotonic', return_value=100.0):
+            assert cache.get_or_load("id-1", loader).status == "pending"
+            assert cache.get_or_load("id-1", loader).status == "pending"
+        with patch('app.services.enrollment.time.monotonic', return_value=101.5):
+            assert cache.get_or_load("id-1", loader).status == "processed"
+        assert loader.call_count == 2
+
+    def test_not_found_is_not_cached(self):
+        """Testa que inscrição inexistente não fica em cache"""
+        from app.services.enrollment import EnrollmentStatusCache
+        cache = EnrollmentStatusCache(max_entries=10)
+        loader = Mock(side_effect=[None, self.status("pending")])
+        
+        assert cache.get_or_load("id-1", loader) is None
+        assert cache.get_or_load("id-1", loader).status == "pending"
+
+    def test_lru_eviction(self):
+        """Testa que o cache respeita o limite de entradas removendo a menos usada"""
+        from app.services.enrollment import EnrollmentStatusCache
+        cache = EnrollmentStatusCache(max_entries=2)
+        loader = Mock(side_effect=lambda enrollment_id: EnrollmentStatus(
+            id=enrollment_id, status="processed", message=None, age_group_id=None))
+        
+        cache.get_or_load("a", loader)
+        cache.get_or_load("b", loader)
+        cache.get_or_load("a", loader)
+        cache.get_or_load("c", loader)
+        cache.get_or_load("a", loader)
+        cache.get_or_load("b", loader)
+        
+        assert cache.stats()["entries"] == 2
+        assert [call.args[0] for call in loader.call_args_list] == ["a", "b", "c", "b"]
+
+    def test_concurrent_misses_are_coalesced(self):
+        """Testa que leituras simultâneas do mesmo id fazem uma única consulta"""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        from app.services.enrollment import EnrollmentStatusCache
+        cache = EnrollmentStatusCache(max_entries=10)
+        release = threading.Event()
+        calls = []
+        
+        def loader(enrollment_id):
+            calls.append(enrollment_id)
+            release.wait(5)
+            return self.status("pending")
+        
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            futures = [executor.submit(cache.get_or_load, "id-1", loader) for _ in range(5)]
+            while cache.stats()["coalesced"] < 4:
+                release.wait(0.01)
+            release.set()
+            results = [future.result() for future in futures]
+        
+        assert calls == ["id-1"]
+        assert all(result.status == "pending" for result in results)
+
+    def test_loader_error_is_shared_and_not_cached(self):
+        """Testa que erro na leitura é propagado e a próxima chamada tenta de novo"""
+        from app.services.enrollment import EnrollmentStatusCache
+        cache = EnrollmentStatusCache(max_entries=10)
+        loader = Mock(side_effect=[RuntimeError("mongo indisponível"), self.status("processed")])
+        
+        with pytest.raises(RuntimeError):
+            cache.get_or_load("id-1", loader)
+        assert cache.get_or_load("id-1", loader).status == "processed"
+
+    @patch('app.services.enrollment.mongo_db')
+    def test_get_enrollment_status_bypasses_cache(self, mock_db):
+        """Testa que use_cache=False sempre lê do banco"""
+        from app.services.enrollment import get_enrollment_status
+        mock_db.enrollments.find_one.return_value = {"_id": "id-1", "status": "processed"}
+        
+        get_enrollment_status("id-1")
+        get_enrollment_status("id-1")
+        get_enrollment_status("id-1", use_cache=False)
+        
+        assert mock_db.enrollments.find_one.call_count == 2
+
+    @patch('app.services.enrollment.mongo_db')
+    def test_get_enrollment_statuses_single_query(self, mock_db):
+        """Testa que a consulta em lote usa um único $in com projeção e reaproveita o cache"""
+        from app.services.enrollment import get_enrollment_statuses, enrollment_status_cache
+        enrollment_status_cache.put_many([EnrollmentStatus(id="cached", status="processed")])
+        mock_db.enrollments.find.return_value = [{"_id": "id-1", "status": "pending", "age_group_id": "g1"}]
+        
+        result = get_enrollment_statuses(["cached", "id-1", "missing", "id-1"])
+        
+        mock_db.enrollments.find.assert_called_once()
+        query, projection = mock_db.enrollments.find.call_args[0]
+        assert query == {"_id": {"$in": ["id-1", "missing"]}}
+        assert set(projection) == {"status", "message", "age_group_id"}
+        assert result.total == 3
+        assert result.found == 2
+        assert result.statuses["cached"].status == "processed"
+        assert result.statuses["id-1"].age_group_id == "g1"
+        assert result.statuses["missing"] is None
+        assert result.not_found == ["missing"]
+
+
+@pytest.mark.unit
+class TestEnrollmentListing:
+    """Testes unitários para a listagem paginada de inscrições"""
+
+    def docs(self, count):
+        from datetime import datetime
+        return [
+            {"_id": f"id-{i}", "name": "João Silva", "age": 25, "status": "pending",
+             "created_at": datetime(2024, 1, 1, 12, 0, 59 - i)}
+            for i in range(count)
+        ]
+
+    @patch('app.services.enrollment_listing.mongo_db')
+    def test_first_page_with_next_cursor(self, mock_db):
+        """Testa que a página traz limit itens e um cursor para a próxima"""
+        from app.services.enrollment_listing import list_enrollments, decode_cursor
+        cursor_mock = mock_db.enrollments.find.return_value.sort.return_value.limit
+        cursor_mock.return_value = self.docs(3)
+        
+        page = list_enrollments(status="pending", age_group_id="g1", limit=2)
+        
+        query, projection = mock_db.enrollments.find.call_args[0]
+        assert query == {"status": "pending", "age_group_id": "g1"}
+        assert "cpf" not in projection
+        mock_db.enrollments.find.return_value.sort.assert_called_once_with([("created_at", -1), ("_id", -1)])
+        cursor_mock.assert_called_once_with(3)
+        assert [item.id for item in page.items] == ["id-0", "id-1"]
+        assert decode_cursor(page.next_cursor)[1] == "id-1"
+
+    @patch('app.services.enrollment_listing.mongo_db')
+    def test_last_page_has_no_cursor(self, mock_db):
+        """Testa que a última página não traz cursor"""
+        from app.services.enrollment_listing import list_enrollments
+        mock_db.enrollments.find.return_value.sort.return_value.limit.return_value = self.docs(2)
+        
+        assert list_enrollments(limit=2).next_cursor is None
+
+    def test_cursor_filter_is_keyset(self):
+        """Testa que o cursor vira uma condição de keyset em (created_at, _id)"""
+        from datetime import datetime
+        from app.services.enrollment_listing import build_listing_filter, encode_cursor
+        created_at = datetime(2024, 1, 1, 12, 0, 0)
+        
+        query = build_listing_filter(
+            created_from=datetime(2024, 1, 1), cursor=encode_cursor(created_at, "id-9")
+        )
+        
+        assert query["created_at"]["$gte"].tzinfo is not None
+        assert {"created_at": {"$lt": created_at}} in query["$or"]
+        assert {"created_at": created_at, "_id": {"$lt": "id-9"}} in query["$or"]
+
+    @patch('app.services.enrollment_listing.mongo_db')
+    def test_export_ndjson_in_batches(self, mock_db):
+        """Testa que a exportação gera um pedaço por lote do cursor e fecha o cursor"""
+        from app.services.enrollment_listing import export_enrollments
+        cursor = mock_db.enrollments.find.return_value.sort.return_value.batch_size.return_value
+        cursor.__iter__.return_value = iter(self.docs(5))
+        
+        chunks = list(export_enrollments("ndjson", status="pending", batch_size=2))
+        
+        assert mock_db.enrollments.find.call_args[0][0] == {"status": "pending"}
+        mock_db.enrollments.find.return_value.sort.return_value.batch_size.assert_called_once_with(2)
+        assert [chunk.count("\n") for chunk in chunks] == [2, 2, 1]
+        first = json.loads(chunks[0].splitlines()[0])
+        assert first["id"] == "id-0"
+        assert first["created_at"] == "2024-01-01T12:00:59"
+        cursor.close.assert_called_once()
+
+    @patch('app.services.enrollment_listing.mongo_db')
+    def test_export_csv(self, mock_db):
+        """Testa a exportação em CSV com cabeçalho"""
+        import csv
+        from app.services.enrollment_listing import export_enrollments, EXPORT_FIELDS
+        cursor = mock_db.enrollments.find.return_value.sort.return_value.batch_size.return_value
+        cursor.__iter__.return_value = iter(self.docs(2))
+        
+        rows = list(csv.reader("".join(export_enrollments("csv", batch_size=10)).splitlines()))
+        
+        assert rows[0] == EXPORT_FIELDS
+        assert len(rows) == 3
+        assert rows[1][0] == "id-0"
+
+    def test_invalid_cursor(self):
+        """Testa que cursor malformado resulta em 400"""
+        from fastapi import HTTPException
+        from app.services.enrollment_listing import build_listing_filter
+        
+        with pytest.raises(HTTPException) as exc_info:
+            build_listing_filter(cursor="não-é-um-cursor")
+        assert exc_info.value.status_code == 400
+
+
+@pytest.mark.unit
+class TestIndexRegistry:
+    """Testes unitários para o registro de índices do MongoDB"""
+
+    def fake_db(self, existing):
+        collections = {}
+        
+        def collection(name):
+            if name not in collections:
+                collections[name] = MagicMock()
+                collections[name].index_information.return_value = {
+                    index: {} for index in existing.get(name, [])
+                }
+            return collections[name]
+        
+        db = MagicMock()
+        db.__getitem__.side_effect = collection
+        return db, collection
+
+    def test_apply_creates_only_missing(self):
+        """Testa que apenas índices ausentes são criados e nenhum índice existente é removido"""
+        from app.db.indexes import apply_indexes, INDEXES
+        db, collection = self.fake_db({"enrollments": ["_id_", "cpf", "status_created_at"]})
+        
+        report = apply_indexes(db)
+        
+        states = {entry["name"]: entry["state"] for entry in report}
+        assert states["cpf"] == "exists"
+        assert states["status_created_at_id"] == "created"
+        assert states["min_age_max_age"] == "created"
+        assert "status_created_at" not in states
+        created = [call[0][0][0].document["name"] for call in collection("enrollments").create_indexes.call_args_list]
+        assert "cpf" not in created
+        assert len(created) == len([spec for spec in INDEXES if spec.collection == "enrollments"]) - 1
+        collection("enrollments").drop_index.assert_not_called()
+        assert all(entry["covers"] for entry in report)
+
+    def test_auth_users_index_only_with_mongo_store(self):
+        """Testa que o índice de auth_users só é registrado com AUTH_USER_STORE=mongo"""
+        from app.db.indexes import apply_indexes
+        db, collection = self.fake_db({})
+        
+        with patch('app.db.indexes.config.AUTH_USER_STORE', "file"):
+            report = apply_indexes(db, check_only=True)
+        assert "auth_users" not in {entry["collection"] for entry in report}
+        
+        with patch('app.db.indexes.config.AUTH_USER_STORE', "mongo"):
+            report = apply_indexes(db, check_only=True)
+        assert {"collection": "auth_users", "name": "role"}.items() <= next(
+            entry for entry in report if entry["collection"] == "auth_users"
+        ).items()
+
+    def test_check_only_does_not_write(self):
+        """Testa que --check apenas reporta os índices ausentes"""
+        from app.db.indexes import apply_indexes
+        db, collection = self.fake_db({})
+        
+        report = apply_indexes(db, check_only=True)
+        
+        assert {entry["state"] for entry in report} == {"missing"}
+        collection("enrollments").create_indexes.assert_not_called()
+
+    def test_conflict_is_reported(self):
+        """Testa que um conflito de definição vira erro no relatório sem interromper os demais"""
+        from pymongo.errors import OperationFailure
+        from app.db.indexes import apply_indexes
+        db, collection = self.fake_db({})
+        collection("age_groups").create_indexes.side_effect = OperationFailure("Index already exists", code=85)
+        
+        report = apply_indexes(db)
+        
+        states = {entry["name"]: entry["state"] for entry in report}
+        assert states["min_age_max_age"] == "error"
+        assert states["cpf"] == "created"
+
+    def test_ensure_index_by_name(self):
+        """Testa a criação de um único índice do registro"""
+        from app.db.indexes import ensure_index
+        db, collection = self.fake_db({})
+        
+        ensure_index("outbox_queued_at", db)
+        
+        model = collection("enrollments").create_indexes.call_args[0][0][0]
+        assert model.document["partialFilterExpression"] == {"outbox": {"$exists": True}}
+
+
+@pytest.mark.unit
+class TestMongoSettings:
+    """Testes unitários para a configuração compartilhada do MongoDB"""
+
+    def reload_settings(self, monkeypatch, **env):
+        import importlib
+        from app.config import mongo_settings
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        return importlib.reload(mongo_settings)
+
+    @pytest.fixture(autouse=True)
+    def restore_settings(self):
+        yield
+        import importlib
+        from app.config import mongo_settings
+        importlib.reload(mongo_settings)
+
+    def test_client_options_from_env(self, monkeypatch):
+        """Testa que pool, timeouts, read preference e write concern vêm das variáveis"""
+        settings = self.reload_settings(
+            monkeypatch,
+            MONGO_MAX_POOL_SIZE="50", MONGO_MIN_POOL_SIZE="5", MONGO_SERVER_SELECTION_TIMEOUT_MS="2000",
+            MONGO_READ_PREFERENCE="secondaryPreferred", MONGO_WRITE_CONCERN="majority",
+            MONGO_WRITE_CONCERN_TIMEOUT_MS="1000", MONGO_COMPRESSORS="zlib"
+        )
+        
+        options = settings.client_options("enroll_api")
+        
+        assert options["maxPoolSize"] == 50
+        assert options["minPoolSize"] == 5
+        assert options["serverSelectionTimeoutMS"] == 2000
+        assert options["readPreference"] == "secondaryPreferred"
+        assert options["w"] == "majority"
+        assert options["wTimeoutMS"] == 1000
+        assert options["compressors"] == "zlib"
+        assert options["appname"] == "enroll_api"
+
+    def test_defaults_fail_fast_and_keep_server_write_concern(self, monkeypatch):
+        """Testa que o padrão não espera 30s pelo servidor nem força write concern"""
+        monkeypatch.delenv("MONGO_WRITE_CONCERN", raising=False)
+        monkeypatch.delenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", raising=False)
+        settings = self.reload_settings(monkeypatch)
+        
+        options = settings.client_options()
+        
+        assert options["serverSelectionTimeoutMS"] == 5000
+        assert "w" not in options
+        assert "appname" not in options
+
+    def test_unavailable_compressors_are_skipped(self, monkeypatch):
+        """Testa que compressores sem o módulo instalado são ignorados"""
+        from app.config import mongo_settings
+        installed = {"zlib"}
+        monkeypatch.setattr(
+            mongo_settings.importlib.util, "find_spec",
+            lambda name: object() if name in installed else None
+        )
+        
+        assert mongo_settings.available_compressors(["zstd", "snappy", "zlib", "lz4"]) == ["zlib"]
+
+    def test_explicit_uri_has_precedence(self, monkeypatch):
+        """Testa que MONGO_URI explícita substitui host/porta"""
+        settings = self.reload_settings(monkeypatch, MONGO_URI="mongodb://db1,db2/?replicaSet=rs0")
+        
+        assert settings.MONGO_URI == "mongodb://db1,db2/?replicaSet=rs0"
+
+    def test_async_client_from_other_loop_closes_previous(self):
+        """Testa que trocar de event loop fecha o cliente assíncrono anterior"""
+        import asyncio
+        from app.db import mongo
+        clients = [Mock(close=AsyncMock()), Mock(close=AsyncMock())]
+
+        async def get_client():
+            client = mongo.get_async_mongo_client()
+            await asyncio.sleep(0)
+            return client
+
+        with patch('app.db.mongo.AsyncMongoClient', side_effect=clients), \
+             patch('app.db.mongo._async_client', None), \
+             patch('app.db.mongo._async_client_loop', None):
+            first = asyncio.run(get_client())
+            second = asyncio.run(get_client())
+
+        assert first is clients[0]
+        assert second is clients[1]
+        clients[0].close.assert_awaited_once()
+        clients[1].close.assert_not_called()
+
+
+@pytest.mark.unit
+class TestStartupWarmup:
+    """Testes unitários para o aquecimento do startup"""
+
+    def patches(self, rabbit_ready=True, mongo_error=None):
+        sync_client = MagicMock()
+        if mongo_error:
+            sync_client.admin.command.side_effect = mongo_error
+        async_client = MagicMock()
+        async_client.admin.command = AsyncMock(return_value={"ok": 1})
+        publisher = MagicMock()
+        publisher.wait_ready.return_value = rabbit_ready
+        index = MagicMock()
+        index.refresh_async = AsyncMock()
+        return sync_client, async_client, publisher, index, [
+            patch('app.services.warmup.get_mongo_client', return_value=sync_client),
+            patch('app.services.warmup.get_async_mongo_client', return_value=async_client),
+            patch('app.services.warmup.get_publisher', return_value=publisher),
+            patch('app.services.warmup.age_group_index', index),
+            patch('app.services.warmup.apply_indexes', return_value=[]),
+            patch('app.services.warmup.config.RABBITMQ_PUBLISHER_THREAD', True),
+        ]
+
+    async def run(self, warmup, patchers):
+        from contextlib import ExitStack
+        with ExitStack() as stack:
+            for patcher in patchers:
+                stack.enter_context(patcher)
+            return await warmup.run()
+
+    async def test_ready_after_all_steps(self):
+        """Testa que a API fica pronta com conexões abertas e caches carregados"""
+        from app.services.warmup import StartupWarmup
+        sync_client, async_client, publisher, index, patchers = self.patches()
+        warmup = StartupWarmup(mongo_connections=3, timeout=1)
+        
+        assert await self.run(warmup, patchers) is True
+        
+        # Uma conexão de cada pool por ping simultâneo
+        assert sync_client.admin.command.call_count == 3
+        assert async_client.admin.command.await_count == 3
+        publisher.wait_ready.assert_called_once()
+        index.refresh_async.assert_awaited_once()
+        assert warmup.stats()["components"]["mongodb"]["ready"] is True
+
+    async def test_not_ready_when_rabbitmq_is_down(self):
+        """Testa que a falha de um backend impede a prontidão, sem impedir os demais"""
+        from app.services.warmup import StartupWarmup
+        _, _, _, index, patchers = self.patches(rabbit_ready=False)
+        warmup = StartupWarmup(timeout=1)
+        
+        assert await self.run(warmup, patchers) is False
+        
+        components = warmup.stats()["components"]
+        assert components["rabbitmq"]["ready"] is False
+        assert components["mongodb"]["ready"] is True
+        index.refresh_async.assert_awaited_once()
+
+    async def test_caches_skipped_without_mongo(self):
+        """Testa que os caches não são carregados com o MongoDB indisponível"""
+        from app.services.warmup import StartupWarmup
+        _, _, _, index, patchers = self.patches(mongo_error=RuntimeError("mongo fora do ar"))
+        warmup = StartupWarmup(timeout=1)
+        
+        assert await self.run(warmup, patchers) is False
+        
+        assert warmup.stats()["components"]["mongodb"]["error"] == "mongo fora do ar"
+        index.refresh_async.assert_not_called()
+
+
+@pytest.mark.unit
+class TestAgeGroupIndex:
+    """Testes unitários para o índice em memória de age groups"""
+
+    def test_lookup_within_and_outside_ranges(self):
+        """Testa resolução de idades dentro, nas bordas e fora das faixas"""
+        index = AgeGroupIndex()
+        index.load([
+            {"_id": "a", "min_age": 18, "max_age": 25},
+            {"_id": "b", "min_age": 26, "max_age": 35},
+        ])
+        
+        assert index.lookup(18)["_id"] == "a"
+        assert index.lookup(25)["_id"] == "a"
+        assert index.lookup(26)["_id"] == "b"
+        assert index.lookup(17) is None
+        assert index.lookup(36) is None
+        assert index.lookup(121) is None
+        assert index.stats()["covered_ages"] == 18
+
+    def test_overlapping_groups_first_wins(self):
+        """Testa que, em sobreposição, prevalece o primeiro documento (ordem natural)"""
+        index = AgeGroupIndex()
+        index.load([
+            {"_id": "a", "min_age": 18, "max_age": 30},
+            {"_id": "b", "min_age": 25, "max_age": 40},
+        ])
+        
+        assert index.lookup(28)["_id"] == "a"
+        assert index.lookup(35)["_id"] == "b"
+
+    def test_stale_refresh_is_not_installed(self):
+        """Testa que uma recarga antiga não sobrescreve uma mais recente"""
+        index = AgeGroupIndex()
+        old_sequence = index._begin_refresh()
+        index.load([{"_id": "new", "min_age": 0, "max_age": 120}])
+        
+        installed = index._install(old_sequence, [{"_id": "old", "min_age": 0, "max_age": 120}])
+        
+        assert installed is False
+        assert index.lookup(50)["_id"] == "new"
+
+    def test_invalidate_forces_reload(self):
+        """Testa que invalidate marca o índice como não carregado"""
+        index = AgeGroupIndex()
+        index.load([{"_id": "a", "min_age": 18, "max_age": 25}])
+        assert index.is_loaded
+        
+        index.invalidate()
+        
+        assert not index.is_loaded
+        assert index.lookup(20) is None
+
+
+class FakeAsyncCursor:
+    """Cursor assíncrono simples para simular find()/watch()"""
+
+    def __init__(self, docs):
+        self._docs = list(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._docs:
+            raise StopAsyncIteration
+        return self._docs.pop(0)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+@pytest.mark.unit
+class TestAgeGroupWatcher:
+    """Testes unitários para a sincronização do índice entre processos"""
+
+    async def test_change_stream_refreshes_index(self):
+        """Testa recarga do índice a cada evento do change stream"""
+        from app.services.age_group_watcher import AgeGroupWatcher
+        from datetime import datetime, timezone
+        
+        index = AgeGroupIndex()
+        watcher = AgeGroupWatcher(index=index)
+        
+        with patch('app.services.age_group_watcher.async_mongo_db') as mock_db:
+            mock_db.age_groups.find.side_effect = lambda *args: FakeAsyncCursor(
+                [{"_id": "a", "min_age": 18, "max_age": 25}]
+            )
+            mock_db.age_groups.watch = AsyncMock(return_value=FakeAsyncCursor(
+                [{"operationType": "insert", "wallTime": datetime.now(timezone.utc)}]
+            ))
+            
+            await watcher._watch_change_stream()
+        
+        stats = watcher.stats()
+        assert stats["mode"] == "change_stream"
+        assert stats["refreshes"] == 2  # Abertura do stream + um evento
+        assert stats["last_lag_ms"] is not None
+        assert index.lookup(20)["_id"] == "a"
+
+    async def test_falls_back_to_version_counter(self):
+        """Testa fallback para o contador de versão sem change streams"""
+        import asyncio
+        from pymongo.errors import OperationFailure
+        from app.services.age_group_watcher import AgeGroupWatcher
+        from datetime import datetime, timezone
+        
+        index = AgeGroupIndex()
+        watcher = AgeGroupWatcher(index=index, poll_interval=0.01)
+        versions = [
+            {"_id": "age_groups", "version": 1, "updated_at": datetime.now(timezone.utc)},
+            {"_id": "age_groups", "version": 2, "updated_at": datetime.now(timezone.utc)},
+        ]
+        
+        with patch('app.services.age_group_watcher.async_mongo_db') as mock_db:
+            mock_db.age_groups.watch = AsyncMock(side_effect=OperationFailure(
+                "The $changeStream stage is only supported on replica sets", code=40573
+            ))
+            mock_db.age_groups.find.side_effect = lambda *args: FakeAsyncCursor(
+                [{"_id": "a", "min_age": 18, "max_age": 25}]
+            )
+            mock_db.cache_versions.find_one = AsyncMock(
+                side_effect=lambda query: versions[0] if len(versions) == 1 else versions.pop(0)
+            )
+            
+            watcher.start()
+            for _ in range(100):
+                if watcher.stats()["refreshes"] >= 2:
+                    break
+                await asyncio.sleep(0.01)
+            await watcher.stop()
+        
+        stats = watcher.stats()
+        assert stats["mode"] == "version_poll"
+        assert stats["refreshes"] == 2  # Sincronização inicial + mudança de versão
+        assert stats["staleness_bound_ms"] == 10.0
+        assert stats["max_lag_ms"] is not None
+        assert index.is_loaded
+
+    async def test_transient_stream_error_reopens_change_stream(self):
+        """Testa que erros que não indicam falta de suporte não levam ao polling"""
+        import asyncio
+        from pymongo.errors import OperationFailure
+        from app.services.age_group_watcher import AgeGroupWatcher
+        
+        index = AgeGroupIndex()
+        watcher = AgeGroupWatcher(index=index, poll_interval=0.01)
+        
+        with patch('app.services.age_group_watcher.async_mongo_db') as mock_db, \
+             patch('app.services.age_group_watcher.RETRY_DELAY', 0):
+            mock_db.age_groups.watch = AsyncMock(side_effect=[
+                OperationFailure("change stream fatal error", code=280),
+                FakeAsyncCursor([]),
+            ])
+            mock_db.age_groups.find.side_effect = lambda *args: FakeAsyncCursor(
+                [{"_id": "a", "min_age": 18, "max_age": 25}]
+            )
+            mock_db.cache_versions.find_one = AsyncMock(return_value=None)
+            
+            watcher.start()
+            for _ in range(100):
+                if watcher.stats()["refreshes"] >= 1:
+                    break
+                await asyncio.sleep(0.01)
+            await watcher.stop()
+        
+        assert watcher.mode == "change_stream"
+        assert mock_db.age_groups.watch.await_count >= 2
+        mock_db.cache_versions.find_one.assert_not_called()
+
+
+@pytest.mark.unit
+class TestUsersFileWatcher:
+    """Testes unitários para a recarga do users.json em cada processo"""
+
+    def _write_users(self, path, users, mtime=None):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"users": users, "metadata": {"version": "test"}}, file)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def _manager(self, path):
+        from app.auth.basic_auth import BasicAuthManager
+        from app.config.config import config
+
+        with patch.object(config, "USERS_FILE_PATH", str(path)):
+            return BasicAuthManager()
+
+    async def test_reloads_when_file_changes(self, tmp_path):
+        """Testa recarga quando mtime/tamanho do arquivo mudam"""
+        from app.services.users_watcher import UsersFileWatcher, file_signature
+
+        path = tmp_path / "users.json"
+        self._write_users(path, [{"username": "old", "password": "pass", "role": "user"}], mtime=1_000_000)
+        manager = self._manager(path)
+        watcher = UsersFileWatcher(manager=manager)
+        watcher._signature = file_signature(str(path))
+        version = manager.snapshot.version
+
+        assert await watcher.check() is False
+        self._write_users(path, [{"username": "new", "password": "pass", "role": "admin"}], mtime=1_000_100)
+        assert await watcher.check() is True
+
+        assert list(manager.users) == ["new"]
+        assert manager.snapshot.roles["admin"] == ("new",)
+        assert manager.snapshot.version > version
+        assert watcher.stats()["reloads"] == 1
+
+    async def test_invalid_or_missing_file_keeps_users(self, tmp_path):
+        """Testa que JSON inválido ou arquivo removido não derrubam os usuários"""
+        from app.services.users_watcher import UsersFileWatcher, file_signature
+
+        path = tmp_path / "users.json"
+        self._write_users(path, [{"username": "old", "password": "pass", "role": "user"}], mtime=1_000_000)
+        manager = self._manager(path)
+        watcher = UsersFileWatcher(manager=manager)
+        watcher._signature = file_signature(str(path))
+
+        path.write_text("{invalid")
+        assert await watcher.check() is False
+        path.unlink()
+        assert await watcher.check() is False
+        assert list(manager.users) == ["old"]
+        assert watcher.stats()["failures"] == 1
+
+        # Arquivo recriado é recarregado
+        self._write_users(path, [{"username": "back", "password": "pass", "role": "user"}])
+        assert await watcher.check() is True
+        assert list(manager.users) == ["back"]
+
+    async def test_mtime_polling_loop(self, tmp_path):
+        """Testa o fallback por polling de mtime"""
+        import asyncio
+        from app.services.users_watcher import UsersFileWatcher
+
+        path = tmp_path / "users.json"
+        self._write_users(path, [{"username": "old", "password": "pass", "role": "user"}], mtime=1_000_000)
+        manager = self._manager(path)
+        watcher = UsersFileWatcher(manager=manager, poll_interval=0.01, use_inotify=False)
+
+        watcher.start()
+        await asyncio.sleep(0.02)
+        self._write_users(path, [{"username": "new", "password": "pass", "role": "user"}], mtime=1_000_100)
+        for _ in range(100):
+            if watcher.stats()["reloads"] >= 1:
+                break
+            await asyncio.sleep(0.01)
+        await watcher.stop()
+
+        stats = watcher.stats()
+        assert stats["mode"] == "mtime_poll"
+        assert stats["reloads"] == 1
+        assert stats["staleness_bound_ms"] == 10.0
+        assert "new" in manager.users
+
+    async def test_reloads_changes_made_before_start(self, tmp_path):
+        """Testa recarga de alterações feitas antes de o watcher iniciar"""
+        import asyncio
+        import time
+        from app.services.users_watcher import UsersFileWatcher
+
+        path = tmp_path / "users.json"
+        self._write_users(path, [{"username": "old", "password": "pass", "role": "user"}], mtime=1_000_000)
+        manager = self._manager(path)
+        self._write_users(path, [{"username": "new", "password": "pass", "role": "user"}], mtime=time.time() + 60)
+        watcher = UsersFileWatcher(manager=manager, poll_interval=60, use_inotify=False)
+
+        watcher.start()
+        for _ in range(100):
+            if watcher.stats()["reloads"] >= 1:
+                break
+            await asyncio.sleep(0.01)
+        await watcher.stop()
+
+        assert "new" in manager.users
+
+
+@pytest.mark.unit
+class TestEnrollmentStatusWatcher:
+    """Testes unitários para o observador compartilhado de status"""
+
+    async def test_change_stream_dispatches_only_to_subscribers(self):
+        """Testa que eventos do change stream chegam apenas aos inscritos no id"""
+        from app.services.status_watcher import EnrollmentStatusWatcher
+        watcher = EnrollmentStatusWatcher()
+        
+        with patch('app.services.status_watcher.async_mongo_db') as mock_db:
+            mock_db.enrollments.watch = AsyncMock(side_effect=lambda pipeline: FakeAsyncCursor([
+                {"documentKey": {"_id": "id-1"}, "updateDescription": {"updatedFields": {"status": "processed", "message": "ok"}}},
+                {"documentKey": {"_id": "id-2"}, "updateDescription": {"updatedFields": {"status": "processed"}}},
+            ]))
+            first, second = watcher.subscribe("id-1"), watcher.subscribe("id-1")
+            await watcher.stop()  # O stream é consumido diretamente abaixo
+            await watcher._watch_change_stream()
+        
+        assert first.get_nowait() == {"id": "id-1", "status": "processed", "message": "ok"}
+        assert second.qsize() == 1
+        assert watcher.stats()["events"] == 1
+        
+        watcher.unsubscribe("id-1", first)
+        watcher.unsubscribe("id-1", second)
+        assert watcher.stats()["watched_enrollments"] == 0
+
+    async def test_falls_back_to_single_status_query(self):
+        """Testa o fallback sem change streams: uma consulta $in para todos os inscritos"""
+        import asyncio
+        from pymongo.errors import OperationFailure
+        from app.services.status_watcher import EnrollmentStatusWatcher
+        watcher = EnrollmentStatusWatcher(poll_interval=0.01)
+        
+        with patch('app.services.status_watcher.async_mongo_db') as mock_db:
+            mock_db.enrollments.watch = AsyncMock(side_effect=OperationFailure(
+                "The $changeStream stage is only supported on replica sets", code=40573
+            ))
+            mock_db.enrollments.find.side_effect = lambda *args: FakeAsyncCursor([
+                {"_id": "id-1", "status": "processed"},
+                {"_id": "id-2", "status": "pending"},
+            ])
+            first, second = watcher.subscribe("id-1"), watcher.subscribe("id-2")
+            
+            event = await asyncio.wait_for(first.get(), 1)
+            await asyncio.wait_for(second.get(), 1)
+            await asyncio.sleep(0.05)
+            await watcher.stop()
+        
+        assert event["status"] == "processed"
+        assert watcher.stats()["mode"] == "status_poll"
+        assert first.empty()  # Status inalterado não gera novos eventos
+        assert mock_db.enrollments.find.call_args[0][0] == {"_id": {"$in": ["id-1", "id-2"]}}
+
+    async def test_transient_stream_error_reopens_change_stream(self):
+        """Testa que uma falha transitória reabre o change stream em vez de passar ao polling"""
+        import asyncio
+        from pymongo.errors import OperationFailure
+        from app.services.status_watcher import EnrollmentStatusWatcher
+        watcher = EnrollmentStatusWatcher(poll_interval=0.01)
+        
+        with patch('app.services.status_watcher.async_mongo_db') as mock_db, \
+             patch('app.services.status_watcher.RETRY_DELAY', 0):
+            mock_db.enrollments.watch = AsyncMock(side_effect=[
+                OperationFailure("cursor killed", code=237),
+                FakeAsyncCursor([
+                    {"documentKey": {"_id": "id-1"}, "updateDescription": {"updatedFields": {"status": "processed"}}},
+                ]),
+            ])
+            queue = watcher.subscribe("id-1")
+            event = await asyncio.wait_for(queue.get(), 1)
+            await watcher.stop()
+        
+        assert event["status"] == "processed"
+        assert watcher.mode == "change_stream"
+        mock_db.enrollments.find.assert_not_called()
+
+
 @pytest.mark.unit
 class TestValidators:
     """Testes unitários para os validadores"""
@@ -216,4 +1366,409 @@ class TestValidators:
         
         assert format_cpf("111.444.777-35") == "11144477735"
         assert format_cpf("111 444 777 35") == "11144477735"
-        assert format_cpf("11144477735") == "11144477735" 
\ No newline at end of file
+        assert format_cpf("11144477735") == "11144477735"
+
+
+def worker_delivery(tag, enrollment_id="id-1", retries=None):
+    """Mensagem recebida pelo worker, como montada em on_message"""
+    import worker
+    headers = {worker.RETRY_HEADER: retries} if retries is not None else {}
+    return worker.Delivery(tag, json.dumps({"id": enrollment_id}).encode(), headers, f"token-{tag}")
+
+
+
+def pika_nack_error():
+    """Erro de basic_publish em modo confirm quando o broker recusa a mensagem"""
+    import pika
+    return pika.exceptions.NackError([])
+
+
+@pytest.mark.unit
+class TestConcurrentConsumer:
+    """Testes unitários para o processamento concorrente do worker"""
+
+    def make_consumer(self, concurrency=4):
+        import worker
+        connection = Mock()
+        # A thread da conexão é simulada executando o callback na hora
+        connection.add_callback_threadsafe.side_effect = lambda callback: callback()
+        return worker.ConcurrentConsumer(connection, concurrency)
+
+    def test_results_are_handed_to_batcher_on_connection_thread(self):
+        """Testa que o resultado de cada mensagem volta pelo add_callback_threadsafe"""
+        import worker
+        consumer = self.make_consumer()
+        batcher = Mock()
+        
+        with patch('worker.handle_enrollment', side_effect=lambda body, token: (worker.PROCESSED, json.loads(body)["id"])), \
+             patch('worker.status_batcher', batcher):
+            for tag in range(1, 4):
+                consumer.on_message(Mock(), Mock(delivery_tag=tag), Mock(headers=None),
+                                    json.dumps({"id": f"id-{tag}"}).encode())
+            consumer.executor.shutdown(wait=True)
+        
+        assert consumer.connection.add_callback_threadsafe.call_count == 3
+        assert consumer.in_flight == 0
+        completed = sorted((call[0][0].tag, call[0][1], call[0][2]) for call in batcher.complete.call_args_list)
+        assert completed == [(1, worker.PROCESSED, "id-1"), (2, worker.PROCESSED, "id-2"), (3, worker.PROCESSED, "id-3")]
+
+    def test_pool_error_becomes_retry(self):
+        """Testa que uma exceção no pool resulta em nova tentativa, não em perda da mensagem"""
+        import worker
+        consumer = self.make_consumer(concurrency=1)
+        batcher = Mock()
+        
+        with patch('worker.handle_enrollment', side_effect=RuntimeError("boom")), \
+             patch('worker.status_batcher', batcher):
+            consumer.on_message(Mock(), Mock(delivery_tag=7), Mock(headers={}), b"{}")
+            consumer.executor.shutdown(wait=True)
+        
+        delivery, outcome, enrollment_id = batcher.complete.call_args[0]
+        assert delivery.tag == 7
+        assert outcome == worker.RETRY
+        assert enrollment_id is None
+
+    def test_handlers_run_in_parallel(self):
+        """Testa que mensagens lentas não são processadas uma de cada vez"""
+        import threading
+        import worker
+        consumer = self.make_consumer(concurrency=3)
+        barrier = threading.Barrier(3, timeout=5)
+        
+        def handle(body, lease_token):
+            # Só passa se as três mensagens estiverem em processamento ao mesmo tempo
+            barrier.wait()
+            return worker.ACK, None
+        
+        with patch('worker.handle_enrollment', side_effect=handle), \
+             patch('worker.status_batcher', Mock()) as batcher:
+            for tag in range(1, 4):
+                consumer.on_message(Mock(), Mock(delivery_tag=tag), Mock(headers={}), b"{}")
+            consumer.executor.shutdown(wait=True)
+        
+        assert [call[0][1] for call in batcher.complete.call_args_list] == [worker.ACK] * 3
+
+
+@pytest.mark.unit
+class TestWorkerSupervisor:
+    """Testes unitários para o dimensionamento e a reposição do pool de workers"""
+
+    def test_desired_processes_grows_at_once_and_shrinks_one_by_one(self):
+        """Testa que o pool cresce até o necessário e reduz um processo por leitura"""
+        from supervisor import desired_processes
+        
+        assert desired_processes(950, current=1, min_processes=1, max_processes=8, backlog_per_process=100) == 8
+        assert desired_processes(350, current=2, min_processes=1, max_processes=8, backlog_per_process=100) == 4
+        assert desired_processes(0, current=6, min_processes=1, max_processes=8, backlog_per_process=100) == 5
+        assert desired_processes(0, current=1, min_processes=2, max_processes=8, backlog_per_process=100) == 2
+        assert desired_processes(10**6, current=8, min_processes=1, max_processes=8, backlog_per_process=100) == 8
+
+    def make_supervisor(self, **kwargs):
+        from supervisor import WorkerSupervisor
+        supervisor = WorkerSupervisor(min_processes=1, max_processes=4, **kwargs)
+        
+        def process(target, name):
+            process = Mock(pid=1, **{"is_alive.return_value": True})
+            process.name = name
+            return process
+        
+        supervisor._context = Mock(**{"Process.side_effect": process})
+        return supervisor
+
+    def test_scale_down_retires_with_sigterm(self):
+        """Testa que a redução envia SIGTERM e mantém o processo em drenagem"""
+        supervisor = self.make_supervisor()
+        supervisor.target = 3
+        supervisor.spawn_missing()
+        
+        supervisor.scale(0)
+        
+        assert supervisor.target == 2
+        assert len(supervisor.processes) == 2
+        assert len(supervisor.retiring) == 1
+        supervisor.retiring[0].terminate.assert_called_once()
+
+    def test_crashed_processes_are_restarted_with_exponential_backoff(self):
+        """Testa que quedas seguidas dobram a espera antes da reposição"""
+        supervisor = self.make_supervisor(restart_backoff=1, restart_backoff_max=8)
+        supervisor.spawn_missing()
+        now = [100.0]
+        
+        with patch('supervisor.time.monotonic', side_effect=lambda: now[0]):
+            delays = []
+            for _ in range(5):
+                supervisor.processes[0].is_alive.return_value = False
+                supervisor.reap()
+                delays.append(supervisor._restart_at - now[0])
+                supervisor.spawn_missing()
+                assert supervisor.processes == []  # Ainda dentro do backoff
+                now[0] = supervisor._restart_at
+                supervisor.spawn_missing()
+                assert len(supervisor.processes) == 1
+            
+            assert delays == [1, 2, 4, 8, 8]
+            
+            # Um processo estável por mais que o atraso máximo zera a contagem
+            now[0] += 8
+            supervisor.processes[0].is_alive.return_value = False
+            supervisor.reap()
+        
+        assert supervisor.crashes == 1
+        assert supervisor._restart_at == now[0] + 1
+
+
+@pytest.mark.unit
+class TestStatusBatcher:
+    """Testes unitários para a gravação de status em lote e o ack múltiplo"""
+
+    def make_batcher(self, batch_size=10):
+        import worker
+        channel = Mock(is_open=True)
+        return worker.StatusBatcher(Mock(), channel, batch_size=batch_size, window=0.2)
+
+    def test_ack_waits_for_contiguous_tags(self):
+        """Testa que o ack múltiplo só cobre tags resolvidas sem lacunas"""
+        import worker
+        batcher = self.make_batcher()
+        
+        batcher.complete(worker_delivery(2), worker.ACK)
+        batcher.complete(worker_delivery(3), worker.ACK)
+        batcher.channel.basic_ack.assert_not_called()
+        
+        batcher.complete(worker_delivery(1), worker.ACK)
+        batcher.channel.basic_ack.assert_called_once_with(delivery_tag=3, multiple=True)
+        assert batcher._acked_through == 3
+        assert batcher._resolved == {}
+
+    def test_ack_skips_rejected_tags_at_the_end_of_the_range(self):
+        """Testa que uma tag já rejeitada não é coberta pelo ack nem o bloqueia"""
+        batcher = self.make_batcher()
+        batcher._resolved = {1: True, 2: False}
+        
+        batcher._ack_contiguous()
+        
+        batcher.channel.basic_ack.assert_called_once_with(delivery_tag=1, multiple=True)
+        assert batcher._acked_through == 2
+
+    def test_processed_messages_are_acked_after_bulk_write(self):
+        """Testa que mensagens processadas só são confirmadas depois do lote gravado"""
+        import worker
+        batcher = self.make_batcher(batch_size=2)
+        
+        with patch('worker.mongo_db') as mock_db:
+            mock_db.enrollments.bulk_write.return_value = Mock(modified_count=2)
+            batcher.complete(worker_delivery(1, "id-1"), worker.PROCESSED, "id-1")
+            batcher.channel.basic_ack.assert_not_called()
+            batcher.complete(worker_delivery(2, "id-2"), worker.PROCESSED, "id-2")
+        
+        operations = mock_db.enrollments.bulk_write.call_args[0][0]
+        assert [op._filter["_id"] for op in operations] == ["id-1", "id-2"]
+        # Só grava se o lease ainda pertence à entrega processada
+        assert [op._filter["lease_token"] for op in operations] == ["token-1", "token-2"]
+        assert mock_db.enrollments.bulk_write.call_args[1]["ordered"] is False
+        batcher.channel.basic_ack.assert_called_once_with(delivery_tag=2, multiple=True)
+        assert batcher.flushes == 1
+
+
+@pytest.mark.unit
+class TestWorkerHandleEnrollment:
+    """Testes unitários para o processamento de uma mensagem do worker"""
+
+    def test_already_processed_is_acked_when_claim_fails(self):
+        """Testa que uma duplicata de inscrição processada é confirmada sem processar de novo"""
+        import worker
+        
+        with patch('worker.mongo_db') as mock_db, patch('worker.time.sleep') as mock_sleep:
+            mock_db.enrollments.find_one_and_update.return_value = None
+            mock_db.enrollments.find_one.return_value = {"_id": "id-1", "status": worker.STATUS_PROCESSED}
+            outcome, enrollment_id = worker.handle_enrollment(json.dumps({"id": "id-1"}).encode(), "token-1")
+        
+        assert (outcome, enrollment_id) == (worker.ACK, None)
+        # Reivindicação primeiro; a leitura só acontece porque ela falhou
+        mock_db.enrollments.find_one_and_update.assert_called_once()
+        mock_db.enrollments.find_one.assert_called_once()
+        mock_sleep.assert_not_called()
+
+    def test_pending_enrollment_is_claimed_and_processed(self):
+        """Testa que uma inscrição pendente é reivindicada e segue para o lote de status"""
+        import worker
+        
+        with patch('worker.mongo_db') as mock_db, patch('worker.time.sleep'):
+            mock_db.enrollments.find_one_and_update.return_value = {"_id": "id-1", "name": "A", "attempts": 1}
+            outcome, enrollment_id = worker.handle_enrollment(json.dumps({"id": "id-1"}).encode(), "token-1")
+        
+        assert (outcome, enrollment_id) == (worker.PROCESSED, "id-1")
+        # Uma única ida ao banco: a reivindicação atômica
+        mock_db.enrollments.find_one.assert_not_called()
+
+
+@pytest.mark.unit
+class TestWorkerLeaseStateMachine:
+    """Testes unitários para os filtros do lease das inscrições no worker"""
+
+    def test_claim_only_takes_pending_or_expired_leases(self):
+        """Testa que a reivindicação não assume leases ativos, nem do mesmo processo"""
+        import worker
+        
+        with patch('worker.mongo_db') as mock_db:
+            worker.claim_enrollment("id-1", "token-1")
+        
+        query, update = mock_db.enrollments.find_one_and_update.call_args[0]
+        assert query["_id"] == "id-1"
+        assert {"status": worker.STATUS_PENDING} in query["$or"]
+        assert len(query["$or"]) == 2
+        processing = [branch for branch in query["$or"] if branch["status"] == worker.STATUS_PROCESSING][0]
+        assert set(processing) == {"status", "lease_until"}
+        assert "$lt" in processing["lease_until"]
+        assert update["$set"]["status"] == worker.STATUS_PROCESSING
+        assert update["$set"]["lease_token"] == "token-1"
+        assert update["$inc"] == {"attempts": 1}
+
+    def test_duplicate_delivery_in_same_process_is_deferred(self):
+        """Testa que outra entrega da mesma inscrição, no mesmo processo, é adiada"""
+        import worker
+        
+        with patch('worker.mongo_db') as mock_db, patch('worker.time.sleep') as mock_sleep:
+            mock_db.enrollments.find_one.return_value = {
+                "_id": "id-1", "status": worker.STATUS_PROCESSING, "lease_owner": worker.WORKER_ID
+            }
+            # O lease ativo pertence à outra entrega: o filtro não casa
+            mock_db.enrollments.find_one_and_update.return_value = None
+            outcome, enrollment_id = worker.handle_enrollment(json.dumps({"id": "id-1"}).encode(), "token-2")
+        
+        assert (outcome, enrollment_id) == (worker.DEFER, None)
+        mock_sleep.assert_not_called()
+
+    def test_release_and_fail_are_scoped_to_the_delivery_lease(self):
+        """Testa que liberar ou falhar uma inscrição exige o lease da própria entrega"""
+        import worker
+        
+        with patch('worker.mongo_db') as mock_db:
+            worker.release_enrollment("id-1", "token-1", RuntimeError("boom"))
+            worker.fail_enrollment("id-1", "token-1", 4)
+        
+        (release_query, release_update), (fail_query, fail_update) = [
+            call[0] for call in mock_db.enrollments.update_one.call_args_list
+        ]
+        assert release_query == {"_id": "id-1", "status": worker.STATUS_PROCESSING, "lease_token": "token-1"}
+        assert release_update["$set"]["status"] == worker.STATUS_PENDING
+        assert release_update["$currentDate"] == {"pending_since": True}
+        assert set(release_update["$unset"]) == {"lease_owner", "lease_token", "lease_until"}
+        assert fail_query["status"] == {"$in": [worker.STATUS_PENDING, worker.STATUS_PROCESSING]}
+        assert {"lease_token": {"$in": [None, "token-1"]}} in fail_query["$or"]
+        assert fail_update["$set"]["status"] == worker.STATUS_FAILED
+
+
+@pytest.mark.unit
+class TestWorkerRetries:
+    """Testes unitários para as novas tentativas, a DLQ e o replay da DLQ"""
+
+    def make_batcher(self):
+        import worker
+        return worker.StatusBatcher(Mock(), Mock(is_open=True), batch_size=10, window=0.2)
+
+    def published_to(self, batcher):
+        return [call[1]["routing_key"] for call in batcher.channel.basic_publish.call_args_list]
+
+    def test_retry_until_delays_are_exhausted_then_dlq(self):
+        """Testa que cada falha usa o próximo atraso e a última vai para a DLQ"""
+        import worker
+        batcher = self.make_batcher()
+        
+        with patch('worker.WORKER_RETRY_DELAYS', [5, 30]), patch('worker.mongo_db') as mock_db:
+            batcher.complete(worker_delivery(1), worker.RETRY, "id-1")
+            batcher.complete(worker_delivery(2, retries=1), worker.RETRY, "id-1")
+            batcher.complete(worker_delivery(3, retries=2), worker.RETRY, "id-1")
+        
+        assert self.published_to(batcher) == [
+            worker.retry_queue_name(5), worker.retry_queue_name(30), worker.DEAD_LETTER_QUEUE
+        ]
+        headers = [call[1]["properties"].headers for call in batcher.channel.basic_publish.call_args_list]
+        assert [h[worker.RETRY_HEADER] for h in headers] == [1, 2, 3]
+        # Só a mensagem enviada à DLQ marca a inscrição como failed
+        mock_db.enrollments.update_one.assert_called_once()
+        assert mock_db.enrollments.update_one.call_args[0][1]["$set"]["status"] == worker.STATUS_FAILED
+        assert (batcher.retried, batcher.dead_lettered) == (2, 1)
+        batcher.channel.basic_ack.assert_called_with(delivery_tag=3, multiple=True)
+
+    def test_defer_uses_first_delay_without_counting_attempt(self):
+        """Testa que o adiamento usa o menor atraso e mantém o contador de tentativas"""
+        import worker
+        batcher = self.make_batcher()
+        
+        with patch('worker.WORKER_RETRY_DELAYS', [5, 30, 120]):
+            batcher.complete(worker_delivery(1, retries=2), worker.DEFER, "id-1")
+        
+        assert self.published_to(batcher) == [worker.retry_queue_name(5)]
+        assert batcher.channel.basic_publish.call_args[1]["properties"].headers[worker.RETRY_HEADER] == 2
+
+    def test_retry_queue_failure_falls_back_to_dlq(self):
+        """Testa que uma falha ao publicar no retry envia a mensagem para a DLQ"""
+        import worker
+        batcher = self.make_batcher()
+        batcher.channel.basic_publish.side_effect = [pika_nack_error(), None]
+        
+        with patch('worker.WORKER_RETRY_DELAYS', [5]), patch('worker.mongo_db'):
+            batcher.complete(worker_delivery(1), worker.RETRY, "id-1")
+        
+        assert self.published_to(batcher) == [worker.retry_queue_name(5), worker.DEAD_LETTER_QUEUE]
+        batcher.channel.basic_nack.assert_not_called()
+        batcher.channel.basic_ack.assert_called_once_with(delivery_tag=1, multiple=True)
+
+    def test_publish_failure_requeues_only_after_a_delay(self):
+        """Testa que, sem retry nem DLQ, a mensagem não volta à fila na hora (loop)"""
+        import worker
+        batcher = self.make_batcher()
+        batcher.channel.basic_publish.side_effect = pika_nack_error()
+        
+        with patch('worker.WORKER_RETRY_DELAYS', [5]), patch('worker.mongo_db'):
+            batcher.complete(worker_delivery(1), worker.RETRY, "id-1")
+            batcher.channel.basic_nack.assert_not_called()
+            delay, requeue = batcher.connection.call_later.call_args[0]
+            assert delay == 5
+            requeue()
+        
+        batcher.channel.basic_nack.assert_called_once_with(delivery_tag=1, requeue=True)
+        batcher.channel.basic_ack.assert_not_called()
+
+    def test_replay_batch_resets_enrollment_and_republishes(self):
+        """Testa que o replay devolve a mensagem à fila principal com tentativas zeradas"""
+        import worker
+        import replay_dlq
+        channel = Mock()
+        body = json.dumps({"id": "id-1"}).encode()
+        channel.basic_get.side_effect = [
+            (Mock(delivery_tag=1), Mock(headers={worker.RETRY_HEADER: 4, "x-trace": "a"}), body),
+            (None, None, None),
+        ]
+        
+        with patch('worker.mongo_db') as mock_db:
+            replayed = replay_dlq.replay_batch(channel, batch_size=10)
+        
+        assert replayed == 1
+        query, update = mock_db.enrollments.update_one.call_args[0]
+        assert query == {"_id": "id-1", "status": worker.STATUS_FAILED}
+        assert update["$set"]["status"] == worker.STATUS_PENDING
+        assert update["$currentDate"] == {"pending_since": True}
+        publish = channel.basic_publish.call_args[1]
+        assert publish["routing_key"] == worker.RABBITMQ_QUEUE
+        assert publish["properties"].headers == {"x-trace": "a"}
+        channel.basic_ack.assert_called_once_with(delivery_tag=1)
+
+    def test_replay_dry_run_returns_messages_to_dlq(self):
+        """Testa que o dry-run não altera nada e devolve o lote à DLQ"""
+        import replay_dlq
+        channel = Mock()
+        channel.basic_get.side_effect = [
+            (Mock(delivery_tag=tag), Mock(headers={}), json.dumps({"id": f"id-{tag}"}).encode())
+            for tag in (1, 2)
+        ]
+        
+        with patch('worker.mongo_db') as mock_db:
+            replayed = replay_dlq.replay_batch(channel, batch_size=2, dry_run=True)
+        
+        assert replayed == 2
+        mock_db.enrollments.update_one.assert_not_called()
+        channel.basic_publish.assert_not_called()
+        channel.basic_nack.assert_called_once_with(delivery_tag=2, multiple=True, requeue=True)
+